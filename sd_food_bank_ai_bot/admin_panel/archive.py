@@ -0,0 +1,138 @@
+"""
+Archive of old call transcripts, kept out of the Log table.
+
+Transcripts are by far the largest column of a Log and are only read when a
+single call is opened or exported. archive_call_logs moves the transcripts of
+calls older than CALL_ARCHIVE_AFTER_DAYS into one gzipped NDJSON file per
+day under call_archive/ in the default storage (MEDIA_ROOT), one
+{"id", "transcript"} line per call. The Log row keeps every other column with
+an empty transcript and the archive file it went to, so audit log lists,
+searches by phone number and the dashboard rollups are unchanged.
+
+Only calls counted in the rollups are archived, a call still in progress is
+never moved. A day archived again is written to a new file holding the old
+lines and the new ones, the rows are pointed at it and only then is the old
+file removed. An archive file is never deleted before its replacement
+exists, so an interrupted run loses nothing and is simply run again.
+
+transcript(log) reads a transcript wherever it is. The last few archive
+files read are kept in memory, exports read them in id order and open each
+day's file once.
+"""
+import gzip
+import io
+import json
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .availability import day_range
+from .models import Log
+
+ARCHIVE_DIR = "call_archive"
+
+
+def archive_path(day):
+    """
+    Name for a day's archive file, the storage adds a suffix when the day
+    already has one.
+    """
+    return f"{ARCHIVE_DIR}/{day:%Y/%m/%d}.ndjson.gz"
+
+
+def read_file(path):
+    """
+    The transcripts in an archive file by log id.
+    """
+    with default_storage.open(path, "rb") as archive_file:
+        with gzip.open(archive_file, "rt", encoding="utf-8") as lines:
+            return {entry["id"]: entry["transcript"] for entry in map(json.loads, lines)}
+
+
+@lru_cache(maxsize=8)
+def cached_file(path):
+    return read_file(path)
+
+
+def write_file(path, transcripts):
+    """
+    Write transcripts, a dict of log id to transcript, to a new archive file
+    named after path. Returns the name it was saved under.
+    """
+    buffer = io.BytesIO()
+    with gzip.open(buffer, "wt", encoding="utf-8") as lines:
+        for log_id, log_transcript in sorted(transcripts.items()):
+            lines.write(json.dumps({"id": log_id, "transcript": log_transcript}, ensure_ascii=False) + "\n")
+    return default_storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def archived_transcript(log_id, path):
+    """
+    The transcript of an archived log.
+    """
+    transcripts = cached_file(path)
+    if log_id not in transcripts:
+        # Another process may have added to the file since it was cached
+        cached_file.cache_clear()
+        transcripts = cached_file(path)
+    return transcripts.get(log_id, [])
+
+
+def transcript(log):
+    """
+    The transcript of a log, from the archive if it was moved there.
+    """
+    return archived_transcript(log.id, log.archive) if log.archive else log.transcript
+
+
+def archivable(days=None):
+    """
+    Closed calls older than days (CALL_ARCHIVE_AFTER_DAYS by default) whose
+    transcripts are still in the Log table.
+    """
+    days = settings.CALL_ARCHIVE_AFTER_DAYS if days is None else days
+    return Log.objects.filter(time_started__lt=timezone.now() - timedelta(days=days),
+                              rolled_up=True, archive="")
+
+
+def archive_day(day, logs):
+    """
+    Move the transcripts of logs, (id, transcript) pairs of calls started on
+    day, into a new archive file for the day along with the day's earlier
+    archived calls, then remove the files those were in.
+    """
+    previous = list(Log.objects.filter(**day_range(day, field="time_started")).exclude(archive="")
+                    .values_list("archive", flat=True).distinct())
+    transcripts = {}
+    for old_path in previous:
+        transcripts.update(read_file(old_path))
+    transcripts.update(logs)
+    path = write_file(archive_path(day), transcripts)
+
+    with transaction.atomic():
+        Log.objects.filter(archive__in=previous).update(archive=path)
+        Log.objects.filter(id__in=[log_id for log_id, _ in logs]).update(transcript=[], archive=path)
+    for old_path in previous:
+        default_storage.delete(old_path)
+    cached_file.cache_clear()
+
+
+def archive_logs(days=None):
+    """
+    Archive the transcripts of every archivable call, a day at a time so
+    only one day's transcripts are held in memory. Returns the number of
+    calls archived.
+    """
+    archived = 0
+    logs = archivable(days)
+    while (first := logs.order_by("time_started").values_list("time_started", flat=True).first()) is not None:
+        day = timezone.localtime(first).date()
+        day_logs = list(logs.filter(**day_range(day, field="time_started")).values_list("id", "transcript"))
+        archive_day(day, day_logs)
+        archived += len(day_logs)
+    return archived
@@ -0,0 +1,200 @@
+"""
+Appointment slot availability, the single source of truth for open times.
+
+Each day is split into 15 minute slots from 9:00 AM to 5:00 PM and stored as
+an int bitmap where bit i is set when slot i is free. Bitmaps are built with
+one query per day (or one query for a whole range of days), kept in the cache
+so every hop of the scheduling flow shares them, and dropped by the
+AppointmentTable signals whenever an appointment is created, moved or deleted.
+Only a shared cache (CACHE_URL) shares bitmaps and drops them across worker
+processes, with the default per-process cache another worker can read a stale
+bitmap for up to AVAILABILITY_CACHE_TTL, a few seconds. Questions like "is the day open", "how many slots" and
+"nearest slot to a time" are then bit operations on a single int.
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AppointmentTable
+
+# Earliest time to schedule an appointment, 9:00 AM
+EARLIEST_TIME = time(9, 0)
+LATEST_TIME = time(17, 0)    # Latest time appointments can end, 5:00 PM
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = (LATEST_TIME.hour * 60 + LATEST_TIME.minute
+                 - EARLIEST_TIME.hour * 60 - EARLIEST_TIME.minute) // SLOT_MINUTES
+ALL_FREE = (1 << SLOTS_PER_DAY) - 1
+
+AVAILABILITY_KEY = "availability:{}"
+
+SLOT_TIMES = [(datetime.combine(date.min, EARLIEST_TIME) + timedelta(minutes=SLOT_MINUTES * i)).time()
+              for i in range(SLOTS_PER_DAY)]
+
+
+def as_day(value):
+    """
+    The calendar day of a date or datetime, aware datetimes are read in the
+    current time zone like a date__date lookup.
+    """
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+def day_range(first, last=None, field="date"):
+    """
+    Filter kwargs on a datetime field for the days first to last in the
+    current time zone. Unlike a __date lookup the range can use an index.
+    """
+    start = timezone.make_aware(datetime.combine(first, time.min))
+    end = timezone.make_aware(datetime.combine((last or first) + timedelta(days=1), time.min))
+    return {f"{field}__gte": start, f"{field}__lt": end}
+
+
+def minutes_from_open(value):
+    return value.hour * 60 + value.minute - EARLIEST_TIME.hour * 60 - EARLIEST_TIME.minute
+
+
+def slot_index(value):
+    """
+    Index of the slot a time falls in, clamped to the day.
+    """
+    return min(max(minutes_from_open(value) // SLOT_MINUTES, 0), SLOTS_PER_DAY - 1)
+
+
+def booked_mask(start_time, end_time):
+    """
+    Bits of every slot overlapped by an appointment from start_time to end_time.
+    """
+    first = max(minutes_from_open(start_time) // SLOT_MINUTES, 0)
+    # Round the end up, an appointment ending 10:20 still blocks the 10:15 slot
+    last = min(-(-minutes_from_open(end_time) // SLOT_MINUTES), SLOTS_PER_DAY)
+    last = max(last, first + 1)
+    if first >= SLOTS_PER_DAY or last <= 0:
+        return 0
+    return ((1 << last) - 1) ^ ((1 << first) - 1)
+
+
+def build_bitmap(appointments):
+    """
+    Bitmap of free slots for (start_time, end_time) pairs booked on one day.
+    """
+    bitmap = ALL_FREE
+    for start_time, end_time in appointments:
+        bitmap &= ~booked_mask(start_time, end_time)
+    return bitmap
+
+
+def get_bitmap(day):
+    """
+    Free slot bitmap for a day, built from the database on a cache miss.
+    """
+    day = as_day(day)
+    key = AVAILABILITY_KEY.format(day.isoformat())
+    bitmap = cache.get(key)
+    if bitmap is None:
+        appointments = AppointmentTable.objects.filter(**day_range(day)).values_list("start_time", "end_time")
+        bitmap = build_bitmap(appointments)
+        cache.set(key, bitmap, timeout=settings.AVAILABILITY_CACHE_TTL)
+    return bitmap
+
+
+def get_bitmaps(start, end):
+    """
+    Free slot bitmaps for every day from start to end inclusive, with at most
+    one query for all the days missing from the cache.
+    """
+    start, end = as_day(start), as_day(end)
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    keys = {day: AVAILABILITY_KEY.format(day.isoformat()) for day in days}
+    cached = cache.get_many(keys.values())
+
+    missing = [day for day in days if keys[day] not in cached]
+    if missing:
+        booked = {day: [] for day in missing}
+        rows = AppointmentTable.objects.filter(**day_range(missing[0], missing[-1])) \
+            .values_list("date", "start_time", "end_time")
+        for appointment_date, start_time, end_time in rows:
+            day = as_day(appointment_date)
+            if day in booked:
+                booked[day].append((start_time, end_time))
+        built = {keys[day]: build_bitmap(appointments) for day, appointments in booked.items()}
+        cache.set_many(built, timeout=settings.AVAILABILITY_CACHE_TTL)
+        cached.update(built)
+
+    return {day: cached[keys[day]] for day in days}
+
+
+def invalidate(day):
+    """
+    Drop a day's cached bitmap after its appointments changed. It is dropped
+    again on commit in case another request cached the day in between. With
+    a per-process cache this only drops this process's copy.
+    """
+    key = AVAILABILITY_KEY.format(as_day(day).isoformat())
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def bitmap_times(bitmap):
+    return [slot for i, slot in enumerate(SLOT_TIMES) if bitmap >> i & 1]
+
+
+def is_available(day):
+    return get_bitmap(day) != 0
+
+
+def count_available(day):
+    return get_bitmap(day).bit_count()
+
+
+def available_times(day):
+    """
+    Free slot start times for a day, earliest first.
+    """
+    return bitmap_times(get_bitmap(day))
+
+
+def nearest_slot(day, requested_time):
+    """
+    The free slot closest to requested_time, the earlier one on a tie, or
+    None when the day is full.
+    """
+    bitmap = get_bitmap(day)
+    if not bitmap:
+        return None
+    index = slot_index(requested_time)
+    # Highest free slot at or before the index, lowest free slot after it
+    below = bitmap & ((1 << (index + 1)) - 1)
+    above = bitmap >> (index + 1) << (index + 1)
+    candidates = []
+    if below:
+        candidates.append(below.bit_length() - 1)
+    if above:
+        candidates.append((above & -above).bit_length() - 1)
+
+    requested = minutes_from_open(requested_time)
+    best = min(candidates, key=lambda i: (abs(i * SLOT_MINUTES - requested), i))
+    return SLOT_TIMES[best]
+
+
+def available_days(start, end):
+    """
+    Number of free slots on every day from start to end inclusive.
+    """
+    return {day: bitmap.bit_count() for day, bitmap in get_bitmaps(start, end).items()}
+
+
+def next_open_days(start, count, horizon):
+    """
+    Up to count (day, free slots) pairs for the soonest days from start on
+    with a free slot, looking at most horizon days ahead.
+    """
+    start = as_day(start)
+    days = available_days(start, start + timedelta(days=horizon - 1))
+    return [(day, free) for day, free in days.items() if free][:count]
@@ -0,0 +1,100 @@
+"""
+Atomic appointment booking.
+
+A slot is held for SLOT_HOLD_SECONDS while the bot asks the caller to confirm
+it, so a second caller cannot be booked into it in the meantime. Holds are
+SlotHold rows, unique per slot, and are taken and checked under
+select_for_update. Booking goes through the same hold row in one
+transaction: only the caller owning the row can book, the slot is checked
+against the committed appointments, and the unique (date, start_time)
+constraint on AppointmentTable backs it all up. Expired holds are simply
+taken over, so a caller who hangs up releases the slot on timeout.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import AppointmentTable, SlotHold
+from .availability import day_range
+
+
+class SlotUnavailable(Exception):
+    """
+    The slot is booked or held by another caller.
+    """
+
+
+def overlapping_appointments(day, start_time, end_time):
+    return AppointmentTable.objects.filter(**day_range(day), start_time__lt=end_time, end_time__gt=start_time)
+
+
+def lock_slot(day, start_time, holder):
+    """
+    Take the hold on a slot for holder inside the current transaction and
+    return it locked. Raises SlotUnavailable if another caller holds it.
+    """
+    expires_at = timezone.now() + timedelta(seconds=settings.SLOT_HOLD_SECONDS)
+    hold = SlotHold.objects.select_for_update().filter(date=day, start_time=start_time).first()
+    if hold is None:
+        try:
+            with transaction.atomic():
+                return SlotHold.objects.create(date=day, start_time=start_time, holder=holder,
+                                               expires_at=expires_at)
+        except IntegrityError:
+            # Another caller created the hold first
+            raise SlotUnavailable
+    if hold.holder != holder and hold.is_active():
+        raise SlotUnavailable
+    hold.holder = holder
+    hold.expires_at = expires_at
+    hold.save(update_fields=["holder", "expires_at"])
+    return hold
+
+
+def hold_slot(day, start_time, end_time, holder):
+    """
+    Reserve a free slot for holder, releasing any other slot they held.
+    Returns False if the slot is booked or held by someone else.
+    """
+    try:
+        with transaction.atomic():
+            # Drop this caller's other hold and any holds left by abandoned calls
+            SlotHold.objects.filter(holder=holder).exclude(date=day, start_time=start_time).delete()
+            SlotHold.objects.filter(expires_at__lte=timezone.now()).delete()
+            lock_slot(day, start_time, holder)
+            if overlapping_appointments(day, start_time, end_time).exists():
+                # Rolls the hold back too
+                raise SlotUnavailable
+    except SlotUnavailable:
+        return False
+    return True
+
+
+def release_holds(holder):
+    """
+    Give back every slot held by holder.
+    """
+    SlotHold.objects.filter(holder=holder).delete()
+
+
+def book_slot(user, day, start_time, end_time, holder):
+    """
+    Book the slot for user if it is free and not held by another caller.
+    Raises SlotUnavailable otherwise.
+    """
+    try:
+        with transaction.atomic():
+            hold = lock_slot(day, start_time, holder)
+            if overlapping_appointments(day, start_time, end_time).exists():
+                raise SlotUnavailable
+            with transaction.atomic():
+                appointment = AppointmentTable.objects.create(
+                    user=user, start_time=start_time, end_time=end_time,
+                    date=timezone.make_aware(datetime.combine(day, time.min)))
+            hold.delete()
+    except IntegrityError:
+        raise SlotUnavailable
+    return appointment
+
@@ -0,0 +1,166 @@
+"""
+Per-call state shared by every webhook hop of a single Twilio call.
+
+Twilio sends the same CallSid with every webhook of a call, so the caller's
+User row and the call's Log row are resolved once and their ids and the
+caller's language are kept in the cache under that CallSid. Later hops of the
+call read the rows back by primary key rather than searching by phone number.
+Only ids are cached, never the rows: the cache may be per process, and a
+worker that served an earlier hop must not write back a stale copy of the
+log over what later hops saved. Sessions expire after CALL_SESSION_TTL
+seconds of inactivity and are dropped as soon as Twilio reports the call
+status.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from .models import User, Log
+
+CALL_SESSION_KEY = "call_session:{}"
+
+
+class CallSession:
+    """
+    Holds the resolved user and log for one call.
+    """
+
+    def __init__(self, call_sid, phone_number, user_id=None, log_id=None, language=None):
+        self.call_sid = call_sid
+        self.phone_number = phone_number
+        self.user = None
+        self.log = None
+        self._user_id = user_id
+        self._log_id = log_id
+        self._language = language
+        self.invalidated = False
+
+    @classmethod
+    def load(cls, call_sid, phone_number):
+        """
+        Return the cached session for the call or start a new empty one.
+        """
+        state = cache.get(CALL_SESSION_KEY.format(call_sid)) if call_sid else None
+        return cls.from_state(call_sid, phone_number, state)
+
+    @classmethod
+    async def aload(cls, call_sid, phone_number):
+        """
+        Async version of load
+        """
+        state = await cache.aget(CALL_SESSION_KEY.format(call_sid)) if call_sid else None
+        return cls.from_state(call_sid, phone_number, state)
+
+    @classmethod
+    def from_state(cls, call_sid, phone_number, state):
+        if state and state["phone_number"] == phone_number:
+            return cls(call_sid, phone_number, state["user_id"], state["log_id"], state["language"])
+        return cls(call_sid, phone_number)
+
+    @property
+    def user_id(self):
+        return self.user.id if self.user else self._user_id
+
+    @property
+    def log_id(self):
+        return self.log.id if self.log else self._log_id
+
+    @property
+    def language(self):
+        return self.user.language if self.user else self._language
+
+    def user_lookup(self):
+        return {"pk": self._user_id} if self._user_id else {"phone_number": self.phone_number}
+
+    def get_user(self):
+        """
+        Return the caller's User, raising User.DoesNotExist like a normal
+        lookup when there is no account for the number.
+        """
+        if self.user is None:
+            self.user = User.objects.get(**self.user_lookup())
+        return self.user
+
+    async def aget_user(self):
+        """
+        Async version of get_user
+        """
+        if self.user is None:
+            self.user = await User.objects.aget(**self.user_lookup())
+        return self.user
+
+    def log_candidates(self):
+        """
+        Querysets to find the call's log in, in order. Logs are found by
+        CallSid, the caller's latest log is only used for requests without one
+        and calls logged before CallSids were recorded, never another call's
+        log.
+        """
+        if self._log_id:
+            yield Log.objects.filter(pk=self._log_id)
+        if self.call_sid:
+            yield Log.objects.filter(call_sid=self.call_sid)
+        logs = Log.objects.filter(phone_number=self.phone_number)
+        if self.call_sid:
+            logs = logs.filter(call_sid__isnull=True)
+        yield logs.order_by("-id")
+
+    def get_log(self):
+        """
+        Return the Log for the current call, or None if there isn't one.
+        """
+        for logs in self.log_candidates():
+            if self.log is not None:
+                break
+            self.log = logs.first()
+        return self.log
+
+    async def aget_log(self):
+        """
+        Async version of get_log
+        """
+        for logs in self.log_candidates():
+            if self.log is not None:
+                break
+            self.log = await logs.afirst()
+        return self.log
+
+    def save(self):
+        """
+        Store the session so the next hop of the call can reuse it.
+        """
+        if not self.call_sid or self.invalidated:
+            return
+        cache.set(CALL_SESSION_KEY.format(self.call_sid), self.state(),
+                  timeout=settings.CALL_SESSION_TTL)
+
+    async def asave(self):
+        """
+        Async version of save
+        """
+        if not self.call_sid or self.invalidated:
+            return
+        await cache.aset(CALL_SESSION_KEY.format(self.call_sid), self.state(),
+                         timeout=settings.CALL_SESSION_TTL)
+
+    def state(self):
+        return {
+            "phone_number": self.phone_number,
+            "user_id": self.user_id,
+            "log_id": self.log_id,
+            "language": self.language,
+        }
+
+    def invalidate(self):
+        """
+        Forget the session, used once the call has ended.
+        """
+        self.invalidated = True
+        if self.call_sid:
+            cache.delete(CALL_SESSION_KEY.format(self.call_sid))
+
+    async def ainvalidate(self):
+        """
+        Async version of invalidate
+        """
+        self.invalidated = True
+        if self.call_sid:
+            await cache.adelete(CALL_SESSION_KEY.format(self.call_sid))
@@ -0,0 +1,185 @@
+"""
+Shared API clients for OpenAI, Twilio and Google Translate.
+
+Each client owns an HTTP connection pool. Building one per request meant a new
+pool, a new TLS handshake and, for Google, a new credentials lookup on every
+webhook. The clients here are created once per worker process on first use
+and reused by every request and thread, under both WSGI and ASGI. Timeouts and
+retries come from the OPENAI_*, TWILIO_* and TRANSLATE_* settings. Every
+request they make is added to the current webhook's timing.
+
+The async views use an AsyncOpenAI client instead. Its connections belong to
+the event loop they were opened on, so there is one per running loop.
+"""
+import asyncio
+import threading
+import weakref
+
+import httpx
+
+import google.auth
+from django.conf import settings
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import translate_v2 as translate
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAI
+from requests import Request, Session
+from requests.adapters import HTTPAdapter
+from twilio.http import HttpClient, get_cert_file
+from twilio.http.response import Response
+from twilio.rest import Client
+from urllib3.util.retry import Retry
+
+from .timing import timed
+
+_clients = {}
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncOpenAI
+_lock = threading.Lock()
+
+
+def connection_retries(retries):
+    """
+    Retry policy that only retries failed connections, so a request that
+    reached the server (such as sending an SMS) is never sent twice.
+    """
+    return Retry(total=retries, connect=retries, read=0, status=0, other=0,
+                 backoff_factor=0.2)
+
+
+def pooled_adapter(retries):
+    return HTTPAdapter(pool_connections=4, pool_maxsize=settings.API_POOL_SIZE,
+                       max_retries=connection_retries(retries))
+
+
+class PooledTwilioHttpClient(HttpClient):
+    """
+    Twilio HTTP client reusing one keep-alive session. The stock client of
+    this twilio release opens a new session for every request.
+    """
+
+    def __init__(self, timeout, retries):
+        self.timeout = timeout
+        self.session = Session()
+        self.session.verify = get_cert_file()
+        self.session.mount("https://", pooled_adapter(retries))
+
+    def request(self, method, url, params=None, data=None, headers=None, auth=None,
+                timeout=None, allow_redirects=False):
+        request = Request(method.upper(), url, params=params, data=data,
+                          headers=headers, auth=auth)
+        with timed("twilio"):
+            response = self.session.send(
+                self.session.prepare_request(request),
+                allow_redirects=allow_redirects,
+                timeout=timeout or self.timeout,
+            )
+        return Response(int(response.status_code), response.content.decode("utf-8"))
+
+
+class TimeoutAuthorizedSession(AuthorizedSession):
+    """
+    Google authorized session applying our timeout, the translate client
+    always asks for its own 60 second default.
+    """
+
+    def __init__(self, credentials, timeout, retries):
+        super().__init__(credentials)
+        self.timeout = timeout
+        self.mount("https://", pooled_adapter(retries))
+
+    def request(self, method, url, data=None, headers=None, timeout=None, **kwargs):
+        with timed("translate"):
+            return super().request(method, url, data=data, headers=headers,
+                                   timeout=self.timeout, **kwargs)
+
+
+class TimedOpenAI(OpenAI):
+    """
+    OpenAI client adding each request, retries included, to the webhook's timing.
+    """
+
+    def request(self, *args, **kwargs):
+        with timed("openai"):
+            return super().request(*args, **kwargs)
+
+
+class TimedAsyncOpenAI(AsyncOpenAI):
+    async def request(self, *args, **kwargs):
+        with timed("openai"):
+            return await super().request(*args, **kwargs)
+
+
+def _get_or_create(name, factory):
+    """
+    Return the named client, creating it with factory the first time.
+    """
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+
+def get_openai_client():
+    """
+    Returns the shared OpenAI client
+    """
+    return _get_or_create("openai", lambda: TimedOpenAI(
+        timeout=settings.OPENAI_TIMEOUT,
+        max_retries=settings.OPENAI_MAX_RETRIES,
+    ))
+
+
+def get_async_openai_client():
+    """
+    Returns the AsyncOpenAI client shared by every request on the running
+    event loop
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        # Many calls wait on GPT at once, so the async pool is much larger
+        limits = httpx.Limits(max_connections=settings.ASYNC_API_POOL_SIZE,
+                              max_keepalive_connections=settings.ASYNC_API_POOL_SIZE)
+        client = _async_clients[loop] = TimedAsyncOpenAI(
+            timeout=settings.OPENAI_TIMEOUT,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(limits=limits),
+        )
+    return client
+
+
+def get_twilio_client():
+    """
+    Returns the shared Twilio REST client
+    """
+    return _get_or_create("twilio", lambda: Client(
+        settings.TWILIO_ACCOUNT_SID,
+        settings.TWILIO_AUTH_TOKEN,
+        http_client=PooledTwilioHttpClient(settings.TWILIO_TIMEOUT,
+                                           settings.TWILIO_MAX_RETRIES),
+    ))
+
+
+def _create_translate_client():
+    credentials, _ = google.auth.default(scopes=translate.Client.SCOPE)
+    session = TimeoutAuthorizedSession(credentials, settings.TRANSLATE_TIMEOUT,
+                                       settings.TRANSLATE_MAX_RETRIES)
+    return translate.Client(credentials=credentials, _http=session)
+
+
+def get_translate_client():
+    """
+    Returns the shared Google Translate client
+    """
+    return _get_or_create("translate", _create_translate_client)
+
+
+def reset_clients():
+    """
+    Drop every shared client, they are created again on next use.
+    """
+    with _lock:
+        _clients.clear()
+        _async_clients.clear()
@@ -0,0 +1,351 @@
+"""
+Rule based date and time extraction for scheduling answers.
+
+Callers mostly answer with phrases like "next Tuesday", "March 5th",
+"10:30 in the morning" or "el martes". These are parsed here relative to today
+in America/Los_Angeles, in English and Spanish, without a GPT round trip. The
+parsers return None whenever an answer is missing, vague or contradictory, and
+the views then fall back to GPT.
+"""
+import json
+import re
+import unicodedata
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+PST = ZoneInfo("America/Los_Angeles")
+CORPUS_PATH = Path(__file__).resolve().parent / "datetime_corpus.json"
+
+WEEKDAYS = {
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4,
+    "saturday": 5, "sunday": 6,
+    "lunes": 0, "martes": 1, "miercoles": 2, "jueves": 3, "viernes": 4,
+    "sabado": 5, "domingo": 6,
+}
+WEEKDAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+MONTHS = {
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6,
+    "july": 7, "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "jun": 6, "jul": 7, "aug": 8, "sep": 9,
+    "sept": 9, "oct": 10, "nov": 11, "dec": 12,
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7,
+    "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12,
+}
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18,
+    "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+    "uno": 1, "una": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5,
+    "seis": 6, "siete": 7, "ocho": 8, "nueve": 9, "diez": 10, "once": 11, "doce": 12,
+    "trece": 13, "catorce": 14, "quince": 15, "dieciseis": 16, "diecisiete": 17,
+    "dieciocho": 18, "diecinueve": 19, "veinte": 20, "veintiuno": 21, "veintidos": 22,
+    "veintitres": 23, "veinticuatro": 24, "veinticinco": 25, "veintiseis": 26,
+    "veintisiete": 27, "veintiocho": 28, "veintinueve": 29, "treinta": 30,
+    "cuarenta": 40, "cincuenta": 50,
+}
+# Ordinals are only days next to a month or after "the"/"el", "hold on a
+# second" and "the first one" are not dates
+ORDINAL_WORDS = {
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5, "sixth": 6,
+    "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10, "eleventh": 11, "twelfth": 12,
+    "thirteenth": 13, "fourteenth": 14, "fifteenth": 15, "sixteenth": 16,
+    "seventeenth": 17, "eighteenth": 18, "nineteenth": 19, "twentieth": 20, "thirtieth": 30,
+    "primero": 1,
+}
+ORDINAL_SUFFIX = re.compile(r"\b(\d{1,2})(st|nd|rd|th|ro|do|to|vo|mo|no)\b")
+NUMBER_WORD = "|".join(sorted(NUMBER_WORDS, key=len, reverse=True))
+ORDINAL_WORD = "|".join(sorted(ORDINAL_WORDS, key=len, reverse=True))
+# "twenty first", "thirty one", "treinta y uno"
+COMPOUND_NUMBER = re.compile(
+    rf"\b(twenty|thirty|forty|fifty|treinta|cuarenta|cincuenta)(?:[ -]|\sy\s)({NUMBER_WORD}|{ORDINAL_WORD})\b")
+SINGLE_NUMBER = re.compile(rf"\b({NUMBER_WORD})\b")
+# "the first one", "the second option" pick from a list
+ORDINAL_PRONOUN = re.compile(rf"\b({ORDINAL_WORD})\s+(?=(?:one|ones|option|choice|time)\b)")
+# "the one after Easter" is not the 1st
+PRONOUN_ONE = re.compile(r"\b(the|this|that|which) one\b")
+
+MONTH_NAME = "|".join(sorted(MONTHS, key=len, reverse=True))
+# "the first", "el primero", "first of march", "march first"
+ORDINAL_AFTER_THE = re.compile(rf"\b(the|el)\s+({ORDINAL_WORD})\b")
+ORDINAL_BEFORE_MONTH = re.compile(rf"\b({ORDINAL_WORD})(?=\s+(?:of\s+|de\s+)?(?:{MONTH_NAME})\b)")
+ORDINAL_AFTER_MONTH = re.compile(rf"\b({MONTH_NAME})\s+({ORDINAL_WORD})\b")
+WEEKDAY_NAME = "|".join(WEEKDAYS)
+
+# "march 5", "march the 5", "5 march", "the 5 of march", "5 de marzo"
+MONTH_DAY = re.compile(rf"\b({MONTH_NAME})\s+(?:the\s+)?(\d{{1,2}})\b(?:,?\s+(\d{{4}}))?")
+DAY_MONTH = re.compile(rf"\b(\d{{1,2}})\s+(?:of\s+|de\s+)?({MONTH_NAME})\b(?:,?\s+(?:de\s+|del\s+)?(\d{{4}}))?")
+NUMERIC_DATE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+# "the 15", "el 15", "on the 15"
+DAY_ONLY = re.compile(r"\b(?:the|el|dia)\s+(\d{1,2})\b")
+WEEKDAY = re.compile(rf"\b(?:(next|this|coming|proximo|este|siguiente)\s+)?({WEEKDAY_NAME})\b"
+                     rf"(?:\s+(que viene|proximo|siguiente))?")
+# "el martes 27", but not "Tuesday 10 am" or "martes 10:30"
+WEEKDAY_DAY = re.compile(rf"\b(?:{WEEKDAY_NAME})\s+(\d{{1,2}})\b"
+                         r"(?!:|\s*(?:am|a m|pm|p m|o ?clock|in the|de la|en la|en punto)\b)")
+IN_DAYS = re.compile(r"\b(?:in|en)\s+(\d{1,2})\s+(?:days|dias)\b")
+
+# "a week from Tuesday", "Tuesday after next", "any day but Tuesday" and "not
+# tomorrow" name a date other than the one said
+NOT_A_DATE = re.compile(r"\b(from|after next|but|except|excepto|pero|sino|desde|a partir|not|no|never|nunca|"
+                        r"don t|dont|can t|cant|cannot|won t|menos(?!\s+(?:cuarto|\d)))\b")
+
+# Words for a relative day. Spanish "manana" alone is tomorrow, "la manana"
+# is the morning.
+RELATIVE_DAYS = [
+    (re.compile(r"\b(day after tomorrow|pasado manana)\b"), 2),
+    (re.compile(r"\b(tomorrow)\b|(?<!la )(?<!de )\bmanana\b"), 1),
+    (re.compile(r"\b(today|hoy)\b"), 0),
+]
+
+MORNING = re.compile(r"\b(am|a m|in the morning|morning|de la manana|en la manana|por la manana)\b")
+AFTERNOON = re.compile(r"\b(pm|p m|in the afternoon|afternoon|in the evening|evening|de la tarde|"
+                       r"en la tarde|por la tarde|de la noche)\b")
+NOON = re.compile(r"\b(noon|midday|mediodia)\b")
+CLOCK_TIME = re.compile(r"\b(\d{1,2}):(\d{2})\b")
+HOUR_MINUTE = re.compile(r"\b(\d{1,2})\s+(\d{2})\b")
+HOUR_ONLY = re.compile(r"\b(?:at|a las|a la|las|around|about|by)?\s*(\d{1,2})\s*(?=(?:o ?clock|am|a m|pm|p m|in the|de la|en punto)\b|$)")
+HALF_PAST = re.compile(r"\bhalf past\s+(\d{1,2})\b")
+QUARTER_PAST = re.compile(r"\bquarter (?:past|after)\s+(\d{1,2})\b")
+QUARTER_TO = re.compile(r"\bquarter (?:to|till|til|before)\s+(\d{1,2})\b")
+SPANISH_FRACTION = re.compile(r"\b(\d{1,2})\s+y\s+(media|cuarto)\b")
+SPANISH_MINUS = re.compile(r"\b(\d{1,2})\s+menos\s+(cuarto|\d{1,2})\b")
+# "10 or 11", "a las 10 o a las 11"
+ALTERNATIVES = re.compile(r"\b\d{1,2}(?::\d{2})?\s+(?:or|o)\s+(?:at\s+|a las\s+)?\d{1,2}\b")
+SPANISH_MINUTES = re.compile(r"\b(?:a las|a la|las|la)\s+(\d{1,2})\s+y\s+(\d{1,2})\b")
+# "any time after 3", "between 2 and 4", "I can't do 3" name a range or a time
+# that does not work, not the time to book. "quarter till 3" is a time.
+NOT_A_TIME = re.compile(r"(?<!quarter )\b(after|before|between|until|till|not|can t|cant|cannot|don t|dont|"
+                        r"despues|antes|entre|hasta|no puedo)\b")
+
+# Hours that can only mean the afternoon when a caller leaves out am/pm,
+# appointments run from 9:00 AM to 5:00 PM
+BUSINESS_PM_HOURS = range(1, 9)
+
+
+def today_in_pst():
+    return datetime.now(PST).date()
+
+
+def normalize(text):
+    """
+    Lowercase, strip accents and punctuation, and write numbers as digits.
+    """
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = text.replace("a.m.", "am").replace("p.m.", "pm")
+    text = re.sub(r"[^\w:/\- ]", " ", text)
+    text = ORDINAL_PRONOUN.sub("", text)
+    text = PRONOUN_ONE.sub(r"\1", text)
+    text = COMPOUND_NUMBER.sub(lambda match: str(
+        NUMBER_WORDS[match.group(1)] + {**NUMBER_WORDS, **ORDINAL_WORDS}[match.group(2)]), text)
+    text = ORDINAL_AFTER_THE.sub(lambda match: f"{match.group(1)} {ORDINAL_WORDS[match.group(2)]}", text)
+    text = ORDINAL_BEFORE_MONTH.sub(lambda match: str(ORDINAL_WORDS[match.group(1)]), text)
+    text = ORDINAL_AFTER_MONTH.sub(lambda match: f"{match.group(1)} {ORDINAL_WORDS[match.group(2)]}", text)
+    text = SINGLE_NUMBER.sub(lambda match: str(NUMBER_WORDS[match.group(1)]), text)
+    text = ORDINAL_SUFFIX.sub(r"\1", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def upcoming(month, day, today, year=None):
+    """
+    The given month and day in year, or the soonest one from today on.
+    """
+    try:
+        if year is not None:
+            return date(year, month, day)
+        candidate = date(today.year, month, day)
+        if candidate < today:
+            candidate = date(today.year + 1, month, day)
+        return candidate
+    except ValueError:
+        return None
+
+
+def parse_year(value):
+    if value is None:
+        return None
+    year = int(value)
+    return year + 2000 if year < 100 else year
+
+
+def next_weekday(weekday, today):
+    """
+    The next date falling on weekday, after today.
+    """
+    days_ahead = (weekday - today.weekday()) % 7 or 7
+    return today + timedelta(days=days_ahead)
+
+
+def parse_date(text, today=None):
+    """
+    Return the date a caller asked for, or None if there is no clear date.
+    Dates without a year are the soonest matching date from today on.
+    """
+    today = today or today_in_pst()
+    text = normalize(text)
+    if NOT_A_DATE.search(text):
+        return None
+    found = set()
+
+    match = ISO_DATE.search(text)
+    if match:
+        try:
+            found.add(date(int(match.group(1)), int(match.group(2)), int(match.group(3))))
+        except ValueError:
+            return None
+
+    for match in MONTH_DAY.finditer(text):
+        found.add(upcoming(MONTHS[match.group(1)], int(match.group(2)), today, parse_year(match.group(3))))
+    for match in DAY_MONTH.finditer(text):
+        found.add(upcoming(MONTHS[match.group(2)], int(match.group(1)), today, parse_year(match.group(3))))
+
+    match = NUMERIC_DATE.search(text)
+    if match and not found:
+        found.add(upcoming(int(match.group(1)), int(match.group(2)), today, parse_year(match.group(3))))
+
+    if not found:
+        match = DAY_ONLY.search(text) or WEEKDAY_DAY.search(text)
+        if match:
+            day = int(match.group(1))
+            candidate = upcoming(today.month, day, today)
+            if candidate is None or candidate.year != today.year or candidate.month != today.month:
+                month = today.month % 12 + 1
+                candidate = upcoming(month, day, today)
+            found.add(candidate)
+
+    weekdays = {WEEKDAYS[match.group(2)] for match in WEEKDAY.finditer(text)}
+    if len(weekdays) > 1:
+        return None
+    if weekdays:
+        weekday = weekdays.pop()
+        if found:
+            # "Tuesday March 5th" must agree with itself
+            return found.pop() if len(found) == 1 and None not in found and \
+                next(iter(found)).weekday() == weekday else None
+        found.add(next_weekday(weekday, today))
+
+    for pattern, offset in RELATIVE_DAYS:
+        if pattern.search(text):
+            found.add(today + timedelta(days=offset))
+            break
+
+    match = IN_DAYS.search(text)
+    if match:
+        found.add(today + timedelta(days=int(match.group(1))))
+
+    if len(found) != 1 or None in found:
+        return None
+    return found.pop()
+
+
+def parse_weekday(text):
+    """
+    Return the English name of the single weekday mentioned, or None.
+    """
+    weekdays = {WEEKDAYS[match.group(2)] for match in WEEKDAY.finditer(normalize(text))}
+    if len(weekdays) != 1:
+        return None
+    return WEEKDAY_NAMES[weekdays.pop()]
+
+
+def to_time(hour, minute, text):
+    """
+    Build a time from a spoken hour, using am/pm words or business hours to
+    place hours from 1 to 12.
+    """
+    if not (0 <= hour <= 23 and 0 <= minute <= 59):
+        return None
+    if hour <= 12:
+        if AFTERNOON.search(text):
+            hour = hour % 12 + 12
+        elif MORNING.search(text):
+            hour = hour % 12
+        elif hour in BUSINESS_PM_HOURS:
+            hour += 12
+    return time(hour, minute)
+
+
+def parse_time(text):
+    """
+    Return the time a caller asked for, or None if there is no clear time.
+    """
+    text = normalize(text)
+    if ALTERNATIVES.search(text) or NOT_A_TIME.search(text):
+        return None
+    found = {}
+
+    def add(match, hour, minute):
+        found[match.span()] = to_time(hour, minute, text)
+
+    for match in NOON.finditer(text):
+        found[match.span()] = time(12, 0)
+
+    for match in CLOCK_TIME.finditer(text):
+        add(match, int(match.group(1)), int(match.group(2)))
+    for match in HALF_PAST.finditer(text):
+        add(match, int(match.group(1)), 30)
+    for match in QUARTER_PAST.finditer(text):
+        add(match, int(match.group(1)), 15)
+    for match in QUARTER_TO.finditer(text):
+        add(match, int(match.group(1)) - 1, 45)
+    for match in SPANISH_FRACTION.finditer(text):
+        add(match, int(match.group(1)), 30 if match.group(2) == "media" else 15)
+    for match in SPANISH_MINUS.finditer(text):
+        minutes = 15 if match.group(2) == "cuarto" else int(match.group(2))
+        add(match, int(match.group(1)) - 1, 60 - minutes)
+    if not found:
+        for match in SPANISH_MINUTES.finditer(text):
+            add(match, int(match.group(1)), int(match.group(2)))
+    if not found:
+        # "ten thirty", "2 45 pm"
+        for match in HOUR_MINUTE.finditer(text):
+            if int(match.group(2)) % 5 == 0:
+                add(match, int(match.group(1)), int(match.group(2)))
+    if not found:
+        for match in HOUR_ONLY.finditer(text):
+            add(match, int(match.group(1)), 0)
+
+    # Any number left over, "I get off at 5 so 6", leaves the time unclear
+    rest = text
+    for start, end in found:
+        rest = rest[:start] + " " * (end - start) + rest[end:]
+    if re.search(r"\d", rest):
+        return None
+    found = set(found.values())
+    if len(found) != 1 or None in found:
+        return None
+    return found.pop()
+
+
+def format_time(value):
+    """
+    Format a time the way the views expect it, like 4:59 PM.
+    """
+    return value.strftime("%I:%M %p").lstrip("0")
+
+
+def load_corpus(path=CORPUS_PATH):
+    """
+    Read the labeled corpus, {"today", "cases"} where every case has a text,
+    a kind of date or time and the expected ISO value, null when the answer
+    needs GPT.
+    """
+    with open(path, encoding="utf-8") as corpus_file:
+        corpus = json.load(corpus_file)
+    return date.fromisoformat(corpus["today"]), corpus["cases"]
+
+
+def parse_case(case, today):
+    """
+    Parse a corpus case into an ISO string like its expected value.
+    """
+    if case["kind"] == "date":
+        value = parse_date(case["text"], today=today)
+        return value.isoformat() if value else None
+    value = parse_time(case["text"])
+    return value.strftime("%H:%M") if value else None
@@ -0,0 +1,28 @@
+"""
+Run the independent remote calls of one webhook hop at the same time.
+
+A hop that translates two strings, or asks GPT for the caller's sentiment
+while it looks up availability, used to wait for each call in turn. Calls
+handed to run_concurrently overlap, so the hop takes as long as the slowest
+call instead of the sum of them. The first call runs in the calling thread,
+the others in a small pool shared by the whole process. Only the first call
+may use the database, the pool threads have their own connections.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+_executor = ThreadPoolExecutor(max_workers=settings.FAN_OUT_THREADS, thread_name_prefix="fan-out")
+
+
+def run_concurrently(*calls):
+    """
+    Call each function without arguments and return their results in order.
+    An exception raised by any call is raised again here.
+    """
+    if len(calls) < 2:
+        return [call() for call in calls]
+    futures = [_executor.submit(contextvars.copy_context().run, call) for call in calls[1:]]
+    first = calls[0]()
+    return [first, *(future.result() for future in futures)]
@@ -0,0 +1,244 @@
+"""
+Local semantic index over the FAQ questions.
+
+Questions are turned into sparse TF-IDF vectors built from words, word pairs
+and character trigrams (so small speech-to-text errors still overlap), then
+normalized so a dot product is the cosine similarity. Matching a caller's
+question is a lookup in an inverted index and takes well under a millisecond,
+which keeps GPT out of the webhook path for most FAQ questions.
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import FAQ
+
+# Always matchable, mirrors the extra option given to GPT in get_matching_question
+OPERATOR_QUESTION = "Can I speak to an operator?"
+OPERATOR_KEY = "operator"
+
+# Feature type weights, whole words carry more meaning than trigrams
+WORD_WEIGHT = 1.0
+BIGRAM_WEIGHT = 0.8
+TRIGRAM_WEIGHT = 0.3
+
+STOP_WORDS = {
+    "a", "an", "the", "is", "are", "am", "was", "were", "be", "do", "does",
+    "did", "i", "you", "we", "me", "my", "your", "our", "it", "to", "of",
+    "for", "in", "on", "at", "and", "or", "can", "could", "would", "will",
+    "please", "hi", "hello", "um", "uh", "so", "that", "this", "there",
+}
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def extract_features(text):
+    """
+    Break text into a Counter of weighted word, word pair and character
+    trigram features.
+    """
+    words = [word for word in WORD_PATTERN.findall(text.lower())
+             if word not in STOP_WORDS]
+    features = Counter()
+
+    for word in words:
+        features[f"w:{word}"] += WORD_WEIGHT
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            features[f"c:{padded[i:i + 3]}"] += TRIGRAM_WEIGHT
+
+    for first, second in zip(words, words[1:]):
+        features[f"b:{first} {second}"] += BIGRAM_WEIGHT
+
+    return features
+
+
+def dampen(weight):
+    """
+    Sublinear term frequency so repeated words do not dominate a question.
+    """
+    return 1 + math.log(weight) if weight >= 1 else weight
+
+
+class FAQIndex:
+    """
+    In-memory cosine similarity index over FAQ questions.
+
+    The index is built lazily on first use and kept current incrementally
+    through add_or_update/remove (wired to FAQ save and delete signals). Other
+    worker processes notice changes through a cheap signature query on the
+    FAQ table and rebuild themselves. The query runs at most once every
+    FAQ_INDEX_CHECK_SECONDS, not on every search.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._questions = {}     # key -> question text
+        self._features = {}      # key -> raw feature Counter
+        self._doc_freq = Counter()
+        self._postings = None    # feature -> [(key, weight)], rebuilt lazily
+        self._idf = {}
+        self._signature = None
+        self._checked_at = None  # time.monotonic() of the last signature check
+
+    SIGNATURE = {"count": Count("id"), "last_id": Max("id"), "last_update": Max("updated_at")}
+
+    @classmethod
+    def current_signature(cls):
+        """
+        Summarize the FAQ table so stale indexes can be detected cheaply.
+        """
+        stats = FAQ.objects.aggregate(**cls.SIGNATURE)
+        return (stats["count"], stats["last_id"], stats["last_update"])
+
+    @classmethod
+    async def acurrent_signature(cls):
+        stats = await FAQ.objects.aaggregate(**cls.SIGNATURE)
+        return (stats["count"], stats["last_id"], stats["last_update"])
+
+    def check_due(self):
+        return (self._signature is None or self._checked_at is None
+                or time.monotonic() - self._checked_at >= settings.FAQ_INDEX_CHECK_SECONDS)
+
+    def build(self):
+        """
+        Rebuild the whole index from the FAQ table.
+        """
+        with self._lock:
+            self._questions = {}
+            self._features = {}
+            self._doc_freq = Counter()
+            for faq_id, question in FAQ.objects.values_list("id", "question"):
+                self._add(faq_id, question)
+            self._add(OPERATOR_KEY, OPERATOR_QUESTION)
+            self._postings = None
+            self._signature = self.current_signature()
+            self._checked_at = time.monotonic()
+
+    def ensure_current(self):
+        """
+        Build the index if it has not been built yet or the FAQ table was
+        changed by another process.
+        """
+        if not self.check_due():
+            return
+        if self._signature is None or self._signature != self.current_signature():
+            self.build()
+        self._checked_at = time.monotonic()
+
+    async def aensure_current(self):
+        """
+        Async version of ensure_current
+        """
+        if not self.check_due():
+            return
+        if self._signature is None or self._signature != await self.acurrent_signature():
+            await sync_to_async(self.build)()
+        self._checked_at = time.monotonic()
+
+    def add_or_update(self, faq_id, question):
+        """
+        Insert or replace a single FAQ question in the index.
+        """
+        with self._lock:
+            # Nothing to update until the index is first built
+            if self._signature is None:
+                return
+            self._remove(faq_id)
+            self._add(faq_id, question)
+            self._postings = None
+            self._signature = self.current_signature()
+
+    def remove(self, faq_id):
+        """
+        Remove a single FAQ question from the index.
+        """
+        with self._lock:
+            if self._signature is None:
+                return
+            self._remove(faq_id)
+            self._postings = None
+            self._signature = self.current_signature()
+
+    def search(self, text, k=3, check=True):
+        """
+        Return up to k (question, confidence) pairs ordered from best to
+        worst match. Confidence is the cosine similarity between 0 and 1.
+        Callers that just ran aensure_current pass check=False.
+        """
+        if check:
+            self.ensure_current()
+        with self._lock:
+            if self._postings is None:
+                self._rebuild_postings()
+            postings = self._postings
+            idf = self._idf
+            questions = self._questions
+
+        # Words never seen in any question still count against the match
+        unseen_idf = math.log(len(questions) + 1) + 1
+        query = {feature: dampen(weight) * idf.get(feature, unseen_idf)
+                 for feature, weight in extract_features(text).items()}
+        norm = math.sqrt(sum(value * value for value in query.values()))
+        if not norm:
+            return []
+
+        scores = defaultdict(float)
+        for feature, weight in query.items():
+            for key, doc_weight in postings.get(feature, ()):
+                scores[key] += (weight / norm) * doc_weight
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(questions[key], min(score, 1.0)) for key, score in best]
+
+    def best_match(self, text, check=True):
+        """
+        Return the closest question and its confidence, or (None, 0.0) when
+        nothing in the index overlaps with the text.
+        """
+        results = self.search(text, k=1, check=check)
+        if not results:
+            return None, 0.0
+        return results[0]
+
+    def _add(self, key, question):
+        features = extract_features(question)
+        self._questions[key] = question
+        self._features[key] = features
+        self._doc_freq.update(features.keys())
+
+    def _remove(self, key):
+        features = self._features.pop(key, None)
+        self._questions.pop(key, None)
+        if features:
+            self._doc_freq.subtract(features.keys())
+            self._doc_freq += Counter()  # Drop features no longer in use
+
+    def _rebuild_postings(self):
+        """
+        Recompute idf weights and the normalized document vectors. Only runs
+        after the index changed, not on every search.
+        """
+        total = len(self._features)
+        self._idf = {feature: math.log((total + 1) / (freq + 1)) + 1
+                     for feature, freq in self._doc_freq.items()}
+        postings = defaultdict(list)
+        for key, features in self._features.items():
+            vector = {feature: dampen(weight) * self._idf[feature]
+                      for feature, weight in features.items()}
+            norm = math.sqrt(sum(value * value for value in vector.values()))
+            if not norm:
+                continue
+            for feature, value in vector.items():
+                postings[feature].append((key, value / norm))
+        self._postings = postings
+
+
+# Shared index for the process
+faq_index = FAQIndex()
@@ -0,0 +1,107 @@
+"""
+Bulk export of call logs as CSV or NDJSON, for grant reporting.
+
+Logs are read in id order with iterator(chunk_size=...), a server-side cursor
+on PostgreSQL, and written out a chunk at a time, so memory stays flat however
+many logs match. Transcripts and intents are only selected when asked for,
+archived transcripts are read back from the call archive.
+The export_logs view streams the same chunks the export_logs command writes.
+"""
+import csv
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import archive
+from .availability import day_range
+
+FORMATS = ("csv", "ndjson")
+
+FIELDS = ("id", "call_sid", "phone_number", "time_started", "time_ended", "length_of_call",
+          "language", "forwarded", "forwarded_reason", "total_strikes")
+
+CHUNK_SIZE = 2000
+
+
+def filter_logs(queryset, start=None, end=None, language=None, forwarded=None):
+    """
+    Logs started from the day start through the day end, either may be left
+    open, in a language and forwarded or not.
+    """
+    if start:
+        queryset = queryset.filter(time_started__gte=day_range(start, field="time_started")["time_started__gte"])
+    if end:
+        queryset = queryset.filter(time_started__lt=day_range(end, field="time_started")["time_started__lt"])
+    if language:
+        queryset = queryset.filter(language=language)
+    if forwarded is not None:
+        queryset = queryset.filter(forwarded=forwarded)
+    return queryset
+
+
+def export_fields(transcripts=False, intents=False):
+    return FIELDS + ("intents",) * intents + ("transcript",) * transcripts
+
+
+def export_rows(queryset, fields, chunk_size=CHUNK_SIZE):
+    """
+    A dict of fields for every log in queryset, fetched chunk_size at a time.
+    Archived transcripts are read from the archive.
+    """
+    if "transcript" not in fields:
+        yield from queryset.order_by("id").values(*fields).iterator(chunk_size=chunk_size)
+        return
+    for row in queryset.order_by("id").values(*fields, "archive").iterator(chunk_size=chunk_size):
+        path = row.pop("archive")
+        if path:
+            row["transcript"] = archive.archived_transcript(row["id"], path)
+        yield row
+
+
+def encode(value):
+    """
+    A value as text for CSV, JSON columns are written as JSON.
+    """
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if value is None:
+        return ""
+    return str(value)
+
+
+def export_chunks(queryset, format="csv", transcripts=False, intents=False, chunk_size=CHUNK_SIZE):
+    """
+    The export of queryset as strings of up to chunk_size lines each, CSV
+    starting with a header line.
+    """
+    fields = export_fields(transcripts, intents)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == "csv":
+        writer.writerow(fields)
+
+    for count, row in enumerate(export_rows(queryset, fields, chunk_size), start=1):
+        if format == "csv":
+            writer.writerow([encode(row[field]) for field in fields])
+        else:
+            buffer.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n")
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def aexport_chunks(chunks):
+    """
+    export_chunks for an ASGI response. Each chunk is read in Django's sync
+    thread, where the cursor lives, rather than the whole export up front.
+    """
+    done = object()
+    next_chunk = sync_to_async(next)
+    while (chunk := await next_chunk(chunks, done)) is not done:
+        yield chunk
@@ -0,0 +1,155 @@
+"""
+Searching and paging through call logs for the audit log pages.
+
+Pages are read with keyset pagination on (time_started, id): a page starts
+after or before the last log shown, so the 1000th page costs the same index
+range scan as the first rather than an OFFSET over every log before it. The
+cursors are opaque strings in the page links.
+
+Search matches phone numbers and the message text of transcripts. On
+PostgreSQL the same expression is indexed with a pg_trgm GIN index (see
+migration 0030), so a substring search is an index lookup. Other databases
+fall back to scanning phone numbers and the raw transcript JSON.
+
+List pages read LogSummary rows of only the columns they show, a transcript
+can run to hundreds of messages and is never loaded or deserialized for a
+list. Counting every matching log is a full scan as well. On PostgreSQL the
+planner's row estimate is shown instead once it passes
+AUDIT_LOG_EXACT_COUNT_LIMIT.
+"""
+import json
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+PAGE_SIZE = 10
+
+# Phone number and transcript messages as one string, the migration indexes
+# exactly this expression so it must not change on its own
+SEARCH_DOCUMENT = ("(coalesce(phone_number, '') || ' ' || "
+                   "coalesce(jsonb_path_query_array(transcript, '$[*].message')::text, ''))")
+
+NEWEST_FIRST = ("-time_started", "-id")
+OLDEST_FIRST = ("time_started", "id")
+
+
+class LogSummary(NamedTuple):
+    """
+    The columns of a log shown in lists, without its transcript, intents or audio.
+    """
+    id: int
+    phone_number: str
+    time_started: datetime
+    length_of_call: timedelta
+    language: str
+    forwarded: bool
+
+
+def summaries(queryset):
+    """
+    LogSummary rows of queryset, reading only their columns.
+    """
+    return [LogSummary._make(row) for row in queryset.values_list(*LogSummary._fields)]
+
+
+def search(queryset, query):
+    """
+    Logs whose phone number or transcript contains query, ignoring case.
+    """
+    if connection.vendor == "postgresql":
+        pattern = f"%{connection.ops.prep_for_like_query(query)}%"
+        return queryset.filter(RawSQL(f"{SEARCH_DOCUMENT} ILIKE %s", (pattern,),
+                                      output_field=BooleanField()))
+    return queryset.filter(Q(phone_number__icontains=query) | Q(transcript__icontains=query))
+
+
+def encode_cursor(log):
+    return urlsafe_base64_encode(f"{log.time_started.isoformat()}|{log.id}".encode())
+
+
+def decode_cursor(cursor):
+    """
+    The (time_started, id) a cursor points at, or None if it is not valid.
+    """
+    try:
+        time_started, log_id = force_str(urlsafe_base64_decode(cursor)).split("|")
+        return datetime.fromisoformat(time_started), int(log_id)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    """
+    One page of LogSummary rows, newest first, with cursors for the pages
+    around it.
+    """
+
+    def __init__(self, logs, has_previous, has_next):
+        self.logs = logs
+        self.has_previous = has_previous
+        self.has_next = has_next
+
+    def __iter__(self):
+        return iter(self.logs)
+
+    def __len__(self):
+        return len(self.logs)
+
+    @property
+    def previous_cursor(self):
+        return encode_cursor(self.logs[0]) if self.has_previous and self.logs else None
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.logs[-1]) if self.has_next and self.logs else None
+
+
+def keyset_page(queryset, after=None, before=None, last=False, page_size=PAGE_SIZE):
+    """
+    The page of queryset following the log at cursor after, the page
+    preceding the log at cursor before, the last page, or else the first.
+    An extra log is read to tell whether there is a page beyond.
+    """
+    after = decode_cursor(after) if after else None
+    before = decode_cursor(before) if before else None
+
+    if after:
+        time_started, log_id = after
+        logs = summaries(queryset.filter(Q(time_started__lt=time_started)
+                                         | Q(time_started=time_started, id__lt=log_id))
+                         .order_by(*NEWEST_FIRST)[:page_size + 1])
+        return KeysetPage(logs[:page_size], True, len(logs) > page_size)
+
+    if before or last:
+        if before:
+            time_started, log_id = before
+            queryset = queryset.filter(Q(time_started__gt=time_started)
+                                       | Q(time_started=time_started, id__gt=log_id))
+        logs = summaries(queryset.order_by(*OLDEST_FIRST)[:page_size + 1])
+        return KeysetPage(logs[:page_size][::-1], len(logs) > page_size, bool(before))
+
+    logs = summaries(queryset.order_by(*NEWEST_FIRST)[:page_size + 1])
+    return KeysetPage(logs[:page_size], False, len(logs) > page_size)
+
+
+def estimated_count(queryset):
+    """
+    The number of logs in queryset and whether it is an estimate. PostgreSQL
+    counts exactly only when the planner expects few enough rows.
+    """
+    queryset = queryset.order_by()
+    if connection.vendor == "postgresql":
+        plan = json.loads(queryset.explain(format="json"))
+        # Depending on the driver the plan comes back as a list of one plan
+        if isinstance(plan, list):
+            plan = plan[0]
+        rows = int(plan["Plan"]["Plan Rows"])
+        if rows > settings.AUDIT_LOG_EXACT_COUNT_LIMIT:
+            return rows, True
+    return queryset.count(), False
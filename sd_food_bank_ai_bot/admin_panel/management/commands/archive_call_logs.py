@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from admin_panel import archive
+
+
+class Command(BaseCommand):
+    help = ("Move the transcripts of calls older than CALL_ARCHIVE_AFTER_DAYS out of the Log table "
+            "into gzipped NDJSON files under MEDIA_ROOT, one per day. Archived calls still open "
+            "in the audit logs and exports. On PostgreSQL, VACUUM the table afterwards to "
+            "reclaim the space.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.CALL_ARCHIVE_AFTER_DAYS,
+                            help="Archive calls started more than this many days ago.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Report how many calls would be archived without moving them.")
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            self.stdout.write(f"Would archive {archive.archivable(options['days']).count()} calls.")
+            return
+        archived = archive.archive_logs(options["days"])
+        self.stdout.write(f"Archived {archived} calls older than {options['days']} days.")
@@ -0,0 +1,52 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from admin_panel.clients import get_twilio_client
+from admin_panel.models import Log
+
+
+class Command(BaseCommand):
+    help = ("Fill in the CallSid of logs recorded before it was stored, by matching each log "
+            "to the inbound Twilio call from the same number that started closest to it.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30,
+                            help="Only backfill logs started in the last this many days.")
+        parser.add_argument("--tolerance", type=int, default=120,
+                            help="Most seconds between a call's start and its log's start.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Report matches without saving them.")
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options["days"])
+        tolerance = timedelta(seconds=options["tolerance"])
+        logs = list(Log.objects.filter(call_sid__isnull=True, time_started__gte=since)
+                    .order_by("time_started").only("id", "phone_number", "time_started"))
+        if not logs:
+            self.stdout.write("No logs without a CallSid.")
+            return
+
+        used = set(Log.objects.filter(call_sid__isnull=False).values_list("call_sid", flat=True))
+        calls_by_number = defaultdict(list)
+        for call in get_twilio_client().calls.list(start_time_after=since - tolerance):
+            if call.direction == "inbound" and call.sid not in used and call.start_time:
+                calls_by_number[call.from_].append(call)
+
+        matched = 0
+        for log in logs:
+            candidates = [call for call in calls_by_number.get(log.phone_number, ())
+                          if call.sid not in used and abs(call.start_time - log.time_started) <= tolerance]
+            if not candidates:
+                continue
+            call = min(candidates, key=lambda call: abs(call.start_time - log.time_started))
+            used.add(call.sid)
+            matched += 1
+            if not options["dry_run"]:
+                # Avoid Log.save(), only the CallSid changes
+                Log.objects.filter(pk=log.pk).update(call_sid=call.sid)
+
+        verb = "Would match" if options["dry_run"] else "Matched"
+        self.stdout.write(f"{verb} {matched} of {len(logs)} logs to Twilio calls.")
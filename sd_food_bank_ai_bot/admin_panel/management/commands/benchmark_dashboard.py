@@ -0,0 +1,102 @@
+import random
+import time
+import tracemalloc
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from admin_panel.models import Log
+from admin_panel.views.monitoring_page import dashboard_metrics
+from admin_panel.stats import percentile
+
+# Numbers reserved for benchmark calls, removed again after the run
+PHONE_PREFIX = "+1555018"
+QUESTIONS = ["What are your hours?", "Where are you located?", "Do I need an ID?",
+             "Can I pick up for a neighbor?", "Do you deliver?"]
+
+
+def synthetic_log(index, now):
+    """
+    A closed call from the last year with a realistic mix of intents.
+    """
+    intents = random.choice([
+        {"faq": {random.choice(QUESTIONS): random.randint(1, 3)}},
+        {"schedule": 1},
+        {"reschedule": 1, "faq": {random.choice(QUESTIONS): 1}},
+        {"cancel": 1},
+        {},
+    ])
+    forwarded = random.random() < 0.1
+    time_started = now - timedelta(minutes=random.randint(0, 365 * 24 * 60))
+    length_of_call = timedelta(seconds=random.randint(20, 600))
+    return Log(phone_number=f"{PHONE_PREFIX}{index:07d}",
+               time_started=time_started, time_ended=time_started + length_of_call,
+               length_of_call=length_of_call,
+               language=random.choice(["en", "en", "es"]), intents=intents,
+               forwarded=forwarded, forwarded_reason=random.choice(["caller", "auto"]) if forwarded else None)
+
+
+class Command(BaseCommand):
+    help = ("Time the monitoring dashboard and measure its peak memory as the call history grows. "
+            "Adds synthetic call logs, rebuilds the rollups at every size and removes the logs "
+            "again afterwards, run it against a development database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logs", default="10000,100000,1000000",
+                            help="Comma separated numbers of logs to measure at.")
+        parser.add_argument("--repeat", type=int, default=20,
+                            help="Dashboard loads timed per granularity at every size.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options["logs"].split(","))
+        now = timezone.now()
+        created = 0
+        try:
+            for size in sizes:
+                created = self.add_logs(created, size, now, options["batch_size"])
+                start = time.perf_counter()
+                call_command("rebuild_call_rollups", stdout=StringIO())
+                rebuild = time.perf_counter() - start
+                timings, peak = self.measure(options["repeat"])
+                self.stdout.write(f"{size} logs: rebuild {rebuild:.1f} s, dashboard p50/max "
+                                  f"{percentile(timings, 0.5):.1f}/{max(timings):.1f} ms, "
+                                  f"peak memory {peak / 1024:.0f} KiB")
+        finally:
+            while Log.objects.filter(phone_number__startswith=PHONE_PREFIX).exists():
+                ids = Log.objects.filter(phone_number__startswith=PHONE_PREFIX) \
+                    .values_list("id", flat=True)[:options["batch_size"]]
+                Log.objects.filter(id__in=list(ids)).delete()
+            call_command("rebuild_call_rollups", stdout=StringIO())
+
+    def add_logs(self, created, size, now, batch_size):
+        # time_started is set to now on create otherwise
+        with mock.patch.object(Log._meta.get_field("time_started"), "auto_now_add", False):
+            while created < size:
+                count = min(batch_size, size - created)
+                Log.objects.bulk_create([synthetic_log(created + i, now) for i in range(count)])
+                created += count
+        return created
+
+    def measure(self, repeat):
+        """
+        Milliseconds of every dashboard load, and the peak memory of one.
+        """
+        timings = []
+        for _ in range(repeat):
+            for granularity in ("year", "month", "day"):
+                start = time.perf_counter()
+                dashboard_metrics(granularity, "All")
+                timings.append((time.perf_counter() - start) * 1000)
+
+        tracemalloc.start()
+        try:
+            dashboard_metrics("year", "All")
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return timings, peak
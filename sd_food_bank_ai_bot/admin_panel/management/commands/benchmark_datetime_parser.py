@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from admin_panel.datetime_parser import load_corpus, parse_case
+from admin_panel.stats import percentile
+
+
+class Command(BaseCommand):
+    help = ("Replay the labeled date and time corpus through the local parser and "
+            "report how many scheduling answers skip GPT and how fast they are parsed.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=200,
+                            help="Times each utterance is parsed when timing.")
+        parser.add_argument("--llm-latency-ms", type=float, default=700.0,
+                            help="Assumed GPT round trip for every answer parsed locally.")
+
+    def handle(self, *args, **options):
+        today, cases = load_corpus()
+        parseable = [case for case in cases if case["expected"] is not None]
+
+        resolved = correct = wrongly_resolved_unclear = 0
+        local_us = []
+        for case in cases:
+            start = time.perf_counter()
+            for _ in range(options["repeat"]):
+                value = parse_case(case, today)
+            local_us.append((time.perf_counter() - start) * 1_000_000 / options["repeat"])
+
+            if value is None:
+                continue
+            resolved += 1
+            if case["expected"] is None:
+                wrongly_resolved_unclear += 1
+            elif value == case["expected"]:
+                correct += 1
+
+        labeled_resolved = resolved - wrongly_resolved_unclear
+        self.stdout.write(f"Utterances: {len(cases)} ({len(parseable)} with a date or time)")
+        self.stdout.write(f"Resolved locally: {resolved} ({resolved / len(cases):.1%})")
+        self.stdout.write(f"Coverage of parseable answers: {labeled_resolved / len(parseable):.1%}")
+        self.stdout.write(f"Accuracy when resolved: {correct / labeled_resolved if labeled_resolved else 0:.1%}")
+        self.stdout.write(f"Unclear answers resolved locally: {wrongly_resolved_unclear}")
+        self.stdout.write(f"Local parser p50/p95: {percentile(local_us, 0.5):.1f}/"
+                          f"{percentile(local_us, 0.95):.1f} us")
+        self.stdout.write(f"GPT time saved: {resolved * options['llm_latency_ms'] / 1000:.1f} s "
+                          f"over {len(cases)} answers")
@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from admin_panel.clients import get_openai_client
+from admin_panel.sentiment import SentimentModel, classify, load_corpus
+from admin_panel.stats import percentile
+from sd_food_bank_ai_bot.settings import SENTIMENT_LOCAL_THRESHOLD
+
+
+class Command(BaseCommand):
+    help = ("Replay the labeled sentiment corpus through the local classifier and "
+            "report how many confirmations skip GPT and the latency saved per hop.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=200,
+                            help="Times each utterance is classified when timing.")
+        parser.add_argument("--holdout", type=int, default=5,
+                            help="Evaluate on every Nth example with a model trained on the rest, 0 to use the shipped model.")
+        parser.add_argument("--llm-latency-ms", type=float, default=700.0,
+                            help="Assumed GPT round trip when --live is not given.")
+        parser.add_argument("--live", action="store_true",
+                            help="Time a real GPT request for every utterance.")
+
+    def handle(self, *args, **options):
+        corpus = load_corpus()
+        model = None
+        if options["holdout"]:
+            step = options["holdout"]
+            training = [(entry["text"], entry["label"]) for index, entry in enumerate(corpus)
+                        if index % step and entry["label"] is not None]
+            model = SentimentModel.train(training)
+            corpus = corpus[::step]
+
+        resolved = correct = wrongly_resolved_unclear = 0
+        local_ms, saved_ms = [], []
+        for entry in corpus:
+            start = time.perf_counter()
+            for _ in range(options["repeat"]):
+                label, confidence = classify(entry["text"], model=model)
+            elapsed = (time.perf_counter() - start) * 1000 / options["repeat"]
+            local_ms.append(elapsed)
+
+            llm_ms = self.time_llm(entry["text"]) if options["live"] else options["llm_latency_ms"]
+            if label is not None and confidence >= SENTIMENT_LOCAL_THRESHOLD:
+                resolved += 1
+                saved_ms.append(llm_ms - elapsed)
+                if entry["label"] is None:
+                    wrongly_resolved_unclear += 1
+                elif label == entry["label"]:
+                    correct += 1
+            else:
+                # Deferred answers pay for the local attempt as well
+                saved_ms.append(-elapsed)
+
+        total = len(corpus)
+        labeled_resolved = resolved - wrongly_resolved_unclear
+        self.stdout.write(f"Utterances: {total}")
+        self.stdout.write(f"Resolved locally: {resolved} ({resolved / total:.1%})")
+        self.stdout.write(f"Accuracy when resolved: {correct / labeled_resolved if labeled_resolved else 0:.1%}")
+        self.stdout.write(f"Unclear answers resolved locally: {wrongly_resolved_unclear}")
+        self.stdout.write(f"Local classifier p50/p95: {percentile(local_ms, 0.5) * 1000:.1f}/"
+                          f"{percentile(local_ms, 0.95) * 1000:.1f} us")
+        self.stdout.write(f"Saved per hop p50/p95: {percentile(saved_ms, 0.5):.1f}/"
+                          f"{percentile(saved_ms, 0.95):.1f} ms")
+
+    def time_llm(self, text):
+        client = get_openai_client()
+        start = time.perf_counter()
+        client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": "Based on the following message, respond if it is AFFIRMATIVE or NEGATIVE."},
+                {"role": "user", "content": text}
+            ]
+        )
+        return (time.perf_counter() - start) * 1000
@@ -0,0 +1,70 @@
+import html
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_panel.clients import get_translate_client
+from admin_panel.prompt_catalog import CATALOG_PATH, collect_fixed_prompts, load_catalog
+from admin_panel.translation_cache import placeholders, protect_placeholders, restore_placeholders
+
+
+class Command(BaseCommand):
+    help = ("Translate the fixed prompts used in the phone service views and "
+            "store them in the prompt catalog.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true",
+                            help="Only report prompts missing from the catalog.")
+        parser.add_argument("--prune", action="store_true",
+                            help="Remove catalog entries no longer used by the views.")
+        parser.add_argument("--retranslate", action="store_true",
+                            help="Translate every prompt again, replacing existing entries.")
+
+    def handle(self, *args, **options):
+        catalog = load_catalog(CATALOG_PATH)
+        prompts = collect_fixed_prompts()
+        missing = sorted(prompt for prompt in prompts if options["retranslate"]
+                         or prompt[2] not in catalog.get(f"{prompt[0]}:{prompt[1]}", {}))
+
+        if options["check"]:
+            for source_lang, target_lang, text in missing:
+                self.stdout.write(f"Missing {source_lang}:{target_lang}: {text}")
+            if missing:
+                raise CommandError(f"{len(missing)} prompt(s) missing from the catalog")
+            self.stdout.write(self.style.SUCCESS("Prompt catalog is complete"))
+            return
+
+        if missing:
+            translate_client = get_translate_client()
+            for source_lang, target_lang, text in missing:
+                if placeholders(text):
+                    # Keep template placeholders out of the translation
+                    result = translate_client.translate(protect_placeholders(text), target_language=target_lang,
+                                                        source_language=source_lang, format_="html")
+                    translation = html.unescape(restore_placeholders(result["translatedText"]))
+                    if placeholders(translation) != placeholders(text):
+                        self.stderr.write(f"Skipping {text}: placeholders were not preserved")
+                        continue
+                else:
+                    result = translate_client.translate(text, target_language=target_lang,
+                                                        source_language=source_lang)
+                    translation = result["translatedText"]
+                catalog.setdefault(f"{source_lang}:{target_lang}", {})[text] = translation
+
+        if options["prune"]:
+            used = {}
+            for source_lang, target_lang, text in prompts:
+                used.setdefault(f"{source_lang}:{target_lang}", set()).add(text)
+            catalog = {pair: {text: translation for text, translation in entries.items()
+                              if text in used.get(pair, ())}
+                       for pair, entries in catalog.items()}
+
+        catalog = {pair: dict(sorted(entries.items()))
+                   for pair, entries in sorted(catalog.items()) if entries}
+        with open(CATALOG_PATH, "w", encoding="utf-8") as catalog_file:
+            json.dump(catalog, catalog_file, ensure_ascii=False, indent=2)
+            catalog_file.write("\n")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Translated {len(missing)} prompt(s), catalog has "
+            f"{sum(len(entries) for entries in catalog.values())} entries"))
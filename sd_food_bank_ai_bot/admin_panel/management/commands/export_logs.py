@@ -0,0 +1,44 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_panel import log_export
+from admin_panel.models import Log
+
+
+class Command(BaseCommand):
+    help = ("Export call logs as CSV or NDJSON, optionally with transcripts and intents. "
+            "Logs are read and written a chunk at a time, so memory stays flat for any "
+            "number of logs.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=log_export.FORMATS, default="csv")
+        parser.add_argument("--output", help="File to write, standard output by default.")
+        parser.add_argument("--start", type=date.fromisoformat,
+                            help="First day to export, YYYY-MM-DD.")
+        parser.add_argument("--end", type=date.fromisoformat,
+                            help="Last day to export, YYYY-MM-DD.")
+        parser.add_argument("--language", help="Only calls in this language, e.g. en or es-MX.")
+        parser.add_argument("--forwarded", choices=("yes", "no"),
+                            help="Only calls that were, or were not, forwarded to an operator.")
+        parser.add_argument("--transcripts", action="store_true", help="Include transcripts.")
+        parser.add_argument("--intents", action="store_true", help="Include intents.")
+        parser.add_argument("--chunk-size", type=int, default=log_export.CHUNK_SIZE,
+                            help="Logs read per query and written at a time.")
+
+    def handle(self, *args, **options):
+        if options["start"] and options["end"] and options["start"] > options["end"]:
+            raise CommandError("--start is after --end.")
+        forwarded = {"yes": True, "no": False}.get(options["forwarded"])
+        logs = log_export.filter_logs(Log.objects.all(), options["start"], options["end"],
+                                      options["language"], forwarded)
+        chunks = log_export.export_chunks(logs, options["format"], transcripts=options["transcripts"],
+                                          intents=options["intents"], chunk_size=options["chunk_size"])
+
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as output:
+                output.writelines(chunks)
+            self.stderr.write(f"Exported call logs to {options['output']}.")
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
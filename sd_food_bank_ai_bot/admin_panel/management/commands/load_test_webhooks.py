@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import AsyncRequestFactory, RequestFactory
+from django.utils import timezone
+
+from admin_panel.middleware import CallSessionMiddleware, TranscriptBufferMiddleware
+from admin_panel.models import Log, User
+from admin_panel.views.phone_service_async import process_post_answer_async
+from admin_panel.views.phone_service_faq import process_post_answer
+from admin_panel.stats import percentile
+
+# Numbers reserved for load test callers, removed again after the run
+PHONE_NUMBER = "+1555017{:04d}"
+
+
+class InFlight:
+    """
+    Counts GPT requests waiting at the same time.
+    """
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self.current -= 1
+
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class SlowOpenAI:
+    """
+    Stands in for the OpenAI client, answering after a fixed delay.
+    """
+
+    def __init__(self, latency, in_flight):
+        self.chat = SimpleNamespace(completions=self)
+        self.latency = latency
+        self.in_flight = in_flight
+
+    def create(self, **kwargs):
+        with self.in_flight:
+            time.sleep(self.latency)
+        return completion("QUESTION")
+
+
+class SlowAsyncOpenAI(SlowOpenAI):
+    async def create(self, **kwargs):
+        with self.in_flight:
+            await asyncio.sleep(self.latency)
+        return completion("QUESTION")
+
+
+class Command(BaseCommand):
+    help = ("Send simultaneous calls through the sync and the async FAQ webhook with "
+            "GPT replaced by a fixed delay, and compare how many calls each serves at once. "
+            "Creates and removes test callers, run it against a development database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=200,
+                            help="Calls in flight at the same time.")
+        parser.add_argument("--workers", type=int, default=8,
+                            help="Threads serving the sync webhook, like gunicorn workers x threads.")
+        parser.add_argument("--llm-latency-ms", type=float, default=700.0,
+                            help="Delay of every simulated GPT request.")
+        parser.add_argument("--mode", choices=["both", "sync", "async"], default="both")
+
+    def handle(self, *args, **options):
+        calls = options["calls"]
+        latency = options["llm_latency_ms"] / 1000
+        phone_numbers = [PHONE_NUMBER.format(index) for index in range(calls)]
+        self.create_callers(phone_numbers)
+        try:
+            if options["mode"] in ("both", "sync"):
+                timings, in_flight = self.run_sync(phone_numbers, options["workers"], latency)
+                self.report(f"sync ({options['workers']} threads)", calls, timings, in_flight)
+            if options["mode"] in ("both", "async"):
+                timings, in_flight = asyncio.run(self.run_async(phone_numbers, latency))
+                self.report("async (1 event loop)", calls, timings, in_flight)
+        finally:
+            Log.objects.filter(phone_number__in=phone_numbers).delete()
+            User.objects.filter(phone_number__in=phone_numbers).delete()
+
+    def create_callers(self, phone_numbers):
+        User.objects.bulk_create([User(phone_number=number, first_name="Load", last_name="Test")
+                                  for number in phone_numbers], ignore_conflicts=True)
+        Log.objects.bulk_create([Log(phone_number=number, call_sid=f"CA-load-{number}",
+                                     time_started=timezone.now())
+                                 for number in phone_numbers])
+
+    def post_data(self, phone_number):
+        return {"From": phone_number, "CallSid": f"CA-load-{phone_number}",
+                "SpeechResult": "another question"}
+
+    def run_sync(self, phone_numbers, workers, latency):
+        handler = CallSessionMiddleware(TranscriptBufferMiddleware(process_post_answer))
+        factory = RequestFactory()
+        in_flight = InFlight()
+
+        def hop(phone_number):
+            try:
+                handler(factory.post("/process_post_answer/", self.post_data(phone_number)))
+            finally:
+                close_old_connections()
+            # Every call arrived at the start, waiting for a thread counts too
+            return time.perf_counter() - start
+
+        with mock.patch("admin_panel.views.utilities.get_openai_client",
+                        return_value=SlowOpenAI(latency, in_flight)):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                hop_times = list(executor.map(hop, phone_numbers))
+            elapsed = time.perf_counter() - start
+        return (elapsed, hop_times), in_flight
+
+    async def run_async(self, phone_numbers, latency):
+        handler = CallSessionMiddleware(TranscriptBufferMiddleware(process_post_answer_async))
+        factory = AsyncRequestFactory()
+        in_flight = InFlight()
+
+        async def hop(phone_number):
+            await handler(factory.post("/process_post_answer/", self.post_data(phone_number)))
+            return time.perf_counter() - start
+
+        with mock.patch("admin_panel.views.utilities.get_async_openai_client",
+                        return_value=SlowAsyncOpenAI(latency, in_flight)):
+            start = time.perf_counter()
+            hop_times = await asyncio.gather(*(hop(number) for number in phone_numbers))
+            elapsed = time.perf_counter() - start
+        return (elapsed, hop_times), in_flight
+
+    def report(self, label, calls, timings, in_flight):
+        elapsed, hop_times = timings
+        self.stdout.write(f"{label}: {calls} calls in {elapsed:.2f} s, {calls / elapsed:.1f} hops/s, "
+                          f"peak calls waiting on GPT {in_flight.peak}, hop p50/p95 "
+                          f"{percentile(hop_times, 0.5) * 1000:.0f}/{percentile(hop_times, 0.95) * 1000:.0f} ms")
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from admin_panel.models import AppointmentTable, User
+
+
+class Command(BaseCommand):
+    help = ("Merge users sharing a phone number into the first one created, moving their "
+            "appointments and keeping an email if only a duplicate had one. Callers used to be "
+            "created again on some calls, run this before migrating to 0026_lookup_indexes, "
+            "which makes phone numbers unique.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Report the merges without saving them.")
+
+    def handle(self, *args, **options):
+        duplicated = list(User.objects.values("phone_number").annotate(users=Count("id"))
+                          .filter(users__gt=1).values_list("phone_number", flat=True))
+        if not duplicated:
+            self.stdout.write("No users share a phone number.")
+            return
+
+        verb = "Would merge" if options["dry_run"] else "Merged"
+        for phone_number in duplicated:
+            keep, *others = User.objects.filter(phone_number=phone_number).order_by("id") \
+                .only("id", "phone_number", "email")
+            other_ids = [other.id for other in others]
+            appointments = AppointmentTable.objects.filter(user_id__in=other_ids)
+            moved = appointments.count()
+            if not options["dry_run"]:
+                with transaction.atomic():
+                    appointments.update(user=keep)
+                    email = keep.email or next((other.email for other in others if other.email), None)
+                    User.objects.filter(id__in=other_ids).delete()
+                    if email != keep.email:
+                        keep.email = email
+                        keep.save(update_fields=["email"])
+            self.stdout.write(f"{verb} users {', '.join(map(str, other_ids))} into user {keep.id} "
+                              f"({phone_number}), moving {moved} appointments.")
+
+        self.stdout.write(f"{verb} {len(duplicated)} phone numbers.")
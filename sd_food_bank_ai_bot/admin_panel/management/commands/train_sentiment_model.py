@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from admin_panel.sentiment import CORPUS_PATH, MODEL_PATH, SentimentModel, load_corpus
+
+
+class Command(BaseCommand):
+    help = "Train the local yes/no classifier from the labeled corpus."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--corpus", default=str(CORPUS_PATH),
+                            help="Labeled corpus to train from.")
+        parser.add_argument("--output", default=str(MODEL_PATH),
+                            help="Where to write the trained model.")
+
+    def handle(self, *args, **options):
+        examples = [(entry["text"], entry["label"]) for entry in load_corpus(options["corpus"])
+                    if entry["label"] is not None]
+        model = SentimentModel.train(examples)
+        model.save(options["output"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Trained on {len(examples)} examples with {len(model.vocabulary)} features"))
@@ -0,0 +1,124 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import prefetch, timing
+from .call_session import CallSession
+from .transcript_buffer import abuffer_transcripts, buffer_transcripts
+
+
+class WebhookTimingMiddleware:
+    """
+    Record the response time of every Twilio webhook with the time it spent
+    in the database and each outside API. Goes before the call session
+    middleware so loading the session is part of the hop. Full batches are
+    written in the background, never while the webhook waits.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.is_webhook(request):
+            return self.get_response(request)
+        with timing.start_hop() as hop:
+            response = self.get_response(request)
+        if timing.record(timing.timing_row(request, response, hop)):
+            timing.flush_in_background()
+        return response
+
+    async def __acall__(self, request):
+        if not self.is_webhook(request):
+            return await self.get_response(request)
+        with timing.start_hop() as hop:
+            response = await self.get_response(request)
+        if timing.record(timing.timing_row(request, response, hop)):
+            timing.flush_in_background()
+        return response
+
+    def is_webhook(self, request):
+        return request.method == "POST" and "CallSid" in request.POST
+
+
+class CallSessionMiddleware:
+    """
+    Attach the call session for Twilio webhooks to the request and store it
+    again once the view has run, so the next hop of the call can reuse it.
+    Works under WSGI and ASGI, so async views are not pushed back onto a
+    sync thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.load_session(request)
+        response = self.get_response(request)
+        self.save_session(request)
+        return response
+
+    async def __acall__(self, request):
+        await self.aload_session(request)
+        response = await self.get_response(request)
+        await self.asave_session(request)
+        return response
+
+    def call_sid(self, request):
+        return request.POST.get("CallSid") if request.method == "POST" else None
+
+    def load_session(self, request):
+        call_sid = self.call_sid(request)
+        if call_sid:
+            request.call_session = CallSession.load(call_sid, request.POST.get("From"))
+
+    async def aload_session(self, request):
+        call_sid = self.call_sid(request)
+        if call_sid:
+            request.call_session = await CallSession.aload(call_sid, request.POST.get("From"))
+
+    def save_session(self, request):
+        session = getattr(request, "call_session", None)
+        if session is not None:
+            session.save()
+            # Speculative work for this call that no hop claimed in time
+            prefetch.finish_hop(request)
+
+    async def asave_session(self, request):
+        session = getattr(request, "call_session", None)
+        if session is not None:
+            await session.asave()
+            await prefetch.afinish_hop(request)
+
+
+class TranscriptBufferMiddleware:
+    """
+    Buffer transcript lines written while handling a request and write each
+    call log once after the view has run.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with buffer_transcripts():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        async with abuffer_transcripts():
+            return await self.get_response(request)
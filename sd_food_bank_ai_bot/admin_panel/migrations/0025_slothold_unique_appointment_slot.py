@@ -0,0 +1,74 @@
+# Generated by Django 5.1.5 on 2026-10-17 22:30
+
+from datetime import datetime, time
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def normalize_appointment_slots(apps, schema_editor):
+    # Bookings store the day at local midnight, older rows may carry the time
+    # they were created. Move every row to midnight so the constraint compares
+    # days. Two bookings of one slot are left for staff to sort out, the
+    # migration stops and names them rather than cancelling either.
+    AppointmentTable = apps.get_model("admin_panel", "AppointmentTable")
+    booked = {}
+    moves = []
+    conflicts = []
+    for appointment in AppointmentTable.objects.order_by("id").iterator():
+        day = timezone.localtime(appointment.date).date() if timezone.is_aware(appointment.date) \
+            else appointment.date.date()
+        midnight = timezone.make_aware(datetime.combine(day, time.min))
+        slot = (midnight, appointment.start_time)
+        if slot in booked:
+            conflicts.append(f"{appointment.id} (same slot as {booked[slot]}, {day} {appointment.start_time})")
+            continue
+        booked[slot] = appointment.id
+        if appointment.date != midnight:
+            moves.append((appointment.pk, midnight))
+    if conflicts:
+        raise RuntimeError("Appointments booked into the same slot, cancel or move them before migrating: "
+                           + ", ".join(conflicts))
+    for pk, midnight in moves:
+        AppointmentTable.objects.filter(pk=pk).update(date=midnight)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("admin_panel", "0024_merge_20250509_1504"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlotHold",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("start_time", models.TimeField()),
+                ("holder", models.CharField(db_index=True, max_length=64)),
+                ("expires_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(normalize_appointment_slots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="appointmenttable",
+            constraint=models.UniqueConstraint(
+                fields=("date", "start_time"), name="unique_appointment_slot"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="slothold",
+            constraint=models.UniqueConstraint(
+                fields=("date", "start_time"), name="unique_slot_hold"
+            ),
+        ),
+    ]
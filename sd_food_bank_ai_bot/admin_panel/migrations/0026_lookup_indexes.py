@@ -0,0 +1,55 @@
+# Generated by Django 5.1.5 on 2026-10-17 22:33
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_users(apps, schema_editor):
+    # Callers used to be created again on some calls. Merging them touches
+    # appointments and emails, so it is left to "manage.py
+    # merge_duplicate_users", which can be run with --dry-run first.
+    User = apps.get_model("admin_panel", "User")
+    duplicated = list(User.objects.values("phone_number").annotate(users=Count("id"))
+                      .filter(users__gt=1).values_list("phone_number", flat=True))
+    if duplicated:
+        raise RuntimeError("Users share the phone numbers " + ", ".join(duplicated)
+                           + ", run manage.py merge_duplicate_users before migrating")
+
+
+def create_intents_gin_index(apps, schema_editor):
+    # intents__has_key is the jsonb ? operator, only Postgres can index it
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS log_intents_gin_idx ON admin_panel_log USING gin (intents)")
+
+
+def drop_intents_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS log_intents_gin_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("admin_panel", "0025_slothold_unique_appointment_slot"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_users, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="user",
+            name="phone_number",
+            field=models.CharField(max_length=16, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name="log",
+            index=models.Index(
+                fields=["phone_number", "-id"], name="log_phone_recent_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="log",
+            index=models.Index(fields=["time_started"], name="log_time_started_idx"),
+        ),
+        migrations.RunPython(create_intents_gin_index, drop_intents_gin_index),
+    ]
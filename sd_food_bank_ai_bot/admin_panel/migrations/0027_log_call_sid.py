@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-17 22:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("admin_panel", "0026_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="log",
+            name="call_sid",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-17 22:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("admin_panel", "0027_log_call_sid"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WebhookTiming",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("view_name", models.CharField(max_length=100)),
+                ("language", models.CharField(blank=True, max_length=5)),
+                ("call_sid", models.CharField(blank=True, max_length=64)),
+                ("created", models.DateTimeField(default=django.utils.timezone.now)),
+                ("status_code", models.PositiveSmallIntegerField()),
+                ("total_ms", models.FloatField()),
+                ("db_ms", models.FloatField(default=0)),
+                ("openai_ms", models.FloatField(default=0)),
+                ("translate_ms", models.FloatField(default=0)),
+                ("twilio_ms", models.FloatField(default=0)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["created"], name="timing_created_idx")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.5 on 2026-10-17 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("admin_panel", "0028_webhook_timing"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="log",
+            name="rolled_up",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name="CallRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "grain",
+                    models.CharField(
+                        choices=[("hour", "Hour"), ("day", "Day")], max_length=4
+                    ),
+                ),
+                ("period", models.DateTimeField()),
+                ("topic", models.CharField(max_length=50)),
+                ("dimension", models.CharField(max_length=20)),
+                ("key", models.TextField(blank=True)),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("length_seconds", models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("grain", "topic", "dimension", "period", "key"),
+                        name="unique_call_rollup",
+                    )
+                ],
+            },
+        ),
+    ]
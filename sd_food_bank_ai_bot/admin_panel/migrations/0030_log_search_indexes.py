@@ -0,0 +1,42 @@
+# Generated by Django 5.1.5 on 2026-10-17 23:28
+
+from django.db import migrations, models
+
+
+def create_search_trigram_index(apps, schema_editor):
+    # Substring search over phone numbers and transcript messages, the
+    # expression is log_search.SEARCH_DOCUMENT
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS log_search_trgm_idx ON admin_panel_log USING gin "
+            "((coalesce(phone_number, '') || ' ' || "
+            "coalesce(jsonb_path_query_array(transcript, '$[*].message')::text, '')) gin_trgm_ops)")
+
+
+def drop_search_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS log_search_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("admin_panel", "0029_call_rollups"),
+    ]
+
+    operations = [
+        # (time_started, id) also serves every time_started range, it
+        # replaces the single column index
+        migrations.AddIndex(
+            model_name="log",
+            index=models.Index(
+                fields=["-time_started", "-id"], name="log_time_started_id_idx"
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="log",
+            name="log_time_started_idx",
+        ),
+        migrations.RunPython(create_search_trigram_index, drop_search_trigram_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-17 23:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("admin_panel", "0030_log_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="log",
+            name="archive",
+            field=models.CharField(blank=True, default="", max_length=100),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 00:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("admin_panel", "0032_rebuild_call_rollups"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="log",
+            name="time_ended",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, connection
+from django.db.models import F, Func, Value
 from django.contrib.auth.models import AbstractUser, Permission
 from datetime import datetime, timedelta
 from django.utils import timezone
+from . import transcript_buffer
 
 
 class Admin(AbstractUser):
@@ -29,7 +31,7 @@ class User(models.Model):
     """
     first_name = models.CharField(max_length=20)
     last_name = models.CharField(max_length=20)
-    phone_number = models.CharField(max_length=16)
+    phone_number = models.CharField(max_length=16, unique=True)
     email = models.EmailField(unique=True, null=True)
     language = models.CharField(max_length=5, default='en')
 
@@ -60,10 +62,13 @@ class Log(models.Model):
     Table for storing conversation logs
     """
     phone_number = models.CharField(max_length=15, null=True)
+    # Twilio's CallSid, identifies the call every webhook belongs to
+    call_sid = models.CharField(max_length=64, null=True, blank=True, unique=True)
     transcript = models.JSONField(default=list)
     audio = models.FileField(upload_to="conversations/")
     time_started = models.DateTimeField(auto_now_add=True)
-    time_ended = models.DateTimeField(default=timezone.now)
+    # Set when Twilio reports the call completed, empty while it is in progress
+    time_ended = models.DateTimeField(null=True, blank=True)
     length_of_call = models.DurationField(default=timedelta(seconds=0))
     strikes = models.PositiveIntegerField(default=0)
     total_strikes = models.PositiveIntegerField(default=0)
@@ -71,49 +76,124 @@ class Log(models.Model):
     language = models.CharField(max_length=5, choices=[('en','English'),('es-MX','Spanish')], default='en', help_text="Caller language preference")
     forwarded = models.BooleanField(default=False)
     forwarded_reason = models.CharField(max_length=10, choices=[('caller', 'Caller Requested'), ('auto', 'Automatic'),],null=True,blank=True)
+    # Counted in the dashboard rollups, set once when the call is closed
+    rolled_up = models.BooleanField(default=False)
+    # Call archive file holding the transcript once the call is archived, see archive.py
+    archive = models.CharField(max_length=100, blank=True, default="")
 
-    def add_intent(self, intent):
-        """
-        Increment count for intent identified during dialogue
-        """
+    # Transcript lines appended since the transcript was last written
+    _pending_transcript = ()
+
+    class Meta:
+        indexes = [
+            # Latest log for a caller, filter by phone_number ordered by id
+            models.Index(fields=["phone_number", "-id"], name="log_phone_recent_idx"),
+            # Monitoring and audit log date ranges, and audit log pages which
+            # are keyset paginated on (time_started, id)
+            models.Index(fields=["-time_started", "-id"], name="log_time_started_id_idx"),
+        ]
+        # Postgres also gets a GIN index on intents for has_key, see migration 0026,
+        # and a trigram index for audit log search, see migration 0030
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "transcript" in update_fields:
+            # The whole transcript is written, nothing is left pending
+            self._pending_transcript = ()
+        super().save(*args, **kwargs)
+
+    def count_intent(self, intent):
         if intent == "faq":
             self.intents[intent] = self.intents.get(intent, {})
         else:
             self.intents[intent] = self.intents.get(intent, 0) + 1
-        self.save()
-    
-    def add_question(self, question):
+
+    def add_intent(self, intent):
         """
-        Increment count for question identified during dialogue
+        Increment count for intent identified during dialogue
         """
+        self.count_intent(intent)
+        self.save(update_fields=["intents"])
+
+    async def aadd_intent(self, intent):
+        self.count_intent(intent)
+        await self.asave(update_fields=["intents"])
+
+    def count_question(self, question):
         if self.intents.get("faq") == None:
             self.intents["faq"] = {}
         self.intents["faq"][question] = self.intents["faq"].get(question, 0) + 1
 
+    def add_question(self, question):
+        """
+        Increment count for question identified during dialogue
+        """
+        self.count_question(question)
+        self.save(update_fields=["intents"])
+
+    async def aadd_question(self, question):
+        self.count_question(question)
+        await self.asave(update_fields=["intents"])
+
     def add_strike(self):
         """Failed intent identification so increment strike count and check
         if forwarding to an operator is necessary"""
         self.strikes += 1
         self.total_strikes += 1
-        self.save()
+        self.save(update_fields=["strikes", "total_strikes"])
         # Failed intent recognition too many times, forward to operator if
         # this returns True
         return self.strikes >= 2
 
+    async def aadd_strike(self):
+        self.strikes += 1
+        self.total_strikes += 1
+        await self.asave(update_fields=["strikes", "total_strikes"])
+        return self.strikes >= 2
+
     def reset_strikes(self):
         """
         Bot progressed to another step in the dialogue so
         reset the strike system
         """
         self.strikes = 0
-        self.save()
+        self.save(update_fields=["strikes"])
+
+    async def areset_strikes(self):
+        self.strikes = 0
+        await self.asave(update_fields=["strikes"])
 
     def add_transcript(self, speaker, message):
         """
-        Append a new message to the call transcript
+        Append a new message to the call transcript.
+        Inside a transcript buffer the message is written when the buffer is
+        flushed, otherwise right away.
         """
-        self.transcript.append({"speaker": speaker, "message": message})
-        self.save()
+        entry = {"speaker": speaker, "message": message}
+        self.transcript.append(entry)
+        if self.pk is None:
+            self.save()
+            return
+        self._pending_transcript = [*self._pending_transcript, entry]
+        if not transcript_buffer.defer(self):
+            self.flush_transcript()
+
+    def flush_transcript(self):
+        """
+        Write transcript messages that have not been saved yet. On Postgres
+        they are appended to the stored JSONB array instead of rewriting it.
+        """
+        pending = list(self._pending_transcript)
+        if not pending:
+            return
+        self._pending_transcript = ()
+        if connection.vendor == "postgresql":
+            Log.objects.filter(pk=self.pk).update(transcript=Func(
+                F("transcript"), Value(pending, output_field=models.JSONField()),
+                template="%(expressions)s", arg_joiner=" || ",
+                output_field=models.JSONField()))
+        else:
+            self.save(update_fields=["transcript"])
 
 
 class AppointmentTable(models.Model):
@@ -126,3 +206,81 @@ class AppointmentTable(models.Model):
     end_time = models.TimeField()
     location = models.TextField()
     date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            # Backstop against two callers booking the same slot
+            models.UniqueConstraint(fields=["date", "start_time"], name="unique_appointment_slot"),
+        ]
+
+
+class SlotHold(models.Model):
+    """
+    Short lived reservation of an appointment slot while a caller confirms it.
+    The holder is the call's CallSid, or the phone number without one.
+    """
+    date = models.DateField()
+    start_time = models.TimeField()
+    holder = models.CharField(max_length=64, db_index=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "start_time"], name="unique_slot_hold"),
+        ]
+
+    def is_active(self):
+        return self.expires_at > timezone.now()
+
+
+class CallRollup(models.Model):
+    """
+    Calls counted per hour or day, per topic and per dimension of the call,
+    kept up to date as calls end so the dashboard never reads the Log table.
+    See admin_panel.rollups.
+    """
+    HOUR = "hour"
+    DAY = "day"
+
+    grain = models.CharField(max_length=4, choices=[(HOUR, "Hour"), (DAY, "Day")])
+    # Start of the hour or day in the dashboard's time zone
+    period = models.DateTimeField()
+    # "All" or an intent the calls had
+    topic = models.CharField(max_length=50)
+    # What is counted: calls, language, forwarded, intent or faq
+    dimension = models.CharField(max_length=20)
+    # The language, forwarded reason, intent or FAQ question counted
+    key = models.TextField(blank=True)
+    count = models.PositiveIntegerField(default=0)
+    # Summed length of the calls, for the calls dimension
+    length_seconds = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the index of the dashboard reads, equality columns before the period range
+            models.UniqueConstraint(fields=["grain", "topic", "dimension", "period", "key"],
+                                    name="unique_call_rollup"),
+        ]
+
+
+class WebhookTiming(models.Model):
+    """
+    Response time of one Twilio webhook in milliseconds, with the part of it
+    spent in the database and waiting on each outside API
+    """
+    view_name = models.CharField(max_length=100)
+    language = models.CharField(max_length=5, blank=True)
+    call_sid = models.CharField(max_length=64, blank=True)
+    created = models.DateTimeField(default=timezone.now)
+    status_code = models.PositiveSmallIntegerField()
+    total_ms = models.FloatField()
+    db_ms = models.FloatField(default=0)
+    openai_ms = models.FloatField(default=0)
+    translate_ms = models.FloatField(default=0)
+    twilio_ms = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            # The latency panel reads recent hops, retention drops old ones
+            models.Index(fields=["created"], name="timing_created_idx"),
+        ]
@@ -0,0 +1,202 @@
+"""
+Speculative work for the next hop of a call.
+
+While Twilio plays a prompt and listens to the caller, the worker is idle, yet
+the next hop's work is often already known, like the times prompt for a date
+that was just found available. A view can speculate() that work when it
+issues its Gather. It runs in a small pool and its result is kept in the
+cache under the call's CallSid, so the next webhook claim()s it instead of
+computing it, whichever worker process it lands on. Work that no hop claimed
+within its hops is cancelled, or dropped from the cache if it already ran.
+Requests without a CallSid never speculate.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+PREFETCH_KEY = "prefetch:{}:{}"
+
+_executor = ThreadPoolExecutor(max_workers=settings.PREFETCH_THREADS, thread_name_prefix="prefetch")
+# CallSid -> {name: Speculation} started by this process
+_speculations = {}
+_lock = threading.Lock()
+
+
+class Speculation:
+    """
+    Work started for a later hop, dropped after the given number of hops.
+    """
+
+    def __init__(self, key, hop, hops):
+        self.key = key
+        self.hop = hop
+        self.hops = hops
+        self.started = time.monotonic()
+        self.future = None
+        self.cancelled = False
+
+    def run(self, func):
+        try:
+            result = func()
+        finally:
+            close_old_connections()
+        if not self.cancelled:
+            cache.set(self.key, result, timeout=settings.PREFETCH_TTL)
+        return result
+
+    def stop(self):
+        """
+        Cancel the work, leaving a result it already stored in the cache.
+        """
+        self.cancelled = True
+        self.future.cancel()
+
+    def cancel(self):
+        self.stop()
+        cache.delete(self.key)
+
+
+async def acancel(speculations):
+    """
+    Cancel speculations from async code, without blocking the event loop on
+    the cache.
+    """
+    for speculation in speculations:
+        speculation.stop()
+    if speculations:
+        await cache.adelete_many([speculation.key for speculation in speculations])
+
+
+def call_sid_of(request):
+    session = getattr(request, "call_session", None)
+    return session.call_sid if session is not None else None
+
+
+def hop_of(request):
+    """
+    Token telling the hops of a call apart.
+    """
+    return request.__dict__.setdefault("_prefetch_hop", object())
+
+
+def speculate(request, name, func, hops=1):
+    """
+    Start func in the background for one of the next hops of this call.
+    It is cancelled if it is not claimed within that many hops.
+    """
+    call_sid = call_sid_of(request)
+    if not call_sid or not settings.PREFETCH_ENABLED:
+        return
+    speculation = Speculation(PREFETCH_KEY.format(call_sid, name), hop_of(request), hops)
+    with _lock:
+        prune()
+        previous = _speculations.setdefault(call_sid, {}).get(name)
+        if previous is not None and not previous.future.done():
+            # Already being computed for this call
+            return
+        speculation.future = _executor.submit(speculation.run, func)
+        _speculations[call_sid][name] = speculation
+
+
+def prune():
+    """
+    Forget speculations whose result has expired from the cache, left behind
+    when the rest of the call was served by another process.
+    """
+    expired = time.monotonic() - settings.PREFETCH_TTL
+    for call_sid, speculations in list(_speculations.items()):
+        for name, speculation in list(speculations.items()):
+            if speculation.started < expired and speculation.future.done():
+                del speculations[name]
+        if not speculations:
+            del _speculations[call_sid]
+
+
+def claim(request, name, compute):
+    """
+    Return the speculated result of name for this call, waiting for it if it
+    is still running, or compute() it when nothing was speculated.
+    """
+    call_sid = call_sid_of(request)
+    if not call_sid:
+        return compute()
+    key = PREFETCH_KEY.format(call_sid, name)
+    with _lock:
+        speculation = _speculations.get(call_sid, {}).pop(name, None)
+    if speculation is not None and not speculation.cancelled:
+        try:
+            result = speculation.future.result(timeout=settings.PREFETCH_WAIT)
+            cache.delete(key)
+            return result
+        except TimeoutError:
+            speculation.cancel()
+        except Exception:
+            # Speculation is best effort, the hop computes it itself
+            pass
+    result = cache.get(key)
+    if result is not None:
+        cache.delete(key)
+        return result
+    return compute()
+
+
+def unclaimed(request):
+    """
+    Count this hop against the call's speculations and return, forgotten,
+    the ones no hop claimed in time.
+    """
+    call_sid = call_sid_of(request)
+    if not call_sid:
+        return []
+    hop = hop_of(request)
+    expired = []
+    with _lock:
+        speculations = _speculations.get(call_sid, {})
+        for name, speculation in list(speculations.items()):
+            if speculation.hop is hop:
+                continue
+            speculation.hops -= 1
+            if speculation.hops <= 0:
+                expired.append(speculations.pop(name))
+        if not speculations:
+            _speculations.pop(call_sid, None)
+    return expired
+
+
+def finish_hop(request):
+    """
+    Called after every webhook, cancels work no hop claimed in time.
+    """
+    for speculation in unclaimed(request):
+        speculation.cancel()
+
+
+async def afinish_hop(request):
+    """
+    Async version of finish_hop
+    """
+    await acancel(unclaimed(request))
+
+
+def call_speculations(call_sid):
+    with _lock:
+        return list(_speculations.pop(call_sid, {}).values())
+
+
+def cancel_call(call_sid):
+    """
+    Cancel everything speculated for a call that has ended.
+    """
+    for speculation in call_speculations(call_sid):
+        speculation.cancel()
+
+
+async def acancel_call(call_sid):
+    """
+    Async version of cancel_call
+    """
+    await acancel(call_speculations(call_sid))
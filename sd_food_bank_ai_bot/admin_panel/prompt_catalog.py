@@ -0,0 +1,61 @@
+"""
+Precompiled translations for the bot's fixed prompts.
+
+Spanish callers hear many hard-coded English prompts such as "What time would
+you like?". Their translations never change, so they are generated offline
+with the build_prompt_catalog management command, stored in
+prompt_catalog.json and loaded once when the process starts. Templates passed
+to translate_template are stored with their {placeholders}. Only text with
+dynamic content still goes to the live translator.
+"""
+import ast
+import json
+from pathlib import Path
+
+CATALOG_PATH = Path(__file__).resolve().parent / "prompt_catalog.json"
+VIEWS_PATH = Path(__file__).resolve().parent / "views"
+TRANSLATE_FUNCTIONS = {"translate_to_language", "translate_template", "translate_template_with_values"}
+
+
+def load_catalog(path=CATALOG_PATH):
+    """
+    Read the catalog file, a mapping of "source:target" to
+    {source text: translated text}.
+    """
+    try:
+        with open(path, encoding="utf-8") as catalog_file:
+            return json.load(catalog_file)
+    except FileNotFoundError:
+        return {}
+
+
+def lookup(source_lang, target_lang, text):
+    """
+    Return the catalog translation of text, or None if it is not a known
+    fixed prompt.
+    """
+    return CATALOG.get(f"{source_lang}:{target_lang}", {}).get(text)
+
+
+def collect_fixed_prompts(views_path=VIEWS_PATH):
+    """
+    Find every translate_to_language and translate_template call in the views
+    whose languages and text are plain string literals. Returns a set of
+    (source, target, text) tuples.
+    """
+    prompts = set()
+    for module in sorted(Path(views_path).glob("*.py")):
+        tree = ast.parse(module.read_text(encoding="utf-8"))
+        for node in ast.walk(tree):
+            if not (isinstance(node, ast.Call)
+                    and getattr(node.func, "id", None) in TRANSLATE_FUNCTIONS
+                    and len(node.args) >= 3):
+                continue
+            if all(isinstance(arg, ast.Constant) and isinstance(arg.value, str)
+                   for arg in node.args[:3]):
+                prompts.add(tuple(arg.value for arg in node.args[:3]))
+    return prompts
+
+
+# Loaded once per process
+CATALOG = load_catalog()
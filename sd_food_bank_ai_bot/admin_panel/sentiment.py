@@ -0,0 +1,261 @@
+"""
+Local yes/no classifier for caller confirmations.
+
+Most confirmations are short answers like "yes", "no", "sí" or "that's
+correct". They are classified here without a GPT round trip. The first step is
+a bilingual lexicon of whole answers. The second is a small Naive Bayes model
+trained on sentiment_corpus.json with the train_sentiment_model management
+command and shipped as sentiment_model.json. Anything hedged, long or unknown
+gets no confident label and is left to GPT.
+"""
+import json
+import math
+import re
+import unicodedata
+from pathlib import Path
+
+MODEL_PATH = Path(__file__).resolve().parent / "sentiment_model.json"
+CORPUS_PATH = Path(__file__).resolve().parent / "sentiment_corpus.json"
+
+AFFIRMATIVE = "affirmative"
+NEGATIVE = "negative"
+
+# Whole answers, after normalize() and strip_fillers()
+AFFIRMATIVE_PHRASES = {
+    # English
+    "yes", "yeah", "yea", "yep", "yup", "ya", "sure", "sure thing", "of course",
+    "correct", "thats correct", "that is correct", "yes correct", "yes thats correct",
+    "right", "thats right", "that is right", "yes thats right", "yes it is", "it is",
+    "absolutely", "definitely", "exactly", "affirmative", "ok", "okay", "alright",
+    "all right", "sounds good", "that sounds good", "that works", "that works for me",
+    "works for me", "perfect", "great", "fine", "thats fine", "go ahead",
+    "i do", "yes i do", "uh huh", "mhm", "yes it does", "it does", "yes that works",
+    "yes sir", "yes maam", "correct yes", "yes yes", "that would be great",
+    # Spanish
+    "si", "claro", "claro que si", "si claro", "correcto", "es correcto", "si es correcto",
+    "si correcto", "esta bien", "si esta bien", "de acuerdo", "perfecto", "exacto",
+    "asi es", "si asi es", "por supuesto", "bueno", "vale", "eso es", "okey", "si si",
+    "si me funciona", "me funciona", "si por supuesto", "andale", "sale",
+}
+NEGATIVE_PHRASES = {
+    # English
+    "no", "nope", "nah", "no no", "not really", "not correct", "thats not correct",
+    "that is not correct", "incorrect", "thats incorrect", "wrong", "thats wrong",
+    "that is wrong", "no thats wrong", "not right", "thats not right", "that is not right",
+    "no thats not right", "no thats not correct", "negative", "no its not", "its not",
+    "no it isnt", "it isnt", "no i dont", "i dont", "no it doesnt", "it doesnt",
+    "that doesnt work", "doesnt work", "not at all", "no way", "never mind", "nevermind",
+    "no sir", "no maam", "not that", "no not that", "absolutely not", "definitely not",
+    # Spanish
+    "no es correcto", "no correcto", "incorrecto", "esta mal", "no esta bien", "para nada",
+    "de ninguna manera", "no es asi", "eso no", "no me funciona", "nunca",
+    "no no es correcto", "claro que no", "por supuesto que no",
+}
+
+# Politeness and hesitation removed before matching a whole answer
+FILLER_PHRASES = re.compile(r"\b(thank you|thanks|please|por favor|gracias)\b")
+FILLER_WORDS = {"um", "uh", "umm", "uhh", "hmm", "mmm", "oh", "ah", "eh", "well", "pues", "este"}
+
+# Words that make an answer conditional or mixed, always left to GPT
+HEDGES = {
+    "but", "maybe", "perhaps", "actually", "wait", "except", "unless", "though",
+    "think", "guess", "probably", "possibly", "pero", "quizas", "quiza", "talvez",
+    "vez", "creo", "aunque", "sino", "espera", "depende", "depends", "know", "se",
+    "repeat", "repite",
+    # Questions back to the bot
+    "what", "how", "when", "where", "why", "who", "cuanto", "como", "donde", "cuando",
+    "quien", "porque",
+}
+
+# Openers of yes/no questions back to the bot, "is it correct" or "¿está
+# bien?", left to GPT when more words follow
+QUESTION_OPENERS = {"is", "does", "do", "can", "es", "esta"}
+# Spanish asks with the same words it answers with, "es correcto" is only a
+# question when it was transcribed with a question mark
+SPANISH_OPENERS = {"es", "esta"}
+
+# A yes cue next to a no cue, "yes that is wrong" or "yes, I want another
+# day", is a mixed answer and left to GPT unless the whole answer is in the
+# lexicon
+AFFIRMATIVE_CUES = {
+    "yes", "yeah", "yea", "yep", "yup", "ya", "sure", "ok", "okay", "alright", "correct",
+    "right", "perfect", "great", "fine", "absolutely", "definitely", "exactly",
+    "si", "claro", "correcto", "bien", "perfecto", "exacto", "vale", "bueno", "okey",
+}
+NEGATIVE_CUES = {
+    "no", "not", "wrong", "incorrect", "another", "different", "cancel",
+    "mal", "incorrecto", "otro", "otra", "diferente", "cancelar",
+}
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Answers longer than this usually carry more than a yes or no
+MAX_MODEL_WORDS = 8
+# Share of an answer's words the model must have seen in training
+MIN_KNOWN_SHARE = 0.6
+
+
+def normalize(text):
+    """
+    Lowercase, strip accents and apostrophes, and split into words.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = text.replace("'", "").replace("’", "")
+    return WORD_PATTERN.findall(text)
+
+
+def strip_fillers(words):
+    """
+    Drop politeness and hesitation so "um, yes please" matches "yes".
+    """
+    words = FILLER_PHRASES.sub(" ", " ".join(words)).split()
+    return [word for word in words if word not in FILLER_WORDS]
+
+
+def extract_features(words):
+    """
+    Words and word pairs, pairs let the model see "not correct".
+    """
+    features = list(words)
+    features += [f"{first} {second}" for first, second in zip(words, words[1:])]
+    return features
+
+
+class SentimentModel:
+    """
+    Multinomial Naive Bayes over words and word pairs with two classes.
+    """
+
+    def __init__(self, priors, log_probs, unknown_log_probs):
+        self.priors = priors
+        self.log_probs = log_probs
+        self.unknown_log_probs = unknown_log_probs
+        self.vocabulary = set().union(*(probs.keys() for probs in log_probs.values()))
+
+    @classmethod
+    def train(cls, examples, alpha=1.0):
+        """
+        Fit the model from (text, is_affirmative) pairs.
+        """
+        counts = {AFFIRMATIVE: {}, NEGATIVE: {}}
+        documents = {AFFIRMATIVE: 0, NEGATIVE: 0}
+        for text, is_affirmative in examples:
+            label = AFFIRMATIVE if is_affirmative else NEGATIVE
+            documents[label] += 1
+            for feature in extract_features(strip_fillers(normalize(text))):
+                counts[label][feature] = counts[label].get(feature, 0) + 1
+
+        vocabulary = set(counts[AFFIRMATIVE]) | set(counts[NEGATIVE])
+        total_documents = sum(documents.values())
+        priors, log_probs, unknown_log_probs = {}, {}, {}
+        for label, label_counts in counts.items():
+            denominator = sum(label_counts.values()) + alpha * (len(vocabulary) + 1)
+            priors[label] = math.log(documents[label] / total_documents)
+            log_probs[label] = {feature: math.log((label_counts.get(feature, 0) + alpha) / denominator)
+                                for feature in vocabulary}
+            unknown_log_probs[label] = math.log(alpha / denominator)
+        return cls(priors, log_probs, unknown_log_probs)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with open(path, encoding="utf-8") as model_file:
+            data = json.load(model_file)
+        return cls(data["priors"], data["log_probs"], data["unknown_log_probs"])
+
+    def save(self, path=MODEL_PATH):
+        data = {
+            "priors": self.priors,
+            "log_probs": {label: {feature: round(value, 6) for feature, value in sorted(probs.items())}
+                          for label, probs in self.log_probs.items()},
+            "unknown_log_probs": self.unknown_log_probs,
+        }
+        with open(path, "w", encoding="utf-8") as model_file:
+            json.dump(data, model_file, ensure_ascii=False, indent=1)
+            model_file.write("\n")
+
+    def predict(self, words):
+        """
+        Return (is_affirmative, probability, share of known features).
+        """
+        features = extract_features(words)
+        if not features:
+            return None, 0.0, 0.0
+        scores = {}
+        for label in (AFFIRMATIVE, NEGATIVE):
+            probs = self.log_probs[label]
+            unknown = self.unknown_log_probs[label]
+            scores[label] = self.priors[label] + sum(probs.get(feature, unknown) for feature in features)
+        # Softmax over the two classes
+        top = max(scores.values())
+        affirmative = math.exp(scores[AFFIRMATIVE] - top)
+        negative = math.exp(scores[NEGATIVE] - top)
+        probability = affirmative / (affirmative + negative)
+        known = sum(feature in self.vocabulary for feature in words) / len(words)
+        if probability >= 0.5:
+            return True, probability, known
+        return False, 1 - probability, known
+
+
+def classify(text, model=None):
+    """
+    Classify a caller's answer locally.
+    Returns (is_affirmative, confidence), with is_affirmative None when the
+    answer should be left to GPT.
+    """
+    raw_words = normalize(text or "")
+    words = strip_fillers(raw_words)
+    if not words:
+        # Nothing but silence or fillers is not a confirmation
+        return False, 1.0
+
+    if any(word in HEDGES for word in words):
+        return None, 0.0
+
+    # Check the answer as said too, fillers are part of "uh huh"
+    phrase = " ".join(words)
+    if len(words) > 1 and words[0] in QUESTION_OPENERS:
+        asked = "?" in text or "¿" in text
+        answered = phrase in AFFIRMATIVE_PHRASES or phrase in NEGATIVE_PHRASES
+        if asked or words[0] not in SPANISH_OPENERS or not answered:
+            return None, 0.0
+    if " ".join(raw_words) in AFFIRMATIVE_PHRASES or phrase in AFFIRMATIVE_PHRASES:
+        return True, 0.99
+    if phrase in NEGATIVE_PHRASES:
+        return False, 0.99
+
+    if AFFIRMATIVE_CUES.intersection(words) and NEGATIVE_CUES.intersection(words):
+        return None, 0.0
+
+    if len(words) > MAX_MODEL_WORDS:
+        return None, 0.0
+
+    model = model or get_model()
+    if model is None:
+        return None, 0.0
+    is_affirmative, probability, known = model.predict(words)
+    if known < MIN_KNOWN_SHARE:
+        return None, 0.0
+    return is_affirmative, probability
+
+
+_model = None
+
+
+def get_model():
+    """
+    Load the shipped model once per process, None if it has not been trained.
+    """
+    global _model
+    if _model is None and MODEL_PATH.exists():
+        _model = SentimentModel.load()
+    return _model
+
+
+def load_corpus(path=CORPUS_PATH):
+    """
+    Read the labeled corpus, a list of {"text", "label"} where label is
+    true, false or null for answers that need GPT.
+    """
+    with open(path, encoding="utf-8") as corpus_file:
+        return json.load(corpus_file)
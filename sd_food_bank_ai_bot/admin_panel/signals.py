@@ -0,0 +1,50 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import FAQ, AppointmentTable
+from .faq_index import faq_index
+from . import availability
+
+
+@receiver(post_save, sender=FAQ)
+def update_faq_index(sender, instance, **kwargs):
+    """
+    Keep the local FAQ index in step with created or edited FAQs
+    """
+    faq_index.add_or_update(instance.id, instance.question)
+
+
+@receiver(post_delete, sender=FAQ)
+def remove_faq_from_index(sender, instance, **kwargs):
+    """
+    Drop deleted FAQs from the local FAQ index
+    """
+    faq_index.remove(instance.id)
+
+
+@receiver(pre_save, sender=AppointmentTable)
+def remember_appointment_day(sender, instance, **kwargs):
+    """
+    Keep the day an edited appointment was on, it may be moving to another day
+    """
+    if instance.pk:
+        instance._previous_date = sender.objects.filter(pk=instance.pk) \
+            .values_list("date", flat=True).first()
+
+
+@receiver(post_save, sender=AppointmentTable)
+def update_availability(sender, instance, **kwargs):
+    """
+    Drop cached availability for the days a created or edited appointment touches
+    """
+    availability.invalidate(instance.date)
+    previous_date = getattr(instance, "_previous_date", None)
+    if previous_date is not None:
+        availability.invalidate(previous_date)
+
+
+@receiver(post_delete, sender=AppointmentTable)
+def release_availability(sender, instance, **kwargs):
+    """
+    Drop cached availability for the day of a deleted appointment
+    """
+    availability.invalidate(instance.date)
@@ -0,0 +1,31 @@
+"""
+Percentiles for the monitoring dashboard and the benchmark commands.
+"""
+from django.db.models import Aggregate, FloatField
+
+
+def percentile(values, fraction):
+    """
+    Percentile of a list of numbers, interpolated between the two nearest
+    ranks like PostgreSQL's percentile_cont.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = fraction * (len(ordered) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class PercentileCont(Aggregate):
+    """
+    PostgreSQL's percentile_cont, the interpolated percentile of a column
+    computed in the database.
+    """
+    function = "percentile_cont"
+    template = "%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
@@ -4,4 +4,25 @@ from .phone_service_schedule_tests import *
 from .phone_service_reschedule_tests import *
 from .phone_service_cancel_tests import *
 from .audit_logs_tests import *
-from .account_approval_tests import *
\ No newline at end of file
+from .account_approval_tests import *
+from .faq_index_tests import *
+from .call_session_tests import *
+from .transcript_buffer_tests import *
+from .prompt_catalog_tests import *
+from .translation_cache_tests import *
+from .clients_tests import *
+from .sentiment_tests import *
+from .datetime_parser_tests import *
+from .availability_tests import *
+from .booking_tests import *
+from .indexes_tests import *
+from .merge_duplicate_users_tests import *
+from .backfill_call_sids_tests import *
+from .async_views_tests import *
+from .fan_out_tests import *
+from .prefetch_tests import *
+from .timing_tests import *
+from .stats_tests import *
+from .rollups_tests import *
+from .log_export_tests import *
+from .archive_tests import *
\ No newline at end of file
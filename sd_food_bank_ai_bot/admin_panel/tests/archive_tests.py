@@ -0,0 +1,131 @@
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest.mock import patch
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from admin_panel import archive, log_export
+from admin_panel.models import Admin, CallRollup, Log
+
+
+def make_log(time_started, message, **fields):
+    log = Log.objects.create(phone_number="+16191231234", rolled_up=True, time_ended=time_started,
+                             transcript=[{"speaker": "user", "message": message}], **fields)
+    Log.objects.filter(pk=log.pk).update(time_started=time_started)
+    return log
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media = override_settings(MEDIA_ROOT=self.media_root, CALL_ARCHIVE_AFTER_DAYS=90)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.day = timezone.make_aware(datetime.combine(timezone.localdate() - timedelta(days=200),
+                                                        datetime.min.time().replace(hour=10)))
+        self.old = make_log(self.day, "Where is the pantry?", intents={"faq": {"Where is the pantry?": 1}})
+        self.same_day = make_log(self.day + timedelta(hours=2), "Quiero una cita")
+        self.in_progress = make_log(self.day, "Still talking")
+        Log.objects.filter(pk=self.in_progress.pk).update(rolled_up=False, time_ended=None)
+        self.recent = make_log(timezone.now() - timedelta(days=5), "Do you deliver?")
+
+    def test_old_transcripts_moved(self):
+        """Test transcripts of old closed calls move to the day's archive file"""
+        self.assertEqual(archive.archive_logs(), 2)
+
+        self.old.refresh_from_db()
+        path = self.old.archive
+        self.assertTrue(path.startswith(f"{archive.ARCHIVE_DIR}/{timezone.localtime(self.day):%Y/%m/%d}"))
+        with default_storage.open(path, "rb") as archive_file:
+            lines = [json.loads(line) for line in gzip.decompress(archive_file.read()).splitlines()]
+        self.assertEqual([line["id"] for line in lines], [self.old.id, self.same_day.id])
+
+        self.assertEqual(self.old.transcript, [])
+        for log in (self.in_progress, self.recent):
+            log.refresh_from_db()
+            self.assertEqual(log.archive, "")
+            self.assertTrue(log.transcript)
+
+    def test_transcript_read_through(self):
+        """Test a transcript reads the same before and after it is archived"""
+        before = archive.transcript(Log.objects.get(pk=self.old.pk))
+        archive.archive_logs()
+        archive.cached_file.cache_clear()
+
+        self.assertEqual(archive.transcript(Log.objects.get(pk=self.old.pk)), before)
+
+    def test_single_log_view(self):
+        """Test an archived call shows its transcript"""
+        archive.archive_logs()
+        self.client.force_login(Admin.objects.create_user(username='user1', password='pass123'))
+        response = self.client.get(reverse('single_log_view', args=[self.old.id]))
+
+        self.assertContains(response, "Where is the pantry?")
+
+    def test_export(self):
+        """Test exports include archived transcripts"""
+        archive.archive_logs()
+        rows = log_export.export_rows(Log.objects.all(), log_export.export_fields(transcripts=True))
+
+        self.assertEqual({row["id"]: row["transcript"][0]["message"] for row in rows}[self.same_day.id],
+                         "Quiero una cita")
+
+    def test_later_run_merges(self):
+        """Test a call archived later joins the day's calls in a new file and the old file goes"""
+        archive.archive_logs()
+        first_path = Log.objects.get(pk=self.old.pk).archive
+        Log.objects.filter(pk=self.in_progress.pk).update(rolled_up=True)
+        self.assertEqual(archive.archive_logs(), 1)
+
+        paths = set(Log.objects.exclude(archive="").values_list("archive", flat=True))
+        self.assertEqual(len(paths), 1)
+        self.assertNotIn(first_path, paths)
+        self.assertFalse(default_storage.exists(first_path))
+        transcripts = archive.read_file(paths.pop())
+        self.assertEqual(set(transcripts), {self.old.id, self.same_day.id, self.in_progress.id})
+        self.assertEqual(archive.transcript(Log.objects.get(pk=self.old.pk))[0]["message"],
+                         "Where is the pantry?")
+
+    def test_interrupted_run_keeps_old_file(self):
+        """Test a run failing after writing the new file leaves the old one readable"""
+        archive.archive_logs()
+        first_path = Log.objects.get(pk=self.old.pk).archive
+        Log.objects.filter(pk=self.in_progress.pk).update(rolled_up=True)
+
+        with patch.object(archive.transaction, "atomic", side_effect=DatabaseError("down")):
+            with self.assertRaises(DatabaseError):
+                archive.archive_logs()
+
+        self.assertTrue(default_storage.exists(first_path))
+        self.assertEqual(archive.transcript(Log.objects.get(pk=self.old.pk))[0]["message"],
+                         "Where is the pantry?")
+        self.assertEqual(archive.archive_logs(), 1)
+
+    def test_rollups_unchanged(self):
+        """Test rebuilding the rollups after archiving counts the same"""
+        def counts():
+            call_command("rebuild_call_rollups", stdout=StringIO())
+            return sorted(CallRollup.objects.values_list("grain", "period", "topic", "dimension", "key", "count"))
+
+        before = counts()
+        archive.archive_logs()
+        self.assertEqual(counts(), before)
+
+    def test_command(self):
+        """Test the command archives, or only counts with --dry-run"""
+        out = StringIO()
+        call_command("archive_call_logs", dry_run=True, stdout=out)
+        self.assertIn("Would archive 2 calls", out.getvalue())
+        self.assertFalse(Log.objects.exclude(archive="").exists())
+
+        call_command("archive_call_logs", days=1, stdout=out)
+        self.assertEqual(Log.objects.exclude(archive="").count(), 3)
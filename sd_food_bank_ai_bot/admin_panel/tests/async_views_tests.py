@@ -0,0 +1,162 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, AsyncRequestFactory
+from django.utils import timezone
+from unittest.mock import patch, MagicMock, AsyncMock
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from admin_panel.middleware import CallSessionMiddleware, TranscriptBufferMiddleware
+from admin_panel.models import Log, FAQ, User
+from admin_panel.urls import urlpatterns
+from admin_panel.views import phone_service_faq, phone_service_schedule
+from admin_panel.views.phone_service_async import (ASYNC_VARIANTS, webhook, answer_call_async,
+                                                   get_question_from_user_async,
+                                                   confirm_question_async,
+                                                   process_post_answer_async,
+                                                   call_status_update_async)
+
+
+def gpt_reply(content):
+    """Async OpenAI client mock answering every request with content"""
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(
+        return_value=MagicMock(choices=[MagicMock(message=MagicMock(content=content))]))
+    return client
+
+
+class AsyncWebhookTests(TestCase):
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.phone_number = "+17601231234"
+        self.user = User.objects.create(phone_number=self.phone_number, first_name="Ana",
+                                        last_name="Lopez")
+        self.log = Log.objects.create(phone_number=self.phone_number, call_sid="CA1",
+                                      time_started=timezone.now())
+        FAQ.objects.create(question="What are your hours?", answer="We are open 9 to 5.")
+
+    async def post(self, view, path, data, *args):
+        """Send a webhook through the call middleware like the ASGI handler"""
+        async def call_view(request):
+            return await view(request, *args)
+
+        handler = CallSessionMiddleware(TranscriptBufferMiddleware(call_view))
+        data = {"From": self.phone_number, "CallSid": "CA1", **data}
+        response = await handler(self.factory.post(path, data))
+        return response.content.decode("utf-8")
+
+    async def test_answer_call_menu(self):
+        """Test the async greeting reads the menu and writes the transcript"""
+        content = await self.post(answer_call_async, "/answer/", {})
+
+        self.assertIn("press 1 to schedule an appointment", content)
+        log = await Log.objects.aget(pk=self.log.pk)
+        self.assertEqual(log.transcript[0]["message"], "Para español presione 0.")
+
+    @patch("admin_panel.views.utilities.get_async_openai_client")
+    async def test_question_matched_by_async_gpt(self, mock_client):
+        """Test a question the index cannot place is matched by the async client"""
+        mock_client.return_value = gpt_reply("What are your hours?")
+
+        content = await self.post(get_question_from_user_async, "/get_question_from_user/",
+                                  {"SpeechResult": "Could you tell me something"})
+
+        self.assertIn("You asked: What are your hours? Is this correct?", content)
+        mock_client.return_value.chat.completions.create.assert_awaited_once()
+
+    @patch("admin_panel.views.utilities.get_async_openai_client")
+    async def test_unmatched_question_strikes(self, mock_client):
+        """Test an unmatched question adds a strike and asks again"""
+        mock_client.return_value = gpt_reply("NONE")
+
+        content = await self.post(get_question_from_user_async, "/get_question_from_user/",
+                                  {"SpeechResult": "Could you tell me something"})
+
+        self.assertIn("Maybe try rephrasing your question.", content)
+        self.assertIn("/prompt_question/", content)
+        log = await Log.objects.aget(pk=self.log.pk)
+        self.assertEqual((log.strikes, log.total_strikes), (1, 1))
+
+    @patch("admin_panel.views.utilities.get_async_openai_client")
+    async def test_confirm_question_answers(self, mock_client):
+        """Test a plain yes is answered without GPT and the question is counted"""
+        content = await self.post(confirm_question_async, "/confirm_question/",
+                                  {"SpeechResult": "yes"}, "What%20are%20your%20hours%3F")
+
+        self.assertIn("We are open 9 to 5.", content)
+        mock_client.assert_not_called()
+        log = await Log.objects.aget(pk=self.log.pk)
+        self.assertEqual(log.intents["faq"], {"What are your hours?": 1})
+
+    @patch("admin_panel.views.utilities.get_async_openai_client")
+    async def test_process_post_answer_end(self, mock_client):
+        """Test asking to end the call hangs up"""
+        mock_client.return_value = gpt_reply("END")
+
+        content = await self.post(process_post_answer_async, "/process_post_answer/",
+                                  {"SpeechResult": "I'm done, bye"})
+
+        self.assertIn("<Hangup />", content)
+
+    async def test_call_status_update(self):
+        """Test a completed call closes its log"""
+        await self.post(call_status_update_async, "/call_status_update/",
+                        {"CallStatus": "completed"})
+
+        log = await Log.objects.aget(pk=self.log.pk)
+        self.assertIsNotNone(log.time_ended)
+        self.assertIsNotNone(log.length_of_call)
+
+    @patch("admin_panel.call_session.cache")
+    async def test_session_cache_not_blocking(self, mock_cache):
+        """Test async webhooks load, save and drop the call session with the async cache API"""
+        mock_cache.aget = AsyncMock(return_value=None)
+        mock_cache.aset = AsyncMock()
+        mock_cache.adelete = AsyncMock()
+        for method in (mock_cache.get, mock_cache.set, mock_cache.delete):
+            method.side_effect = AssertionError("blocking cache call")
+
+        await self.post(answer_call_async, "/answer/", {})
+        mock_cache.aset.assert_awaited_once()
+        await self.post(call_status_update_async, "/call_status_update/", {"CallStatus": "completed"})
+
+        self.assertEqual(mock_cache.aget.await_count, 2)
+        mock_cache.adelete.assert_awaited_once_with("call_session:CA1")
+
+
+class ThreadPoolWebhookTests(TransactionTestCase):
+    def test_schedule_view_runs_in_thread_pool(self):
+        """Test a scheduling webhook answers through its async variant"""
+        User.objects.create(phone_number="+17601231234", first_name="Ana", last_name="Lopez")
+        Log.objects.create(phone_number="+17601231234", time_started=timezone.now())
+        view = ASYNC_VARIANTS[phone_service_schedule.request_date_availability]
+        request = AsyncRequestFactory().post("/request_date_availability/", {"From": "+17601231234"})
+
+        response = async_to_sync(view)(request)
+
+        self.assertTrue(iscoroutinefunction(view))
+        self.assertIn("What date are you available", response.content.decode("utf-8"))
+
+    def test_load_test_command(self):
+        """Test the load test reports both modes and removes its callers"""
+        out = StringIO()
+        call_command("load_test_webhooks", "--calls", "4", "--workers", "2",
+                     "--llm-latency-ms", "1", stdout=out)
+
+        self.assertIn("sync (2 threads): 4 calls", out.getvalue())
+        self.assertIn("async (1 event loop): 4 calls", out.getvalue())
+        self.assertFalse(User.objects.filter(first_name="Load").exists())
+
+
+class WebhookRoutingTests(TestCase):
+    def test_sync_views_by_default(self):
+        """Test webhooks are routed to the sync views unless enabled"""
+        self.assertIs(webhook(phone_service_faq.answer_call, use_async=False),
+                      phone_service_faq.answer_call)
+        self.assertIs(webhook(phone_service_faq.answer_call, use_async=True), answer_call_async)
+
+    def test_every_phone_service_route_has_async_variant(self):
+        """Test every FAQ and scheduling route can be served async"""
+        views = set(ASYNC_VARIANTS) | set(ASYNC_VARIANTS.values())
+        for pattern in urlpatterns:
+            module = getattr(pattern.callback, "__module__", "")
+            if module.endswith(("phone_service_faq", "phone_service_schedule")):
+                self.assertIn(pattern.callback, views, pattern.name)
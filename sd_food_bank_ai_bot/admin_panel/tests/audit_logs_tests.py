@@ -1,6 +1,10 @@
 from django.test import TestCase, Client
+from admin_panel import log_search
 from admin_panel.models import Admin, Log
+import tracemalloc
 from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.urls import reverse
 from zoneinfo import ZoneInfo
@@ -68,4 +72,128 @@ class MainPageTests(TestCase):
         
         self.assertContains(response, "+16191231234")
         self.assertNotContains(response, "+16193214321")
-        self.assertNotContains(response, "No matching entries found")
\ No newline at end of file
+        self.assertNotContains(response, "No matching entries found")
+
+    def test_search_transcript(self):
+        """Test searching finds logs by words the caller said"""
+        self.log_2.transcript = [{"speaker": "user", "message": "Do you have Diapers today?"}]
+        self.log_2.save()
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('audit_logs'), {'q': "diapers"})
+
+        self.assertContains(response, "+16193214321")
+        self.assertNotContains(response, "+16191231234")
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.admin = Admin.objects.create_user(username='user1', password='pass123')
+        start = timezone.now() - timedelta(days=30)
+        for i in range(25):
+            log = Log.objects.create(phone_number=f"+1619555{i:04d}")
+            # Pairs of calls start at the same time, the id orders them
+            Log.objects.filter(pk=log.pk).update(time_started=start + timedelta(hours=i // 2))
+        self.newest_first = list(Log.objects.order_by("-time_started", "-id"))
+
+    def pages(self):
+        """Follow the next links from the first page to the last"""
+        page = log_search.keyset_page(Log.objects.all())
+        pages = [page]
+        while page.has_next:
+            page = log_search.keyset_page(Log.objects.all(), after=page.next_cursor)
+            pages.append(page)
+        return pages
+
+    def test_pages_cover_every_log_once(self):
+        """Test following next cursors visits every log once, newest first"""
+        pages = self.pages()
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([log.id for page in pages for log in page], [log.id for log in self.newest_first])
+        self.assertFalse(pages[0].has_previous)
+
+    def test_previous_page(self):
+        """Test the previous cursor returns the page before"""
+        first, second, _ = self.pages()
+        previous = log_search.keyset_page(Log.objects.all(), before=second.previous_cursor)
+
+        self.assertEqual(previous.logs, first.logs)
+        self.assertTrue(previous.has_next)
+        self.assertFalse(previous.has_previous)
+
+    def test_last_page(self):
+        """Test the last page holds the oldest logs"""
+        last = log_search.keyset_page(Log.objects.all(), last=True)
+
+        self.assertEqual([log.id for log in last], [log.id for log in self.newest_first[-10:]])
+        self.assertTrue(last.has_previous)
+        self.assertFalse(last.has_next)
+
+    def test_deep_page_without_offset(self):
+        """Test a later page is read with a bounded range query, not an OFFSET"""
+        _, second, _ = self.pages()
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('audit_logs'), {'after': second.next_cursor})
+
+        self.assertContains(response, self.newest_first[20].phone_number)
+        self.assertNotContains(response, self.newest_first[19].phone_number)
+        self.assertFalse([query for query in queries if "OFFSET" in query["sql"]])
+
+    def test_invalid_cursor(self):
+        """Test a mangled cursor shows the first page"""
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('audit_logs'), {'after': "not-a-cursor"})
+
+        self.assertContains(response, self.newest_first[0].phone_number)
+        self.assertContains(response, "25 logs")
+
+    def test_links_keep_filters(self):
+        """Test page links carry the search"""
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('audit_logs'), {'q': "+1619555"})
+
+        self.assertContains(response, "&q=%2B1619555")
+        self.assertContains(response, "25 logs")
+
+
+class ListMemoryTests(TestCase):
+    """Test list pages never load transcripts, measured with tracemalloc"""
+
+    def setUp(self):
+        self.admin = Admin.objects.create_user(username='user1', password='pass123')
+        # About 100 KB of transcript per call
+        transcript = [{"speaker": "user" if i % 2 else "bot", "message": f"Message {i} " + "x" * 180}
+                      for i in range(500)]
+        Log.objects.bulk_create([Log(phone_number=f"+1619555{i:04d}", transcript=transcript,
+                                     intents={"faq": {"What are your hours?": 1}})
+                                 for i in range(20)])
+        self.client.force_login(self.admin)
+
+    def peak_memory(self, function):
+        """Peak bytes allocated while function runs, after a warm up run"""
+        function()
+        tracemalloc.start()
+        try:
+            function()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_summaries_skip_transcripts(self):
+        """Test summaries select only their columns"""
+        with CaptureQueriesContext(connection) as queries:
+            rows = log_search.summaries(Log.objects.all())
+
+        self.assertEqual(len(rows), 20)
+        self.assertIsInstance(rows[0], log_search.LogSummary)
+        self.assertNotIn("transcript", queries[0]["sql"])
+        self.assertNotIn("intents", queries[0]["sql"])
+
+    def test_list_page_memory(self):
+        """Test an audit log page allocates far less than the transcripts it lists"""
+        full = self.peak_memory(lambda: list(Log.objects.order_by("-time_started")[:10]))
+        page = self.peak_memory(lambda: self.client.get(reverse('audit_logs')))
+
+        self.assertLess(page, full / 2)
+
@@ -0,0 +1,102 @@
+from datetime import date, time, timedelta
+from django.core.cache import cache
+from django.test import TestCase
+from admin_panel import availability
+from ..models import User, AppointmentTable
+
+DAY = date(2025, 5, 20)
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        """Start every test without cached availability"""
+        cache.clear()
+        self.user = User.objects.create(first_name="Billy", last_name="Bob", phone_number="+1234567890")
+
+    def book(self, day, start, end):
+        return AppointmentTable.objects.create(user=self.user, start_time=start, end_time=end,
+                                               location="Office", date=day)
+
+    def test_empty_day(self):
+        """Test a day without appointments has every slot free"""
+        self.assertEqual(availability.count_available(DAY), availability.SLOTS_PER_DAY)
+        self.assertEqual(availability.available_times(DAY)[0], time(9, 0))
+        self.assertEqual(availability.available_times(DAY)[-1], time(16, 45))
+
+    def test_partial_slots_are_booked(self):
+        """Test an appointment blocks every slot it overlaps"""
+        self.book(DAY, time(10, 5), time(10, 20))
+
+        times = availability.available_times(DAY)
+        self.assertNotIn(time(10, 0), times)
+        self.assertNotIn(time(10, 15), times)
+        self.assertIn(time(10, 30), times)
+        self.assertEqual(len(times), availability.SLOTS_PER_DAY - 2)
+
+    def test_signals_keep_cache_current(self):
+        """Test creating, moving and deleting appointments updates availability"""
+        self.assertEqual(availability.count_available(DAY), 32)
+        appointment = self.book(DAY, time(9, 0), time(9, 30))
+        self.assertEqual(availability.count_available(DAY), 30)
+
+        other_day = DAY + timedelta(days=1)
+        availability.count_available(other_day)
+        appointment.date = other_day
+        appointment.save()
+        self.assertEqual(availability.count_available(DAY), 32)
+        self.assertEqual(availability.count_available(other_day), 30)
+
+        appointment.delete()
+        self.assertEqual(availability.count_available(other_day), 32)
+
+    def test_cached_day_needs_no_query(self):
+        """Test a day is only read from the database once"""
+        self.book(DAY, time(9, 0), time(9, 30))
+        availability.count_available(DAY)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(availability.is_available(DAY))
+            availability.available_times(DAY)
+
+    def test_full_day(self):
+        """Test a fully booked day has no slots and no nearest slot"""
+        self.book(DAY, time(9, 0), time(17, 0))
+
+        self.assertFalse(availability.is_available(DAY))
+        self.assertIsNone(availability.nearest_slot(DAY, time(12, 0)))
+
+    def test_nearest_slot(self):
+        """Test the closest free slot is found on either side of a booking"""
+        self.book(DAY, time(11, 0), time(12, 0))
+
+        self.assertEqual(availability.nearest_slot(DAY, time(10, 15)), time(10, 15))
+        self.assertEqual(availability.nearest_slot(DAY, time(11, 10)), time(10, 45))
+        self.assertEqual(availability.nearest_slot(DAY, time(11, 50)), time(12, 0))
+        self.assertEqual(availability.nearest_slot(DAY, time(8, 0)), time(9, 0))
+        self.assertEqual(availability.nearest_slot(DAY, time(18, 0)), time(16, 45))
+
+    def test_range_in_one_query(self):
+        """Test a range of days is read with a single query"""
+        self.book(DAY, time(9, 0), time(17, 0))
+        self.book(DAY + timedelta(days=2), time(9, 0), time(10, 0))
+
+        with self.assertNumQueries(1):
+            days = availability.available_days(DAY, DAY + timedelta(days=3))
+
+        self.assertEqual(days, {DAY: 0, DAY + timedelta(days=1): 32,
+                                DAY + timedelta(days=2): 28, DAY + timedelta(days=3): 32})
+        with self.assertNumQueries(0):
+            availability.available_days(DAY, DAY + timedelta(days=3))
+
+    def test_next_open_days(self):
+        """Test the soonest days with a free slot are returned in order"""
+        self.book(DAY, time(9, 0), time(17, 0))
+        self.book(DAY + timedelta(days=2), time(9, 0), time(17, 0))
+        self.book(DAY + timedelta(days=3), time(9, 0), time(16, 0))
+
+        with self.assertNumQueries(1):
+            open_days = availability.next_open_days(DAY, 3, 14)
+
+        self.assertEqual(open_days, [(DAY + timedelta(days=1), 32), (DAY + timedelta(days=3), 4),
+                                     (DAY + timedelta(days=4), 32)])
+        self.assertEqual(availability.next_open_days(DAY, 3, 1), [])
@@ -0,0 +1,51 @@
+from io import StringIO
+from datetime import timedelta
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from unittest.mock import patch, MagicMock
+from ..models import Log
+
+
+def twilio_call(sid, from_, start_time, direction="inbound"):
+    return MagicMock(sid=sid, from_=from_, start_time=start_time, direction=direction)
+
+
+class BackfillCallSidsTests(TestCase):
+    def setUp(self):
+        self.started = timezone.now() - timedelta(days=1)
+        self.log = Log.objects.create(phone_number="+16195550001")
+        self.other_log = Log.objects.create(phone_number="+16195550001")
+        Log.objects.filter(pk=self.log.pk).update(time_started=self.started)
+        Log.objects.filter(pk=self.other_log.pk).update(time_started=self.started + timedelta(hours=2))
+
+    @patch("admin_panel.management.commands.backfill_call_sids.get_twilio_client")
+    def test_logs_matched_to_closest_call(self, mock_twilio):
+        """Test each log gets the inbound call from its number that started closest to it"""
+        mock_twilio.return_value.calls.list.return_value = [
+            twilio_call("CA1", "+16195550001", self.started + timedelta(seconds=3)),
+            twilio_call("CA2", "+16195550001", self.started + timedelta(hours=2, seconds=1)),
+            twilio_call("CA3", "+16195550001", self.started, direction="outbound-dial"),
+            twilio_call("CA4", "+16195550002", self.started),
+        ]
+        out = StringIO()
+
+        call_command("backfill_call_sids", stdout=out)
+
+        self.assertEqual(Log.objects.get(pk=self.log.pk).call_sid, "CA1")
+        self.assertEqual(Log.objects.get(pk=self.other_log.pk).call_sid, "CA2")
+        self.assertIn("Matched 2 of 2 logs", out.getvalue())
+
+    @patch("admin_panel.management.commands.backfill_call_sids.get_twilio_client")
+    def test_dry_run_and_tolerance(self, mock_twilio):
+        """Test calls too far from a log are ignored and a dry run saves nothing"""
+        mock_twilio.return_value.calls.list.return_value = [
+            twilio_call("CA1", "+16195550001", self.started + timedelta(seconds=30)),
+            twilio_call("CA2", "+16195550001", self.started + timedelta(hours=1)),
+        ]
+        out = StringIO()
+
+        call_command("backfill_call_sids", "--dry-run", "--tolerance", "60", stdout=out)
+
+        self.assertIn("Would match 1 of 2 logs", out.getvalue())
+        self.assertFalse(Log.objects.filter(call_sid__isnull=False).exists())
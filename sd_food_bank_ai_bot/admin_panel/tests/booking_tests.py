@@ -0,0 +1,166 @@
+import importlib
+import threading
+import unittest
+from datetime import date, datetime, time, timedelta
+from django.apps import apps
+from django.db import connection, IntegrityError
+from django.test import TestCase, TransactionTestCase, Client
+from django.utils import timezone
+from admin_panel.booking import hold_slot, book_slot, release_holds, SlotUnavailable
+from ..models import User, AppointmentTable, SlotHold
+
+DAY = date(2025, 5, 20)
+START = time(10, 0)
+END = time(10, 15)
+# Appointments store the day at local midnight
+BOOKED_DAY = timezone.make_aware(datetime.combine(DAY, time.min))
+
+
+class BookingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(first_name="Billy", last_name="Bob", phone_number="+1234567890")
+
+    def test_hold_blocks_other_callers(self):
+        """Test a held slot can't be held or booked by another caller"""
+        self.assertTrue(hold_slot(DAY, START, END, "CA1"))
+        self.assertTrue(hold_slot(DAY, START, END, "CA1"))
+
+        self.assertFalse(hold_slot(DAY, START, END, "CA2"))
+        with self.assertRaises(SlotUnavailable):
+            book_slot(self.user, DAY, START, END, "CA2")
+
+    def test_expired_hold_taken_over(self):
+        """Test a hold left by a caller who hung up is released on timeout"""
+        hold_slot(DAY, START, END, "CA1")
+        SlotHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertTrue(hold_slot(DAY, START, END, "CA2"))
+        self.assertEqual(SlotHold.objects.get().holder, "CA2")
+
+    def test_new_hold_releases_previous(self):
+        """Test a caller only ever holds one slot"""
+        hold_slot(DAY, START, END, "CA1")
+        hold_slot(DAY, time(11, 0), time(11, 15), "CA1")
+
+        self.assertEqual(list(SlotHold.objects.values_list("start_time", flat=True)), [time(11, 0)])
+        release_holds("CA1")
+        self.assertFalse(SlotHold.objects.exists())
+
+    def test_book_held_slot(self):
+        """Test the holder books their slot and the hold is removed"""
+        hold_slot(DAY, START, END, "CA1")
+
+        appointment = book_slot(self.user, DAY, START, END, "CA1")
+
+        self.assertEqual(appointment.user, self.user)
+        self.assertFalse(SlotHold.objects.exists())
+        self.assertFalse(hold_slot(DAY, START, END, "CA2"))
+
+    def test_overlapping_appointment_rejected(self):
+        """Test a slot overlapped by an existing appointment can't be booked"""
+        AppointmentTable.objects.create(user=self.user, start_time=time(9, 45), end_time=time(10, 15), date=BOOKED_DAY)
+
+        with self.assertRaises(SlotUnavailable):
+            book_slot(self.user, DAY, START, END, "CA1")
+        self.assertFalse(SlotHold.objects.exists())
+
+    def test_unique_slot_constraint(self):
+        """Test the database refuses two appointments in the same slot"""
+        AppointmentTable.objects.create(user=self.user, start_time=START, end_time=END, date=BOOKED_DAY)
+
+        with self.assertRaises(IntegrityError):
+            AppointmentTable.objects.create(user=self.user, start_time=START, end_time=END, date=BOOKED_DAY)
+
+    def test_migration_moves_days_to_midnight(self):
+        """Test the constraint migration moves booked days to local midnight"""
+        booked = AppointmentTable.objects.create(user=self.user, start_time=START, end_time=END,
+                                                 date=timezone.make_aware(datetime.combine(DAY, time(8, 30))))
+        migration = importlib.import_module("admin_panel.migrations.0025_slothold_unique_appointment_slot")
+
+        migration.normalize_appointment_slots(apps, None)
+
+        booked.refresh_from_db()
+        self.assertEqual(booked.date, timezone.make_aware(datetime.combine(DAY, time.min)))
+
+    def test_migration_stops_on_double_booking(self):
+        """Test the constraint migration names double bookings and keeps them"""
+        AppointmentTable.objects.create(user=self.user, start_time=START, end_time=END, date=BOOKED_DAY)
+        later = AppointmentTable.objects.create(user=self.user, start_time=START, end_time=END,
+                                                date=timezone.make_aware(datetime.combine(DAY, time(8, 30))))
+        migration = importlib.import_module("admin_panel.migrations.0025_slothold_unique_appointment_slot")
+
+        with self.assertRaisesRegex(RuntimeError, rf"\b{later.id} \(same slot as"):
+            migration.normalize_appointment_slots(apps, None)
+
+        self.assertEqual(AppointmentTable.objects.count(), 2)
+        later.refresh_from_db()
+        self.assertEqual(later.date, timezone.make_aware(datetime.combine(DAY, time(8, 30))))
+
+
+class BookingViewsTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create(first_name="Billy", last_name="Bob", phone_number="+1234567890")
+        self.day = timezone.now().date() + timedelta(days=7)
+
+    def test_held_slot_not_confirmed(self):
+        """Test a caller is asked for another time when the slot is held by someone else"""
+        hold_slot(self.day, START, END, "CA-other")
+
+        response = self.client.post(f"/confirm_time_selection/10%3A00%20AM/{self.day}/",
+                                    {"From": "+1234567890", "CallSid": "CA-mine"})
+
+        self.assertIn("Sorry, that time was just taken", response.content.decode())
+        self.assertNotIn("final_confirmation", response.content.decode())
+
+    def test_confirmation_books_held_slot(self):
+        """Test the slot held while confirming is booked on yes"""
+        data = {"From": "+1234567890", "CallSid": "CA-mine"}
+        self.client.post(f"/confirm_time_selection/10%3A00%20AM/{self.day}/", data)
+        self.assertEqual(SlotHold.objects.get().holder, "CA-mine")
+
+        response = self.client.post(f"/final_confirmation/10:00 AM/{self.day}/", {**data, "SpeechResult": "yes"})
+
+        self.assertIn("Your appointment has been scheduled", response.content.decode())
+        self.assertTrue(AppointmentTable.objects.filter(user=self.user, start_time=START).exists())
+        self.assertFalse(SlotHold.objects.exists())
+
+    def test_declined_confirmation_releases_hold(self):
+        """Test saying no gives the slot back"""
+        data = {"From": "+1234567890", "CallSid": "CA-mine"}
+        self.client.post(f"/confirm_time_selection/10%3A00%20AM/{self.day}/", data)
+
+        self.client.post(f"/final_confirmation/10:00 AM/{self.day}/", {**data, "SpeechResult": "no"})
+
+        self.assertFalse(SlotHold.objects.exists())
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "SQLite refuses concurrent writers outright")
+class ConcurrentBookingTests(TransactionTestCase):
+    THREADS = 16
+
+    def test_no_double_booking(self):
+        """Test many callers booking the same slot at once never book it twice"""
+        users = [User.objects.create(first_name="Caller", last_name=str(i), phone_number=f"+1555000{i:04d}")
+                 for i in range(self.THREADS)]
+        barrier = threading.Barrier(self.THREADS)
+        booked = []
+
+        def book(user, holder):
+            try:
+                barrier.wait()
+                book_slot(user, DAY, START, END, holder)
+                booked.append(holder)
+            except SlotUnavailable:
+                pass
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=(user, f"CA{i}")) for i, user in enumerate(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLessEqual(len(booked), 1)
+        self.assertLessEqual(AppointmentTable.objects.filter(date__date=DAY, start_time=START).count(), 1)
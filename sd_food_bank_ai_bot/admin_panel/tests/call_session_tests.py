@@ -0,0 +1,158 @@
+from datetime import timedelta
+from django.test import TestCase, Client
+from django.utils import timezone
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from admin_panel.models import User, Log
+from admin_panel.call_session import CallSession
+
+
+class CallSessionTests(TestCase):
+    def setUp(self):
+        """Set up a caller and an empty cache"""
+        cache.clear()
+        self.client = Client()
+        self.phone_number = "+1234567890"
+        self.call_sid = "CA123"
+        self.user = User.objects.create(first_name="Test", last_name="User",
+                                        phone_number=self.phone_number, language="en")
+
+    def post(self, url, data=None, call_sid=None):
+        payload = {"From": self.phone_number, "CallSid": call_sid or self.call_sid}
+        payload.update(data or {})
+        return self.client.post(url, payload)
+
+    def selects_from(self, queries, table):
+        return [query for query in queries
+                if query["sql"].startswith("SELECT") and table in query["sql"]]
+
+    def test_init_answer_stores_session(self):
+        """Test the first webhook of a call caches the user and the new log"""
+        self.post("/init_answer/")
+
+        session = CallSession.load(self.call_sid, self.phone_number)
+        self.assertEqual(session.user_id, self.user.id)
+        self.assertEqual(session.log_id, Log.objects.get().id)
+        self.assertEqual(session.language, "en")
+
+    def test_later_hops_skip_lookups(self):
+        """Test later webhooks of the call read the user and log by primary key only"""
+        self.post("/init_answer/")
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.post("/answer/")
+
+        self.assertEqual(response.status_code, 200)
+        selects = (self.selects_from(context.captured_queries, "admin_panel_user")
+                   + self.selects_from(context.captured_queries, "admin_panel_log"))
+        self.assertEqual(len(selects), 2)
+        for query in selects:
+            self.assertNotIn("phone_number\" =", query["sql"])
+            self.assertNotIn("call_sid\" =", query["sql"])
+
+    def test_session_caches_ids_not_rows(self):
+        """Test a hop on another worker reads the log fresh rather than a stale copy"""
+        self.post("/init_answer/")
+        session = CallSession.load(self.call_sid, self.phone_number)
+        Log.objects.update(total_strikes=2, intents={"faq": {}})
+
+        log = session.get_log()
+        self.assertEqual((log.total_strikes, log.intents), (2, {"faq": {}}))
+        self.assertIsNone(session.user)
+
+    def test_transcript_kept_across_hops(self):
+        """Test messages written on different hops all reach the database"""
+        self.post("/init_answer/")
+        self.post("/answer/")
+
+        log = Log.objects.get()
+        self.assertEqual(len(log.transcript), 3)
+
+    def test_language_change_kept_in_session(self):
+        """Test switching language is seen by the next hop of the call"""
+        self.post("/init_answer/")
+        self.post("/answer/", {"Digits": "0"})
+
+        session = CallSession.load(self.call_sid, self.phone_number)
+        self.assertEqual(session.language, "es")
+        self.assertEqual(User.objects.get().language, "es")
+
+    def test_other_call_does_not_share_session(self):
+        """Test a different CallSid starts from the database"""
+        self.post("/init_answer/")
+
+        session = CallSession.load("CA456", self.phone_number)
+        self.assertIsNone(session.user_id)
+        self.assertIsNone(session.log_id)
+
+    def test_mismatched_number_ignored(self):
+        """Test a cached session is not used for a different caller"""
+        self.post("/init_answer/")
+
+        session = CallSession.load(self.call_sid, "+1987654321")
+        self.assertIsNone(session.user_id)
+
+    def test_status_update_invalidates_session(self):
+        """Test the session is dropped once the call is completed"""
+        self.post("/init_answer/")
+        self.post("/call_status_update/", {"CallStatus": "completed"})
+
+        session = CallSession.load(self.call_sid, self.phone_number)
+        self.assertIsNone(session.user_id)
+        self.assertIsNotNone(Log.objects.get().time_ended)
+
+    def test_no_call_sid_falls_back_to_database(self):
+        """Test requests without a CallSid still resolve the caller"""
+        session = CallSession.load(None, self.phone_number)
+        self.assertEqual(session.get_user().id, self.user.id)
+        session.save()
+
+        self.assertIsNone(cache.get("call_session:None"))
+
+    def test_missing_user_raises(self):
+        """Test an unknown number raises like a normal lookup"""
+        session = CallSession.load(self.call_sid, "+1987654321")
+        with self.assertRaises(User.DoesNotExist):
+            session.get_user()
+
+    def test_log_recorded_with_call_sid(self):
+        """Test the call's log stores its CallSid and a retried first webhook reuses it"""
+        self.post("/init_answer/")
+        self.post("/init_answer/")
+
+        self.assertEqual(Log.objects.get().call_sid, self.call_sid)
+
+    def test_overlapping_calls_keep_their_logs(self):
+        """Test two calls from one number each resolve their own log"""
+        self.post("/init_answer/")
+        self.post("/init_answer/", call_sid="CA456")
+        cache.clear()
+
+        first = CallSession.load(self.call_sid, self.phone_number).get_log()
+        second = CallSession.load("CA456", self.phone_number).get_log()
+
+        self.assertEqual(first.call_sid, self.call_sid)
+        self.assertEqual(second.call_sid, "CA456")
+
+    def test_status_update_closes_its_own_log(self):
+        """Test the completed call's log is closed, not the caller's latest one"""
+        self.post("/init_answer/")
+        self.post("/init_answer/", call_sid="CA456")
+        Log.objects.update(time_started=timezone.now() - timedelta(hours=1))
+        cache.clear()
+
+        self.post("/call_status_update/", {"CallStatus": "completed"})
+
+        self.assertGreaterEqual(Log.objects.get(call_sid=self.call_sid).length_of_call, timedelta(hours=1))
+        self.assertEqual(Log.objects.get(call_sid="CA456").length_of_call, timedelta(0))
+
+    def test_unknown_call_sid_leaves_other_logs(self):
+        """Test a status update for a call without a log doesn't close the caller's previous call"""
+        self.post("/init_answer/")
+        Log.objects.update(time_started=timezone.now() - timedelta(hours=1))
+        cache.clear()
+
+        self.post("/call_status_update/", {"CallStatus": "completed"}, call_sid="CA456")
+
+        self.assertEqual(Log.objects.get(call_sid=self.call_sid).length_of_call, timedelta(0))
@@ -0,0 +1,81 @@
+import asyncio
+import os
+from django.test import TestCase, override_settings
+from unittest.mock import patch, MagicMock
+from google.auth.credentials import AnonymousCredentials
+from admin_panel import clients
+
+
+class SharedClientsTests(TestCase):
+    def setUp(self):
+        """Start every test without shared clients"""
+        clients.reset_clients()
+        self.addCleanup(clients.reset_clients)
+
+    @patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"})
+    @override_settings(OPENAI_TIMEOUT=3, OPENAI_MAX_RETRIES=0)
+    def test_openai_client_shared_and_configured(self):
+        """Test the OpenAI client is built once with the configured limits"""
+        client = clients.get_openai_client()
+
+        self.assertIs(client, clients.get_openai_client())
+        self.assertEqual(client.timeout, 3)
+        self.assertEqual(client.max_retries, 0)
+
+    @patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"})
+    @override_settings(OPENAI_TIMEOUT=3)
+    def test_async_openai_client_per_event_loop(self):
+        """Test the async OpenAI client is shared within an event loop only"""
+        async def get_twice():
+            return clients.get_async_openai_client(), clients.get_async_openai_client()
+
+        first, again = asyncio.run(get_twice())
+        other, _ = asyncio.run(get_twice())
+
+        self.assertIs(first, again)
+        self.assertIsNot(first, other)
+        self.assertEqual(first.timeout, 3)
+
+    def test_twilio_client_shared(self):
+        """Test the Twilio client is built once and uses the pooled http client"""
+        client = clients.get_twilio_client()
+
+        self.assertIs(client, clients.get_twilio_client())
+        self.assertIsInstance(client.http_client, clients.PooledTwilioHttpClient)
+
+    @patch("admin_panel.clients.google.auth.default")
+    def test_translate_client_shared(self, mock_default):
+        """Test the translate client is built once with our session"""
+        mock_default.return_value = (AnonymousCredentials(), None)
+
+        client = clients.get_translate_client()
+
+        self.assertIs(client, clients.get_translate_client())
+        self.assertIsInstance(client._http, clients.TimeoutAuthorizedSession)
+        mock_default.assert_called_once()
+
+    def test_reset_clients(self):
+        """Test a reset builds new clients"""
+        client = clients.get_twilio_client()
+        clients.reset_clients()
+
+        self.assertIsNot(client, clients.get_twilio_client())
+
+    def test_pooled_twilio_session_reused(self):
+        """Test Twilio requests go through the same session with the default timeout"""
+        http_client = clients.PooledTwilioHttpClient(timeout=4, retries=1)
+        http_client.session.send = MagicMock(return_value=MagicMock(status_code=201, content=b"{}"))
+
+        http_client.request("post", "https://api.twilio.com/Messages.json", data={"Body": "Hi"})
+        http_client.request("post", "https://api.twilio.com/Messages.json", data={"Body": "Hi"})
+
+        self.assertEqual(http_client.session.send.call_count, 2)
+        self.assertEqual(http_client.session.send.call_args.kwargs["timeout"], 4)
+
+    def test_retries_only_failed_connections(self):
+        """Test requests that reached the server are never retried"""
+        retry = clients.connection_retries(3)
+
+        self.assertEqual(retry.connect, 3)
+        self.assertEqual(retry.read, 0)
+        self.assertEqual(retry.status, 0)
@@ -0,0 +1,115 @@
+from io import StringIO
+from datetime import date, time
+from django.test import TestCase, Client
+from django.core.management import call_command
+from django.urls import reverse
+from unittest.mock import patch, MagicMock
+from admin_panel.datetime_parser import (parse_date, parse_time, parse_weekday, format_time,
+                                         load_corpus, parse_case)
+from admin_panel.views.utilities import get_day
+from ..models import User
+
+# A Wednesday
+TODAY = date(2025, 4, 16)
+
+
+class DateTimeParserTests(TestCase):
+    def test_corpus(self):
+        """Test every labeled utterance parses to its expected value"""
+        today, cases = load_corpus()
+        for case in cases:
+            self.assertEqual(parse_case(case, today), case["expected"], case["text"])
+
+    def test_weekdays_are_in_the_future(self):
+        """Test a weekday is never today, even when said on that day"""
+        self.assertEqual(parse_date("Wednesday", today=TODAY), date(2025, 4, 23))
+        self.assertEqual(parse_date("el miércoles", today=TODAY), date(2025, 4, 23))
+
+    def test_past_dates_roll_to_next_year(self):
+        """Test a month and day already past this year mean next year"""
+        self.assertEqual(parse_date("January 10th", today=TODAY), date(2026, 1, 10))
+        self.assertIsNone(parse_date("February 30th", today=TODAY))
+
+    def test_morning_is_not_tomorrow(self):
+        """Test "la mañana" is read as the morning, not tomorrow"""
+        self.assertIsNone(parse_date("por la mañana", today=TODAY))
+        self.assertEqual(parse_time("a las diez de la mañana"), time(10, 0))
+
+    def test_business_hours_without_am_pm(self):
+        """Test hours without am or pm are placed within business hours"""
+        self.assertEqual(parse_time("at 3"), time(15, 0))
+        self.assertEqual(parse_time("at 10"), time(10, 0))
+        self.assertEqual(parse_time("at 3 in the morning"), time(3, 0))
+
+    def test_parse_weekday(self):
+        """Test the weekday is returned in English for both languages"""
+        self.assertEqual(parse_weekday("el jueves"), "Thursday")
+        self.assertEqual(parse_weekday("Can I come Thursday"), "Thursday")
+        self.assertIsNone(parse_weekday("Thursday or Friday"))
+
+    def test_format_time(self):
+        """Test times are formatted like the GPT prompt asks for"""
+        self.assertEqual(format_time(time(14, 45)), "2:45 PM")
+        self.assertEqual(format_time(time(9, 0)), "9:00 AM")
+
+    def test_benchmark_command(self):
+        """Test the benchmark reports coverage and latency"""
+        out = StringIO()
+        call_command("benchmark_datetime_parser", "--repeat", "1", stdout=out)
+
+        self.assertIn("Coverage of parseable answers", out.getvalue())
+        self.assertIn("Unclear answers resolved locally: 0", out.getvalue())
+
+
+class DateTimeViewsTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create(first_name="Billy", last_name="Bob", phone_number="+1234567890",
+                            email="billybob@email.com")
+
+    @patch("admin_panel.views.phone_service_schedule.get_openai_client")
+    @patch("admin_panel.views.phone_service_schedule.parse_date", return_value=date(2025, 4, 22))
+    def test_generate_date_skips_gpt(self, mock_parse_date, mock_openai):
+        """Test a parsed date never reaches GPT"""
+        response = self.client.post(reverse("generate_date"), {"SpeechResult": "Next Tuesday",
+                                                               "From": "+1234567890"})
+
+        self.assertIn("Your requested date was April 22, 2025", response.content.decode())
+        mock_openai.assert_not_called()
+
+    @patch("admin_panel.views.phone_service_schedule.get_openai_client")
+    def test_generate_date_none_asks_again(self, mock_openai):
+        """Test GPT finding no date asks again instead of failing"""
+        mock_openai.return_value.chat.completions.create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content="NONE"))]
+        )
+        response = self.client.post(reverse("generate_date"), {"SpeechResult": "Whenever works",
+                                                               "From": "+1234567890"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Sorry, I didn't catch a valid date", response.content.decode())
+        mock_openai.return_value.chat.completions.create.assert_called_once()
+
+    @patch("admin_panel.views.phone_service_schedule.get_openai_client")
+    def test_generate_requested_time_skips_gpt(self, mock_openai):
+        """Test a parsed time never reaches GPT"""
+        url = reverse("generate_requested_time") + "?date=2025-04-22"
+        response = self.client.post(url, {"SpeechResult": "A las tres y media", "From": "+1234567890"})
+
+        self.assertIn("Your requested time was 3:30 PM", response.content.decode())
+        mock_openai.assert_not_called()
+
+    @patch("admin_panel.views.phone_service_schedule.get_openai_client")
+    def test_get_time_response_listed_time_skips_gpt(self, mock_openai):
+        """Test a time from the offered list never reaches GPT"""
+        url = reverse("get_time_response") + "?date=2025-04-22&time_list=09%3A00%20AM%2C%20and%2010%3A15%20AM"
+        response = self.client.post(url, {"SpeechResult": "Quarter past ten", "From": "+1234567890"})
+
+        self.assertIn("Your requested time was 10:15 AM", response.content.decode())
+        mock_openai.assert_not_called()
+
+    @patch("admin_panel.views.utilities.get_openai_client")
+    def test_get_day_skips_gpt(self, mock_openai):
+        """Test a spoken weekday never reaches GPT"""
+        self.assertEqual(get_day("el viernes por favor"), "Friday")
+        mock_openai.assert_not_called()
@@ -1,6 +1,7 @@
 # admin_panel/tests/test_monitoring_page_e2e.py
 import os
 from django.contrib.staticfiles.testing import StaticLiveServerTestCase
+from django.core.management import call_command
 from django.utils import timezone
 from datetime import timedelta
 from playwright.sync_api import sync_playwright
@@ -36,6 +37,8 @@ class MonitoringPageE2ETest(StaticLiveServerTestCase):
         Log.objects.create(phone_number="+15550000001", time_started=now - timedelta(days=365))
         Log.objects.create(phone_number="+15550000002", time_started=now - timedelta(days=30))
         Log.objects.create(phone_number="+15550000003", time_started=now)
+        # The dashboard reads the rollups of closed calls
+        call_command("rebuild_call_rollups")
 
     def test_monitoring_page_displays_and_filters(self):
         page = self.browser.new_page()
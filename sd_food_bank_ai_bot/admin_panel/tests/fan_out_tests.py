@@ -0,0 +1,101 @@
+import threading
+import time
+from contextvars import ContextVar
+from django.utils import timezone
+from django.test import TestCase, RequestFactory
+from unittest.mock import patch
+from admin_panel.fan_out import run_concurrently
+from admin_panel.models import User, Log
+from admin_panel.translation_cache import translation_cache
+from admin_panel.views.phone_service_schedule import check_for_appointment
+from admin_panel.views.utilities import translate_template_with_values
+
+request_id = ContextVar("request_id", default=None)
+
+
+class RunConcurrentlyTests(TestCase):
+    def test_results_in_order(self):
+        """Test results come back in the order the calls were given"""
+        self.assertEqual(run_concurrently(lambda: 1, lambda: 2, lambda: 3), [1, 2, 3])
+        self.assertEqual(run_concurrently(lambda: 1), [1])
+        self.assertEqual(run_concurrently(), [])
+
+    def test_calls_overlap(self):
+        """Test the calls wait at the same time, not one after the other"""
+        start = time.perf_counter()
+        run_concurrently(*(lambda: time.sleep(0.2) for _ in range(4)))
+
+        self.assertLess(time.perf_counter() - start, 0.6)
+
+    def test_first_call_runs_inline(self):
+        """Test the first call stays in the calling thread and the rest do not"""
+        threads = run_concurrently(threading.get_ident, threading.get_ident)
+
+        self.assertEqual(threads[0], threading.get_ident())
+        self.assertNotEqual(threads[1], threading.get_ident())
+
+    def test_context_copied(self):
+        """Test pooled calls see the caller's context variables"""
+        token = request_id.set("CA1")
+        self.addCleanup(request_id.reset, token)
+
+        self.assertEqual(run_concurrently(request_id.get, request_id.get), ["CA1", "CA1"])
+
+    def test_error_raised(self):
+        """Test an error in a pooled call reaches the caller"""
+        def fail():
+            raise ValueError("translator down")
+
+        with self.assertRaisesMessage(ValueError, "translator down"):
+            run_concurrently(lambda: 1, fail)
+
+
+class FanOutViewTests(TestCase):
+    def setUp(self):
+        translation_cache.clear()
+
+    @patch("admin_panel.views.utilities.get_translate_client")
+    def test_template_and_values_translated(self, mock_client):
+        """Test a template and its values are translated and filled in"""
+        def translate(text, **kwargs):
+            time.sleep(0.2)
+            return {"translatedText": "ES " + text}
+        mock_client.return_value.translate.side_effect = translate
+
+        start = time.perf_counter()
+        text = translate_template_with_values("en", "es", "Is {date} at {time} good, {name}?",
+                                              {"date": "May 1", "time": "9 AM"}, name="Ana")
+
+        self.assertEqual(text, "ES Is {date} at {time} good, {name}?".format(
+            date="ES May 1", time="ES 9 AM", name="Ana"))
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    @patch("admin_panel.views.utilities.get_translate_client")
+    def test_mangled_template_translated_filled_in(self, mock_client):
+        """Test the filled in text is translated when placeholders are lost"""
+        mock_client.return_value.translate.side_effect = lambda text, **kwargs: {"translatedText": "ES"}
+
+        text = translate_template_with_values("en", "es", "See you on {date}", {"date": "May 1"})
+
+        self.assertEqual(text, "ES")
+        mock_client.return_value.translate.assert_any_call(
+            "See you on May 1", target_language="es", source_language="en")
+
+    @patch("admin_panel.views.phone_service_schedule.get_response_sentiment")
+    def test_check_for_appointment_overlaps_sentiment(self, mock_sentiment):
+        """Test availability is looked up while the answer is classified"""
+        User.objects.create(phone_number="+17601231234", first_name="Ana", last_name="Lopez")
+        Log.objects.create(phone_number="+17601231234", time_started=timezone.now())
+        sentiment_threads = []
+
+        def record_thread(text):
+            sentiment_threads.append(threading.get_ident())
+            return True
+        mock_sentiment.side_effect = record_thread
+
+        request = RequestFactory().post("/check_for_appointment/2030-04-02/",
+                                        {"From": "+17601231234", "SpeechResult": "yes"})
+        response = check_for_appointment(request, "2030-04-02")
+
+        self.assertIn("There is availability during April 02, 2030", response.content.decode())
+        self.assertNotEqual(sentiment_threads, [threading.get_ident()])
@@ -0,0 +1,133 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from unittest.mock import patch
+from admin_panel.models import FAQ
+from admin_panel.faq_index import FAQIndex, faq_index, OPERATOR_QUESTION
+from admin_panel.views.utilities import get_matching_question
+
+
+class FAQIndexTests(TestCase):
+    def setUp(self):
+        """Set up FAQs and a fresh index"""
+        self.faq_1 = FAQ.objects.create(question="When does the food bank open?",
+                                        answer="The food bank is open Monday-Friday from 9:00 AM to 5:00 PM")
+        self.faq_2 = FAQ.objects.create(question="How can I schedule an appointment?",
+                                        answer="To schedule an appointment, visit calendly.com/sdfb.")
+        self.faq_3 = FAQ.objects.create(question="Where are you located?",
+                                        answer="We are located in San Diego.")
+        self.index = FAQIndex()
+
+    def test_exact_question_matches(self):
+        """Test an exact question is matched with full confidence"""
+        question, confidence = self.index.best_match("When does the food bank open?")
+
+        self.assertEqual(question, "When does the food bank open?")
+        self.assertAlmostEqual(confidence, 1.0, places=5)
+
+    def test_paraphrased_question_matches(self):
+        """Test a close paraphrase still picks the right question"""
+        question, confidence = self.index.best_match("how do i schedule an appointment")
+
+        self.assertEqual(question, "How can I schedule an appointment?")
+        self.assertGreater(confidence, 0.5)
+
+    def test_operator_question_always_indexed(self):
+        """Test the operator option is matchable without an FAQ for it"""
+        question, _ = self.index.best_match("can I speak to an operator")
+
+        self.assertEqual(question, OPERATOR_QUESTION)
+
+    def test_unrelated_question_low_confidence(self):
+        """Test unrelated questions score below the fallback threshold"""
+        question, confidence = self.index.best_match("Do you sell gift cards?")
+
+        self.assertLess(confidence, 0.5)
+
+    def test_top_k_ordering(self):
+        """Test search returns the best k results from best to worst"""
+        results = self.index.search("where is the food bank located", k=2)
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0][0], "Where are you located?")
+        self.assertGreaterEqual(results[0][1], results[1][1])
+
+    def test_incremental_add_update_remove(self):
+        """Test the index follows created, edited and deleted FAQs"""
+        self.index.build()
+
+        faq = FAQ.objects.create(question="Do you deliver food to seniors?", answer="Yes.")
+        self.index.add_or_update(faq.id, faq.question)
+        self.assertEqual(self.index.best_match("deliver food to seniors")[0], faq.question)
+
+        faq.question = "Can I volunteer at the food bank?"
+        faq.save()
+        self.index.add_or_update(faq.id, faq.question)
+        self.assertEqual(self.index.best_match("volunteer at the food bank")[0], faq.question)
+        self.assertNotEqual(self.index.best_match("deliver food to seniors")[0], "Do you deliver food to seniors?")
+
+        faq_id = faq.id
+        faq.delete()
+        self.index.remove(faq_id)
+        self.assertNotEqual(self.index.best_match("volunteer at the food bank")[0], "Can I volunteer at the food bank?")
+
+    @override_settings(FAQ_INDEX_CHECK_SECONDS=0)
+    def test_stale_index_rebuilds(self):
+        """Test changes made without notifying the index are picked up"""
+        self.index.build()
+        FAQ.objects.filter(id=self.faq_3.id).update(question="Is there parking available?")
+        FAQ.objects.create(question="What documents do I need to bring?", answer="An ID.")
+
+        self.assertEqual(self.index.best_match("what documents do I need to bring")[0],
+                         "What documents do I need to bring?")
+
+    def test_signature_checked_once_per_interval(self):
+        """Test searches right after a check don't query the FAQ table"""
+        self.index.best_match("when do you open")
+
+        with self.assertNumQueries(0):
+            self.index.best_match("when do you open")
+            self.index.best_match("where are you located")
+
+
+class FAQIndexViewTests(TestCase):
+    def setUp(self):
+        """Set up a logged in admin and build the shared index"""
+        self.client = Client()
+        self.user = get_user_model().objects.create_user(username='testuser',
+                                                         password='testpassword')
+        self.client.force_login(self.user)
+        self.faq = FAQ.objects.create(question="When does the food bank open?",
+                                      answer="9:00 AM")
+        faq_index.build()
+
+    def test_create_faq_updates_index(self):
+        """Test creating an FAQ through the admin panel makes it matchable"""
+        self.client.post(reverse('create_faq'), {"question": "Is there parking available?",
+                                                 "answer": "Yes, behind the building."})
+
+        self.assertEqual(faq_index.best_match("is there parking available")[0],
+                         "Is there parking available?")
+
+    def test_edit_faq_updates_index(self):
+        """Test editing an FAQ through the admin panel replaces the old question"""
+        self.client.post(reverse('edit_faq', args=[self.faq.id]),
+                         {"question": "When does the food bank close?", "answer": "5:00 PM"})
+
+        self.assertEqual(faq_index.best_match("when does the food bank close")[0],
+                         "When does the food bank close?")
+
+    def test_delete_faq_updates_index(self):
+        """Test deleting an FAQ through the admin panel removes it"""
+        self.client.post(reverse('delete_faq', args=[self.faq.id]))
+
+        self.assertNotEqual(faq_index.best_match("when does the food bank open")[0],
+                            "When does the food bank open?")
+
+    @patch("admin_panel.views.utilities.get_openai_client")
+    def test_confident_match_skips_gpt(self, mock_openai):
+        """Test GPT is not called when the index is confident"""
+        response = get_matching_question("When does the food bank open?")
+
+        mock_openai.assert_not_called()
+        self.assertEqual(response, "When does the food bank open?")
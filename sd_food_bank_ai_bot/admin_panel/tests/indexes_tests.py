@@ -0,0 +1,59 @@
+import unittest
+from datetime import date
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from admin_panel import log_search
+from admin_panel.availability import day_range
+from ..models import User, Log, AppointmentTable
+
+
+class QueryPlanTests(TestCase):
+    """Test the hot lookups are answered from an index rather than a table scan"""
+
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            # Tiny test tables are cheaper to scan, make the planner show its index choice
+            with connection.cursor() as cursor:
+                cursor.execute("SET enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index_name=None):
+        plan = queryset.explain()
+        self.assertRegex(plan, r"(?i)index", plan)
+        if index_name:
+            self.assertIn(index_name, plan)
+
+    def test_latest_log_for_caller(self):
+        """Test the current log lookup uses the (phone_number, -id) index"""
+        self.assertUsesIndex(Log.objects.filter(phone_number="+16195551234").order_by("-id")[:1],
+                             "log_phone_recent_idx")
+
+    def test_user_by_phone_number(self):
+        """Test callers are found through the unique phone number index"""
+        self.assertUsesIndex(User.objects.filter(phone_number="+16195551234"))
+
+    def test_appointments_for_day(self):
+        """Test a day's appointments are read through the (date, start_time) index"""
+        self.assertUsesIndex(AppointmentTable.objects.filter(**day_range(date(2025, 5, 20))))
+
+    def test_logs_for_day(self):
+        """Test monitoring date ranges use the time_started index"""
+        now = timezone.localtime()
+        self.assertUsesIndex(Log.objects.filter(time_started__year=now.year), "log_time_started_id_idx")
+        self.assertUsesIndex(Log.objects.filter(**day_range(now.date(), field="time_started")),
+                             "log_time_started_id_idx")
+
+    def test_audit_log_page(self):
+        """Test audit log pages are read through the (time_started, id) index"""
+        self.assertUsesIndex(Log.objects.order_by(*log_search.NEWEST_FIRST)[:log_search.PAGE_SIZE + 1],
+                             "log_time_started_id_idx")
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "Trigram indexes are Postgres only")
+    def test_transcript_search(self):
+        """Test audit log searches use the trigram index"""
+        self.assertUsesIndex(log_search.search(Log.objects.all(), "diapers"), "log_search_trgm_idx")
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "GIN indexes are Postgres only")
+    def test_intents_has_key(self):
+        """Test topic filters use the GIN index on intents"""
+        self.assertUsesIndex(Log.objects.filter(intents__has_key="faq"), "log_intents_gin_idx")
@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from admin_panel import log_export
+from admin_panel.models import Admin, Log
+
+
+def make_log(time_started, **fields):
+    log = Log.objects.create(**fields)
+    Log.objects.filter(pk=log.pk).update(time_started=time_started)
+    return log
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.admin = Admin.objects.create_user(username='user1', password='pass123')
+        self.client.force_login(self.admin)
+        self.day = timezone.make_aware(datetime(2025, 4, 20, 10, 0))
+        self.en = make_log(self.day, phone_number="+16191231234", language="en",
+                           length_of_call=timedelta(seconds=75), intents={"schedule": 1},
+                           transcript=[{"speaker": "user", "message": "Quiero una cita"}])
+        self.es = make_log(self.day + timedelta(days=1), phone_number="+16193214321", language="es-MX",
+                           forwarded=True, forwarded_reason="caller")
+        self.old = make_log(self.day - timedelta(days=30), phone_number="+16195550000")
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_logs'), params)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_csv(self):
+        """Test logs are exported as CSV with a header, in id order"""
+        response, content = self.export()
+        rows = list(csv.DictReader(io.StringIO(content)))
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn("call_logs.csv", response["Content-Disposition"])
+        self.assertEqual([row["phone_number"] for row in rows], ["+16191231234", "+16193214321", "+16195550000"])
+        self.assertEqual(rows[0]["length_of_call"], "0:01:15")
+        self.assertNotIn("transcript", rows[0])
+
+    def test_ndjson_with_transcripts_and_intents(self):
+        """Test NDJSON lines carry transcripts and intents when asked for"""
+        response, content = self.export(format="ndjson", transcripts="1", intents="1",
+                                        language="en", start="2025-04-01")
+        lines = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]["transcript"][0]["message"], "Quiero una cita")
+        self.assertEqual(lines[0]["intents"], {"schedule": 1})
+
+    def test_filters(self):
+        """Test the date range, language and forwarded filters"""
+        def phones(**params):
+            return [row["phone_number"] for row in csv.DictReader(io.StringIO(self.export(**params)[1]))]
+
+        self.assertEqual(phones(start="2025-04-20", end="2025-04-20"), ["+16191231234"])
+        self.assertEqual(phones(start="2025-04-20"), ["+16191231234", "+16193214321"])
+        self.assertEqual(phones(end="2025-04-01"), ["+16195550000"])
+        self.assertEqual(phones(language="es-MX"), ["+16193214321"])
+        self.assertEqual(phones(forwarded="false"), ["+16191231234", "+16195550000"])
+
+    def test_transcripts_not_selected_unless_asked(self):
+        """Test a plain export never reads the transcript or intents columns"""
+        with CaptureQueriesContext(connection) as queries:
+            list(log_export.export_chunks(Log.objects.all()))
+
+        self.assertFalse([query for query in queries if "transcript" in query["sql"]
+                          or "intents" in query["sql"]])
+
+    def test_written_in_chunks(self):
+        """Test the export is produced a chunk of logs at a time"""
+        chunks = list(log_export.export_chunks(Log.objects.all(), "ndjson", chunk_size=2))
+
+        self.assertEqual([chunk.count("\n") for chunk in chunks], [2, 1])
+
+    def test_async_chunks(self):
+        """Test the ASGI iterator yields the same chunks"""
+        async def collect():
+            return [chunk async for chunk in log_export.aexport_chunks(
+                log_export.export_chunks(Log.objects.all(), chunk_size=2))]
+
+        self.assertEqual(async_to_sync(collect)(),
+                         list(log_export.export_chunks(Log.objects.all(), chunk_size=2)))
+
+    def test_invalid_parameters(self):
+        """Test bad dates, formats and forwarded filters are rejected"""
+        for params in ({"start": "04/20/2025"}, {"format": "xlsx"}, {"forwarded": "maybe"}):
+            self.assertEqual(self.client.get(reverse('export_logs'), params).status_code, 400, params)
+
+    def test_login_required(self):
+        """Test the export is only available to admins"""
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('export_logs')).status_code, 302)
+
+    def test_command(self):
+        """Test the command writes the filtered export to a file"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "logs.ndjson")
+            call_command("export_logs", format="ndjson", output=path, forwarded="no",
+                         start=self.day.date(), transcripts=True, stderr=io.StringIO())
+            with open(path, encoding="utf-8") as output:
+                lines = [json.loads(line) for line in output]
+
+        self.assertEqual([line["id"] for line in lines], [self.en.id])
+        self.assertIn("transcript", lines[0])
+
+
+class ExportMemoryTests(TestCase):
+    """Test export memory stays flat as the number of logs grows"""
+
+    def setUp(self):
+        transcript = [{"speaker": "user", "message": "x" * 200} for _ in range(20)]
+        Log.objects.bulk_create([Log(phone_number=f"+1619555{i:04d}", transcript=transcript)
+                                 for i in range(1000)])
+
+    def peak_memory(self, logs):
+        tracemalloc.start()
+        try:
+            for _ in log_export.export_chunks(logs, "ndjson", transcripts=True, chunk_size=50):
+                pass
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_peak_memory_flat(self):
+        """Test exporting ten times the logs takes about the same peak memory"""
+        ids = list(Log.objects.order_by("id").values_list("id", flat=True))
+        self.peak_memory(Log.objects.filter(id__lte=ids[99]))
+        small = self.peak_memory(Log.objects.filter(id__lte=ids[99]))
+        large = self.peak_memory(Log.objects.all())
+
+        self.assertLess(large, small * 2)
@@ -0,0 +1,58 @@
+from io import StringIO
+from datetime import date, datetime, time
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.utils import timezone
+from ..models import User, AppointmentTable
+
+DAY = timezone.make_aware(datetime.combine(date(2025, 5, 20), time.min))
+
+
+class MergeDuplicateUsersTests(TransactionTestCase):
+    def setUp(self):
+        # Phone numbers are only allowed to repeat before 0026_lookup_indexes
+        call_command("migrate", "admin_panel", "0025", verbosity=0)
+        self.first = User.objects.create(first_name="Billy", last_name="Bob", phone_number="+1234567890")
+        self.second = User.objects.create(first_name="Billy", last_name="Bob", phone_number="+1234567890",
+                                          email="billybob@email.com")
+        self.appointment = AppointmentTable.objects.create(user=self.second, start_time=time(10, 0),
+                                                           end_time=time(10, 15), date=DAY)
+        self.other = User.objects.create(first_name="Jane", last_name="Doe", phone_number="+1987654321")
+
+    def tearDown(self):
+        User.objects.all().delete()
+        call_command("migrate", "admin_panel", verbosity=0)
+
+    def merge(self, *args):
+        out = StringIO()
+        call_command("merge_duplicate_users", *args, stdout=out)
+        return out.getvalue()
+
+    def test_migration_stops_on_duplicates(self):
+        """Test making phone numbers unique names the duplicates instead of merging them"""
+        with self.assertRaisesRegex(RuntimeError, r"\+1234567890, run manage.py merge_duplicate_users"):
+            call_command("migrate", "admin_panel", "0026", verbosity=0)
+
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_dry_run(self):
+        """Test a dry run reports the merge without saving it"""
+        output = self.merge("--dry-run")
+
+        self.assertIn(f"Would merge users {self.second.id} into user {self.first.id} (+1234567890), "
+                      "moving 1 appointments.", output)
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_merge(self):
+        """Test duplicates are merged into the first user, keeping appointments and email"""
+        output = self.merge()
+
+        self.assertIn("Merged 1 phone numbers.", output)
+        self.assertEqual(set(User.objects.values_list("id", flat=True)), {self.first.id, self.other.id})
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.email, "billybob@email.com")
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.user_id, self.first.id)
+
+        call_command("migrate", "admin_panel", "0026", verbosity=0)
+        self.assertIn("No users share a phone number.", self.merge())
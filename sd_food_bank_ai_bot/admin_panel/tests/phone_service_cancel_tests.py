@@ -261,7 +261,7 @@ class AppointmentCancelSelectionTests(TestCase):
         self.assertIn("Friday, March 28th at 01:30 PM", content)
         self.assertIn("Saturday, March 29th at 04:00 PM", content)
 
-    @patch("admin_panel.views.phone_service_cancel.OpenAI")
+    @patch("admin_panel.views.phone_service_cancel.get_openai_client")
     def test_process_appointment_selection_valid(self, mock_openai):
         """
         Test processing of valid appointment selection choice
@@ -279,7 +279,7 @@ class AppointmentCancelSelectionTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(f'/prompt_cancellation_confirmation/{self.appointment1.id}/', response.content.decode("utf-8"))
 
-    @patch("admin_panel.views.phone_service_cancel.OpenAI")
+    @patch("admin_panel.views.phone_service_cancel.get_openai_client")
     def test_process_appointment_selection_response_uncertain(self, mock_openai):
         """
         Test processing of invalid appointment selection choice
@@ -298,7 +298,7 @@ class AppointmentCancelSelectionTests(TestCase):
         self.assertIn("I didn't catch that. Please try again.", response.content.decode("utf-8"))
         self.assertIn("/ask_appointment_to_cancel/", response.content.decode("utf-8"))
 
-    @patch("admin_panel.views.phone_service_cancel.OpenAI")
+    @patch("admin_panel.views.phone_service_cancel.get_openai_client")
     def test_process_appointment_selection_response_wrong_date(self, mock_openai):
         """
         Test processing of invalid appointment selection choice
@@ -317,7 +317,7 @@ class AppointmentCancelSelectionTests(TestCase):
         self.assertIn("Sorry, we don't have you scheduled for that. Please try again.", response.content.decode("utf-8"))
         self.assertIn("/ask_appointment_to_cancel/", response.content.decode("utf-8"))
 
-    @patch("admin_panel.views.phone_service_cancel.OpenAI")
+    @patch("admin_panel.views.phone_service_cancel.get_openai_client")
     def test_process_appointment_selection_response_out_of_bounds(self, mock_openai):
         """
         Test processing of invalid appointment selection choice
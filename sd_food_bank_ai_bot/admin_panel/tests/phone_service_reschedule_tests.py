@@ -41,14 +41,14 @@ class PhoneServiceRescheduleTests(TestCase):
         root = self.parse_twiml(response)
         self.assertIn("Which appointment would you like to reschedule?", [say.text for say in root.iter("Say")])
 
-    @patch("admin_panel.views.phone_service_reschedule.OpenAI")
+    @patch("admin_panel.views.phone_service_reschedule.get_openai_client")
     def test_generate_requested_date_valid(self, mock_openai):
         mock_client = MagicMock()
         mock_openai.return_value = mock_client
         mock_client.chat.completions.create.return_value = MagicMock(
             choices=[MagicMock(message=MagicMock(content="2025-04-02"))]
         )
-        request = self.factory.post("/generate_requested_date/", {"SpeechResult": "Next Tuesday", "From": self.user.phone_number})
+        request = self.factory.post("/generate_requested_date/", {"SpeechResult": "The one right after Easter", "From": self.user.phone_number})
         response = generate_requested_date(request)
         self.assertEqual(response.status_code, 200)
         root = self.parse_twiml(response)
@@ -123,13 +123,13 @@ class PhoneServiceRescheduleTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn("Que cita le gustaria reprogramar?", response.content.decode())
     
-    @patch("admin_panel.views.phone_service_reschedule.OpenAI")
-    @patch("admin_panel.views.phone_service_reschedule.translate_to_language")
+    @patch("admin_panel.views.phone_service_reschedule.get_openai_client")
+    @patch("admin_panel.views.utilities.translate_to_language")
     def test_generate_requested_date_spanish(self, mock_translate, mock_openai):
         """test spanish route for appointment date generation on rescheduling path"""
         self.user.language = "es"
         self.user.save()
-        mock_translate.return_value = "Su dia solicitado fue 2025-04-02. ¿Es correcto?"
+        mock_translate.return_value = "2025-04-02"
 
         mock_client = MagicMock()
         mock_openai.return_value = mock_client
@@ -141,7 +141,7 @@ class PhoneServiceRescheduleTests(TestCase):
 
         self.assertEqual(response.status_code, 200)
         root = self.parse_twiml(response)
-        self.assertTrue(any("Su dia solicitado fue 2025-04-02" in say.text for say in root.iter("Say")))
+        self.assertTrue(any("El día que solicitó fue 2025-04-02" in say.text for say in root.iter("Say")))
         
     @patch("admin_panel.views.phone_service_reschedule.get_response_sentiment")
     @patch("admin_panel.views.phone_service_reschedule.translate_to_language")
@@ -210,7 +210,7 @@ class NameRequestTests(TestCase):
             phone_number="+16294968156"
         )
 
-    @patch("admin_panel.views.phone_service_schedule.OpenAI")
+    @patch("admin_panel.views.phone_service_schedule.get_openai_client")
     def test_get_name_valid(self, mock_openai):
         """Test get_name when there is a valid input"""
         mock_client = MagicMock()
@@ -224,7 +224,7 @@ class NameRequestTests(TestCase):
 
         self.assertIn("Your name is Billy Bob. Is that correct?", response.content.decode())
 
-    @patch("admin_panel.views.phone_service_schedule.OpenAI")
+    @patch("admin_panel.views.phone_service_schedule.get_openai_client")
     def test_get_name_invalid(self, mock_openai):
         """Test get_name when there is no SpeechResult"""
         mock_client = MagicMock()
@@ -304,32 +304,49 @@ class CheckForAppointmentTests(TestCase):
 
     @patch("admin_panel.views.phone_service_schedule.get_response_sentiment", return_value=True)
     @patch("admin_panel.views.phone_service_schedule.get_phone_number")
-    @patch("admin_panel.views.phone_service_schedule.Log")
-    @patch("admin_panel.views.phone_service_schedule.User")
+    @patch("admin_panel.views.phone_service_schedule.get_call_log")
+    @patch("admin_panel.views.phone_service_schedule.get_caller")
     @patch("admin_panel.views.phone_service_schedule.check_available_date")
     def test_fully_booked_date(
         self, mock_check_available, mock_user, mock_log, mock_get_number, mock_sentiment
     ):
         """User confirms a date that has no available slots"""
         mock_get_number.return_value = self.phone_number
-        mock_user.objects.get.return_value = self.user
-        mock_log.objects.filter.return_value.last.return_value = self.mock_log
+        mock_user.return_value = self.user
+        mock_log.return_value = self.mock_log
         mock_check_available.return_value = (False, datetime.strptime(self.date_str, "%Y-%m-%d").date(), 0)
 
         response = self.client.post(self.url, {"SpeechResult": "yes", "From": self.phone_number})
         self.assertEqual(response.status_code, 200)
 
+    @patch("admin_panel.views.phone_service_schedule.get_response_sentiment", return_value=True)
+    def test_fully_booked_date_offers_open_days(self, mock_sentiment):
+        """User confirms a full date and hears the next open days in the same hop"""
+        full_day = now().date() + timedelta(days=7)
+        for day in (full_day, full_day + timedelta(days=1)):
+            AppointmentTable.objects.create(user=self.user, start_time=time(9, 0), end_time=time(17, 0),
+                                            location="Office", date=day)
+        url = reverse("check_for_appointment", kwargs={"date_encoded": full_day.strftime("%Y-%m-%d")})
+
+        response = self.client.post(url, {"SpeechResult": "yes", "From": self.phone_number})
+
+        content = response.content.decode()
+        self.assertIn(f"Sorry, no available days on {full_day.strftime('%B %d, %Y')}", content)
+        self.assertIn((full_day + timedelta(days=2)).strftime("%A, %B %d"), content)
+        self.assertNotIn((full_day + timedelta(days=1)).strftime("%A, %B %d"), content)
+        self.assertIn('action="/generate_date/"', content)
+
     @patch("admin_panel.views.phone_service_schedule.get_response_sentiment", return_value=False)
     @patch("admin_panel.views.phone_service_schedule.get_phone_number")
-    @patch("admin_panel.views.phone_service_schedule.Log")
-    @patch("admin_panel.views.phone_service_schedule.User")
+    @patch("admin_panel.views.phone_service_schedule.get_call_log")
+    @patch("admin_panel.views.phone_service_schedule.get_caller")
     def test_declined_date(
         self, mock_user, mock_log, mock_get_number, mock_sentiment
     ):
         """User says no to confirming the date"""
         mock_get_number.return_value = self.phone_number
-        mock_user.objects.get.return_value = self.user
-        mock_log.objects.filter.return_value.last.return_value = self.mock_log
+        mock_user.return_value = self.user
+        mock_log.return_value = self.mock_log
 
         response = self.client.post(self.url, {"SpeechResult": "no", "From": self.phone_number})
         self.assertEqual(response.status_code, 200)
@@ -389,7 +406,7 @@ class AppointmentSchedulingTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn("What time would you like?", response.content.decode())
 
-    @patch("admin_panel.views.phone_service_schedule.OpenAI")
+    @patch("admin_panel.views.phone_service_schedule.get_openai_client")
     def test_generate_requested_time(self, mock_openai):
         """Tests if the system correctly extracts time using GPT."""
         mock_client = MagicMock()
@@ -399,7 +416,7 @@ class AppointmentSchedulingTests(TestCase):
         )
 
         url = reverse('generate_requested_time') + f"?date={self.appointment_dates[0]}"
-        response = self.client.post(url, {"SpeechResult": "Can I come at 2:45 PM?", "From": "+1234567890"})
+        response = self.client.post(url, {"SpeechResult": "Sometime after lunch, before my shift", "From": "+1234567890"})
         self.assertEqual(response.status_code, 200)
         self.assertIn("Your requested time was 2:45 PM", response.content.decode())
 
@@ -413,12 +430,16 @@ class AppointmentSchedulingTests(TestCase):
         self.assertIn("Our nearest appointment slot is", response.content.decode())
 
     def test_get_available_times_for_date(self):
-        """Tests if available times are correctly retrieved."""
+        """Tests if every free slot between and around appointments is retrieved."""
         available_times = get_available_times_for_date(self.appointment_dates[0])
-        self.assertEqual(len(available_times), 3)
+        # 32 slots in the day, less the 5 overlapped by the three appointments
+        self.assertEqual(len(available_times), 27)
         self.assertIn(time(9, 0), available_times)
         self.assertIn(time(10, 30), available_times)
         self.assertIn(time(15, 0), available_times)
+        self.assertNotIn(time(10, 15), available_times)
+        self.assertNotIn(time(14, 30), available_times)
+        self.assertNotIn(time(16, 45), available_times)
 
 
 class AppointmentConfirmationTests(TestCase):
@@ -0,0 +1,98 @@
+import threading
+from datetime import date, datetime, time
+from types import SimpleNamespace
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from admin_panel import prefetch
+from admin_panel.models import AppointmentTable, User
+from admin_panel.views.phone_service_schedule import times_prompt_name
+
+
+def hop(call_sid="CA1"):
+    """A webhook request of the call with this CallSid"""
+    return SimpleNamespace(call_session=SimpleNamespace(call_sid=call_sid))
+
+
+class PrefetchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(prefetch.cancel_call, "CA1")
+
+    def test_claim_returns_speculated_result(self):
+        """Test the next hop gets the speculated result without computing it"""
+        prefetch.speculate(hop(), "prompt", lambda: "Here are the times")
+
+        result = prefetch.claim(hop(), "prompt", lambda: self.fail("computed again"))
+
+        self.assertEqual(result, "Here are the times")
+        self.assertIsNone(cache.get(prefetch.PREFETCH_KEY.format("CA1", "prompt")))
+
+    def test_claim_from_cache_of_another_process(self):
+        """Test a result speculated by another worker process is read from the cache"""
+        cache.set(prefetch.PREFETCH_KEY.format("CA1", "prompt"), "Here are the times")
+
+        self.assertEqual(prefetch.claim(hop(), "prompt", lambda: "computed"), "Here are the times")
+
+    def test_claim_computes_without_speculation(self):
+        """Test nothing speculated and requests without a CallSid compute directly"""
+        self.assertEqual(prefetch.claim(hop(), "prompt", lambda: "computed"), "computed")
+        self.assertEqual(prefetch.claim(SimpleNamespace(), "prompt", lambda: "computed"), "computed")
+
+    def test_unclaimed_speculation_cancelled_after_its_hops(self):
+        """Test work no hop claimed is dropped once its hops have passed"""
+        release = threading.Event()
+        speculating = hop()
+        prefetch.speculate(speculating, "prompt", lambda: release.wait(5) and "late", hops=2)
+
+        prefetch.finish_hop(speculating)
+        prefetch.finish_hop(hop())
+        self.assertIn("prompt", prefetch._speculations["CA1"])
+        prefetch.finish_hop(hop())
+        release.set()
+
+        self.assertNotIn("CA1", prefetch._speculations)
+        self.assertEqual(prefetch.claim(hop(), "prompt", lambda: "computed"), "computed")
+
+    def test_cancel_call(self):
+        """Test a finished call drops everything speculated for it"""
+        prefetch.speculate(hop(), "prompt", lambda: "Here are the times")
+        prefetch._speculations["CA1"]["prompt"].future.result()
+
+        prefetch.cancel_call("CA1")
+
+        self.assertIsNone(cache.get(prefetch.PREFETCH_KEY.format("CA1", "prompt")))
+        self.assertEqual(prefetch.claim(hop(), "prompt", lambda: "computed"), "computed")
+
+    async def test_acancel_call(self):
+        """Test async webhooks drop a finished call's speculations too"""
+        prefetch.speculate(hop(), "prompt", lambda: "Here are the times")
+        prefetch._speculations["CA1"]["prompt"].future.result()
+
+        await prefetch.acancel_call("CA1")
+
+        self.assertIsNone(await cache.aget(prefetch.PREFETCH_KEY.format("CA1", "prompt")))
+        self.assertNotIn("CA1", prefetch._speculations)
+
+    @override_settings(PREFETCH_ENABLED=False)
+    def test_disabled(self):
+        """Test nothing is speculated when prefetching is turned off"""
+        prefetch.speculate(hop(), "prompt", lambda: "Here are the times")
+
+        self.assertNotIn("CA1", prefetch._speculations)
+
+
+class TimesPromptPrefetchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_booking_changes_prompt_name(self):
+        """Test a prompt prepared before a booking is not claimed after it"""
+        day = date(2025, 3, 4)
+        before = times_prompt_name("es", day)
+
+        user = User.objects.create(phone_number="+17601231234", first_name="Ana", last_name="Lopez")
+        AppointmentTable.objects.create(user=user, date=timezone.make_aware(datetime(2025, 3, 4, 10)),
+                                        start_time=time(10, 0), end_time=time(10, 15))
+
+        self.assertNotEqual(times_prompt_name("es", day), before)
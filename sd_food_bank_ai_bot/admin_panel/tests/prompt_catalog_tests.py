@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from unittest.mock import patch
+from admin_panel import prompt_catalog
+from admin_panel.translation_cache import translation_cache
+from admin_panel.views.utilities import translate_to_language
+
+
+class PromptCatalogTests(TestCase):
+    def setUp(self):
+        """Start without cached live translations"""
+        translation_cache.clear()
+
+    def test_every_fixed_prompt_in_catalog(self):
+        """Test each literal prompt translated in the views has a catalog entry"""
+        prompts = prompt_catalog.collect_fixed_prompts()
+
+        self.assertTrue(prompts)
+        for source_lang, target_lang, text in prompts:
+            self.assertIsNotNone(prompt_catalog.lookup(source_lang, target_lang, text), text)
+
+    @patch("admin_panel.views.utilities.get_translate_client")
+    def test_fixed_prompt_skips_translator(self, mock_translate):
+        """Test catalog prompts are translated without creating a client"""
+        response = translate_to_language("en", "es", "What time would you like?")
+
+        self.assertEqual(response, "¿A qué hora le gustaría?")
+        mock_translate.assert_not_called()
+
+    @patch("admin_panel.views.utilities.get_translate_client")
+    def test_dynamic_text_uses_translator(self, mock_translate):
+        """Test text outside of the catalog is still sent to the translator"""
+        mock_translate.return_value.translate.return_value = {"translatedText": "Hola, Ana."}
+
+        response = translate_to_language("en", "es", "Hello, Ana.")
+
+        self.assertEqual(response, "Hola, Ana.")
+        mock_translate.return_value.translate.assert_called_once()
+
+    def test_reverse_direction_not_served(self):
+        """Test the catalog only answers for the language pair it was built for"""
+        self.assertIsNone(prompt_catalog.lookup("es", "en", "What time would you like?"))
+
+    def test_check_command_passes(self):
+        """Test the shipped catalog is complete"""
+        call_command("build_prompt_catalog", "--check", stdout=StringIO())
+
+
+class BuildPromptCatalogCommandTests(TestCase):
+    def setUp(self):
+        """Point the command at a temporary catalog with one stale entry"""
+        handle, self.path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(handle, "w", encoding="utf-8") as catalog_file:
+            json.dump({"en:es": {"What time would you like?": "¿A qué hora?",
+                                 "No longer used": "Ya no se usa"}}, catalog_file)
+        self.path_patch = patch("admin_panel.management.commands.build_prompt_catalog.CATALOG_PATH",
+                                self.path)
+        self.path_patch.start()
+
+    def tearDown(self):
+        self.path_patch.stop()
+        os.remove(self.path)
+
+    def test_check_reports_missing(self):
+        """Test --check fails when prompts are missing"""
+        with self.assertRaises(CommandError):
+            call_command("build_prompt_catalog", "--check", stdout=StringIO())
+
+    @patch("admin_panel.management.commands.build_prompt_catalog.get_translate_client")
+    def test_translates_only_missing(self, mock_translate):
+        """Test existing entries are kept and only missing prompts are translated"""
+        mock_translate.return_value.translate.side_effect = \
+            lambda text, **kwargs: {"translatedText": f"ES {text}"}
+
+        call_command("build_prompt_catalog", "--prune", stdout=StringIO())
+
+        with open(self.path, encoding="utf-8") as catalog_file:
+            catalog = json.load(catalog_file)["en:es"]
+        prompts = prompt_catalog.collect_fixed_prompts()
+        self.assertEqual(mock_translate.return_value.translate.call_count, len(prompts) - 1)
+        self.assertEqual(catalog["What time would you like?"], "¿A qué hora?")
+        self.assertEqual(catalog["Can I get your first and last name please?"],
+                         "ES Can I get your first and last name please?")
+        self.assertNotIn("No longer used", catalog)
@@ -0,0 +1,262 @@
+import unittest
+from unittest import mock
+from io import StringIO
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from admin_panel import rollups
+from admin_panel.models import CallRollup, Log
+from admin_panel.views.monitoring_page import dashboard_rows
+
+
+def make_log(time_started=None, **fields):
+    """Create a closed call log, time_started is set by the database otherwise"""
+    fields.setdefault("time_ended", timezone.now())
+    log = Log.objects.create(phone_number="+17601231234", **fields)
+    if time_started is not None:
+        Log.objects.filter(pk=log.pk).update(time_started=time_started)
+    return log
+
+
+def rollup_counts():
+    return {(row.grain, row.period, row.topic, row.dimension, row.key): (row.count, row.length_seconds)
+            for row in CallRollup.objects.all()}
+
+
+class RecordCallTests(TestCase):
+    def setUp(self):
+        self.started = timezone.make_aware(datetime(2025, 3, 4, 10, 25), rollups.DASHBOARD_TZ)
+        self.log = make_log(self.started, language="es", forwarded=True, forwarded_reason="caller",
+                            length_of_call=timedelta(seconds=90),
+                            intents={"faq": {"What are your hours?": 2}, "schedule": 1})
+
+    def count(self, grain, topic, dimension, key=""):
+        return CallRollup.objects.get(grain=grain, topic=topic, dimension=dimension, key=key).count
+
+    def test_call_counted_per_topic(self):
+        """Test a call is counted under All and each of its intents"""
+        rollups.record_call(self.log.id)
+
+        day = CallRollup.objects.get(grain=CallRollup.DAY, topic="All", dimension=rollups.CALLS)
+        self.assertEqual((day.count, day.length_seconds), (1, 90))
+        self.assertEqual(timezone.localtime(day.period, rollups.DASHBOARD_TZ),
+                         self.started.replace(hour=0, minute=0))
+        hour = CallRollup.objects.get(grain=CallRollup.HOUR, topic="All", dimension=rollups.CALLS)
+        self.assertEqual(timezone.localtime(hour.period, rollups.DASHBOARD_TZ), self.started.replace(minute=0))
+
+        self.assertEqual(self.count(CallRollup.DAY, "schedule", rollups.LANGUAGE, "es"), 1)
+        self.assertEqual(self.count(CallRollup.DAY, "All", rollups.FORWARDED, "caller"), 1)
+        self.assertEqual(self.count(CallRollup.DAY, "All", rollups.INTENT, "faq"), 1)
+        self.assertEqual(self.count(CallRollup.DAY, "faq", rollups.FAQ_QUESTION, "What are your hours?"), 2)
+        self.assertFalse(CallRollup.objects.filter(topic="schedule", dimension=rollups.INTENT,
+                                                   key="faq").exists())
+
+    def test_calls_added_together(self):
+        """Test a second call in the same hour adds to the same rows"""
+        rollups.record_call(self.log.id)
+        rollups.record_call(make_log(self.started + timedelta(minutes=10), length_of_call=timedelta(seconds=30)).id)
+
+        day = CallRollup.objects.get(grain=CallRollup.DAY, topic="All", dimension=rollups.CALLS)
+        self.assertEqual((day.count, day.length_seconds), (2, 120))
+
+    def test_call_counted_once(self):
+        """Test a repeated status callback does not count the call again"""
+        rollups.record_call(self.log.id)
+        rollups.record_call(self.log.id)
+
+        self.assertEqual(self.count(CallRollup.DAY, "All", rollups.CALLS), 1)
+
+    def test_call_status_update_counts_call(self):
+        """Test a completed call is counted when Twilio reports it"""
+        self.client.post(reverse("call_status_update"), {"CallStatus": "completed",
+                                                          "From": "+17601231234"})
+
+        self.assertEqual(self.count(CallRollup.DAY, "All", rollups.CALLS), 1)
+        self.log.refresh_from_db()
+        self.assertTrue(self.log.rolled_up)
+
+    def test_rebuild_matches_incremental(self):
+        """Test rebuilding from the logs gives the rows kept up as calls ended"""
+        make_log(self.started - timedelta(days=40), intents={"cancel": 2})
+        for log in Log.objects.all():
+            rollups.record_call(log.id)
+        incremental = rollup_counts()
+        Log.objects.update(rolled_up=False)
+
+        out = StringIO()
+        call_command("rebuild_call_rollups", "--batch-size", "1", stdout=out)
+
+        self.assertEqual(rollup_counts(), incremental)
+        self.assertIn("from 2 call logs", out.getvalue())
+        self.assertFalse(Log.objects.filter(rolled_up=False).exists())
+
+    def test_rebuild_leaves_calls_in_progress(self):
+        """Test a call still in progress is left for call_status_update to count"""
+        in_progress = make_log(self.started, time_ended=None)
+
+        call_command("rebuild_call_rollups", stdout=StringIO())
+
+        self.assertEqual(self.count(CallRollup.DAY, "All", rollups.CALLS), 1)
+        in_progress.refresh_from_db()
+        self.assertFalse(in_progress.rolled_up)
+        rollups.record_call(in_progress.id)
+        self.assertEqual(self.count(CallRollup.DAY, "All", rollups.CALLS), 2)
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "jsonb_each is Postgres only")
+    def test_database_rebuild_matches_python(self):
+        """Test the jsonb rebuild counts calls like the per call rollup"""
+        make_log(self.started - timedelta(days=40), intents={"cancel": 2, "faq": {}})
+        for log in Log.objects.all():
+            rollups.record_call(log.id)
+        incremental = rollup_counts()
+
+        CallRollup.objects.all().delete()
+        rollups.rebuild_in_database(Log.objects.latest("id").id)
+
+        self.assertEqual(rollup_counts(), incremental)
+
+    def test_benchmark_command(self):
+        """Test the dashboard benchmark reports every size and removes its logs"""
+        out = StringIO()
+        call_command("benchmark_dashboard", "--logs", "20,40", "--repeat", "1", stdout=out)
+
+        self.assertIn("40 logs: rebuild", out.getvalue())
+        self.assertEqual(Log.objects.count(), 1)
+        self.assertEqual(CallRollup.objects.get(grain=CallRollup.DAY, topic="All",
+                                                dimension=rollups.CALLS).count, 1)
+
+
+class DashboardRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.localtime(timezone.now(), rollups.DASHBOARD_TZ)
+        morning = now.replace(hour=9, minute=30)
+        evening = now.replace(hour=21, minute=0)
+        make_log(morning, language="en", length_of_call=timedelta(seconds=60),
+                 intents={"faq": {"What are your hours?": 1}})
+        make_log(morning, language="es", length_of_call=timedelta(seconds=120),
+                 forwarded=True, forwarded_reason="auto", intents={"schedule": 1})
+        make_log(evening, language="es", length_of_call=timedelta(seconds=180),
+                 forwarded=True, forwarded_reason="caller", intents={"faq": {"Where are you?": 2}})
+        call_command("rebuild_call_rollups", stdout=StringIO())
+
+    def get(self, name, **params):
+        params.setdefault("granularity", "day")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name), params)
+        self.assertFalse([query for query in queries if Log._meta.db_table in query["sql"]])
+        return response.json()
+
+    def test_totals_and_lengths(self):
+        """Test call totals and average lengths are read from the rollups"""
+        self.assertEqual(self.get("get_total_calls", granularity="year")["total"], 3)
+        self.assertEqual(self.get("get_total_calls", topic="faq")["counts"], [2])
+        self.assertEqual(self.get("get_avg_length")["total_average_lengths"], "0:02:00")
+
+    def test_breakdowns(self):
+        """Test the language, forwarding, time of day and reason charts"""
+        self.assertEqual(self.get("get_call_language")["counts"], [1, 2])
+        forwarded = self.get("get_calls_forwarded", topic="faq")
+        self.assertEqual((forwarded["labels"], forwarded["total"]), (["Caller Requested"], 1))
+        self.assertEqual(self.get("get_time_of_day", topic="All")["counts"], [2, 0, 0, 1])
+        reasons = self.get("get_reason_for_calling", topic="faq")
+        self.assertEqual(dict(zip(reasons["labels"], reasons["counts"])),
+                         {"What are your hours?": 1, "Where are you?": 2})
+        reasons = self.get("get_reason_for_calling", topic="All")
+        self.assertEqual(dict(zip(reasons["labels"], reasons["counts"])), {"faq": 2, "schedule": 1})
+
+    def test_dashboard_in_one_query(self):
+        """Test the combined endpoint returns every chart from a single query"""
+        with self.assertNumQueries(1):
+            dashboard = self.client.get(reverse("get_dashboard"),
+                                        {"granularity": "month", "topic": "faq"}).json()
+
+        charts = {"total_calls": "get_total_calls", "avg_length": "get_avg_length",
+                  "language": "get_call_language", "time_of_day": "get_time_of_day",
+                  "forwarded": "get_calls_forwarded", "reasons": "get_reason_for_calling"}
+        for chart, name in charts.items():
+            self.assertEqual(dashboard[chart], self.get(name, granularity="month", topic="faq"), chart)
+        self.assertEqual(dashboard["total_calls"]["total"], 2)
+        self.assertEqual(dashboard["language"]["counts"], [1, 1])
+
+    def test_time_of_day_bucketed_in_sql(self):
+        """Test hourly calls come back already summed into their time of day"""
+        rows = [row for row in dashboard_rows("year", "All", rollups.period_start("year"))
+                if row["grain"] == CallRollup.HOUR]
+
+        self.assertEqual({row["time_of_day"]: row["count"] for row in rows},
+                         {"8am-12pm": 2, "8pm-8am": 1})
+
+    def test_invalid_granularity(self):
+        """Test an unknown granularity is rejected"""
+        response = self.client.get(reverse("get_total_calls"), {"granularity": "week"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_log(language="en", length_of_call=timedelta(seconds=60), intents={"schedule": 1})
+        call_command("rebuild_call_rollups", stdout=StringIO())
+        self.url = reverse("get_dashboard")
+
+    def test_repeat_load_from_cache(self):
+        """Test a second load is answered from the cache without a query"""
+        first = self.client.get(self.url, {"granularity": "day"})
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, {"granularity": "day"})
+
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertIn("no-cache", second["Cache-Control"])
+
+    def test_not_modified(self):
+        """Test a conditional GET with a current ETag gets a 304 without a query"""
+        etag = self.client.get(self.url, {"granularity": "day"})["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {"granularity": "day"}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_per_request(self):
+        """Test every granularity and topic has its own ETag"""
+        etags = {self.client.get(self.url, params)["ETag"]
+                 for params in ({"granularity": "day"}, {"granularity": "year"},
+                                {"granularity": "day", "topic": "schedule"})}
+
+        self.assertEqual(len(etags), 3)
+
+    def test_completed_call_invalidates(self):
+        """Test a newly counted call changes the ETag and the data"""
+        first = self.client.get(self.url, {"granularity": "day"})
+        log = make_log(language="es", length_of_call=timedelta(seconds=30))
+        with self.captureOnCommitCallbacks(execute=True):
+            rollups.record_call(log.id)
+
+        response = self.client.get(self.url, {"granularity": "day"}, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+        self.assertEqual(response.json()["total_calls"]["total"], 2)
+
+    def test_version_moves_forward(self):
+        """Test changes within the same second still get a newer Last-Modified"""
+        version = rollups.version()
+        rollups.bump_version()
+        rollups.bump_version()
+
+        self.assertGreaterEqual(rollups.version(), version + timedelta(seconds=2))
+
+    def test_cache_expires(self):
+        """Test an expired version starts again at the current time with a new ETag"""
+        first = self.client.get(self.url, {"granularity": "day"})["ETag"]
+        cache.delete(rollups.VERSION_KEY)
+        with mock.patch("django.utils.timezone.now",
+                        return_value=timezone.now() + timedelta(seconds=settings.DASHBOARD_MAX_STALENESS)):
+            self.assertNotEqual(self.client.get(self.url, {"granularity": "day"})["ETag"], first)
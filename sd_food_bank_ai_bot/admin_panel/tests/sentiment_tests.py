@@ -0,0 +1,86 @@
+from io import StringIO
+from django.test import TestCase
+from django.core.management import call_command
+from unittest.mock import patch, MagicMock
+from admin_panel.sentiment import SentimentModel, classify, get_model, load_corpus
+from admin_panel.views.utilities import get_response_sentiment
+
+
+class SentimentClassifierTests(TestCase):
+    def test_plain_answers(self):
+        """Test common English and Spanish answers are classified confidently"""
+        for text in ["Yes", "yes, that's right", "Um, yes please", "Sí", "Claro que sí", "Está bien"]:
+            self.assertEqual(classify(text), (True, 0.99), text)
+        for text in ["No", "Nope.", "No thank you", "No es correcto", "Para nada", "That's wrong"]:
+            self.assertEqual(classify(text), (False, 0.99), text)
+
+    def test_hedged_answers_deferred(self):
+        """Test hedged or mixed answers are left to GPT"""
+        for text in ["Maybe", "Yes but can I change the time", "I don't know", "Creo que sí",
+                     "How much does it cost"]:
+            self.assertIsNone(classify(text)[0], text)
+
+    def test_questions_deferred(self):
+        """Test yes/no questions back to the bot are never counted as answers"""
+        for text in ["is it correct", "Does that work?", "Can I come tomorrow", "¿Es correcto?",
+                     "Está bien a las diez?", "Es el martes"]:
+            self.assertEqual(classify(text), (None, 0.0), text)
+        self.assertEqual(classify("Es correcto"), (True, 0.99))
+
+    def test_model_handles_unlisted_answers(self):
+        """Test answers outside of the lexicon are classified by the model"""
+        self.assertTrue(classify("yes that day works for me")[0])
+        self.assertFalse(classify("no I want a different time")[0])
+
+    def test_silence_is_negative(self):
+        """Test an empty answer is not a confirmation"""
+        self.assertEqual(classify(""), (False, 1.0))
+        self.assertEqual(classify("um"), (False, 1.0))
+
+    def test_unknown_words_deferred(self):
+        """Test answers made of words the model has not seen are left to GPT"""
+        self.assertIsNone(classify("Hola buenas tardes")[0])
+
+    def test_shipped_model_matches_corpus(self):
+        """Test the shipped model was trained from the current corpus"""
+        examples = [(entry["text"], entry["label"]) for entry in load_corpus()
+                    if entry["label"] is not None]
+        trained = SentimentModel.train(examples)
+
+        self.assertEqual(trained.vocabulary, get_model().vocabulary)
+
+    def test_corpus_resolved_correctly(self):
+        """Test every labeled answer resolved locally gets the right label"""
+        for entry in load_corpus():
+            is_affirmative, confidence = classify(entry["text"])
+            if is_affirmative is not None and confidence >= 0.9:
+                self.assertEqual(is_affirmative, entry["label"], entry["text"])
+
+
+class ResponseSentimentTests(TestCase):
+    @patch("admin_panel.views.utilities.get_openai_client")
+    def test_plain_answer_skips_gpt(self, mock_openai):
+        """Test a plain yes never reaches GPT"""
+        self.assertTrue(get_response_sentiment("Yes, that's correct"))
+        self.assertFalse(get_response_sentiment("no"))
+        mock_openai.assert_not_called()
+
+    @patch("admin_panel.views.utilities.get_openai_client")
+    def test_ambiguous_answer_uses_gpt(self, mock_openai):
+        """Test an ambiguous answer is still sent to GPT"""
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content="AFFIRMATIVE"))]
+        )
+
+        self.assertTrue(get_response_sentiment("I think so"))
+        mock_client.chat.completions.create.assert_called_once()
+
+    def test_benchmark_command(self):
+        """Test the benchmark reports the locally resolved share"""
+        out = StringIO()
+        call_command("benchmark_sentiment", "--repeat", "1", stdout=out)
+
+        self.assertIn("Resolved locally", out.getvalue())
+        self.assertIn("Saved per hop p50/p95", out.getvalue())
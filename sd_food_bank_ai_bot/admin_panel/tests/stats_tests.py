@@ -0,0 +1,34 @@
+import random
+import unittest
+from django.db import connection
+from django.test import TestCase
+from admin_panel.models import WebhookTiming
+from admin_panel.stats import percentile, PercentileCont
+
+# percentile_cont of 1 to 100 in PostgreSQL
+PG_PERCENTILES = {0.0: 1, 0.5: 50.5, 0.95: 95.05, 0.99: 99.01, 1.0: 100}
+
+
+class PercentileTests(TestCase):
+    def test_matches_percentile_cont(self):
+        """Test percentiles are interpolated like PostgreSQL's percentile_cont"""
+        values = list(range(100, 0, -1))
+        for fraction, expected in PG_PERCENTILES.items():
+            self.assertAlmostEqual(percentile(values, fraction), expected, msg=fraction)
+
+    def test_short_lists(self):
+        """Test empty and single value lists"""
+        self.assertEqual(percentile([], 0.5), 0.0)
+        self.assertEqual(percentile([7], 0.95), 7)
+        self.assertEqual(percentile([1, 2], 0.5), 1.5)
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "percentile_cont is Postgres only")
+    def test_same_as_database(self):
+        """Test the Python percentile agrees with the database on random data"""
+        totals = [round(random.uniform(1, 5000), 2) for _ in range(257)]
+        WebhookTiming.objects.bulk_create(WebhookTiming(view_name="answer_call", status_code=200, total_ms=total)
+                                          for total in totals)
+
+        for fraction in (0.5, 0.95, 0.99):
+            in_database = WebhookTiming.objects.aggregate(value=PercentileCont("total_ms", fraction))["value"]
+            self.assertAlmostEqual(percentile(totals, fraction), in_database, places=6)
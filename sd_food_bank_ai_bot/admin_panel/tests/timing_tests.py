@@ -0,0 +1,172 @@
+import time
+import unittest
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from unittest.mock import patch
+from openai import OpenAI
+from admin_panel import timing
+from admin_panel.clients import TimedOpenAI
+from admin_panel.fan_out import run_concurrently
+from admin_panel.models import Log, User, WebhookTiming
+
+
+def slow_request(*args, **kwargs):
+    time.sleep(0.02)
+
+
+class HopTimingTests(TestCase):
+    def test_timed_adds_to_current_hop(self):
+        """Test timed blocks add to the hop they run in and nothing outside one"""
+        with timing.timed("translate"):
+            time.sleep(0.01)
+
+        with timing.start_hop() as hop:
+            with timing.timed("translate"):
+                time.sleep(0.01)
+
+        self.assertGreaterEqual(hop.seconds["translate"], 0.01)
+        self.assertIsNone(timing.current_hop())
+
+    def test_timing_follows_fan_out(self):
+        """Test calls run side by side on other threads add to the same hop"""
+        def translate():
+            with timing.timed("translate"):
+                time.sleep(0.02)
+
+        with timing.start_hop() as hop:
+            run_concurrently(translate, translate)
+
+        self.assertGreaterEqual(hop.seconds["translate"], 0.04)
+
+    def test_queries_counted_as_db(self):
+        """Test every query of a hop adds to its database time"""
+        with timing.start_hop() as hop:
+            list(Log.objects.all())
+
+        self.assertGreater(hop.seconds["db"], 0)
+
+    @patch.object(OpenAI, "request", side_effect=slow_request)
+    def test_openai_requests_counted(self, mock_request):
+        """Test the shared OpenAI client adds its requests to the hop"""
+        with timing.start_hop() as hop:
+            TimedOpenAI(api_key="test-key").request("cast_to", "options")
+
+        self.assertGreaterEqual(hop.seconds["openai"], 0.02)
+
+
+@override_settings(WEBHOOK_TIMING_BATCH_SIZE=1)
+class WebhookTimingMiddlewareTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        timing.flush()
+        WebhookTiming.objects.all().delete()
+        User.objects.create(phone_number="+17601231234", first_name="Ana", last_name="Lopez",
+                            language="es")
+
+    def post(self):
+        """Send a webhook and wait for the timings it wrote in the background"""
+        self.client.post(reverse("answer_call"), {"From": "+17601231234", "CallSid": "CA1"})
+        timing.wait_for_writes()
+
+    def test_webhook_recorded(self):
+        """Test a Twilio webhook is recorded with its view, language and CallSid"""
+        self.post()
+
+        row = WebhookTiming.objects.get()
+        self.assertEqual(row.view_name, "answer_call")
+        self.assertEqual(row.language, "es")
+        self.assertEqual(row.call_sid, "CA1")
+        self.assertEqual(row.status_code, 200)
+        self.assertGreater(row.total_ms, 0)
+        self.assertGreater(row.db_ms, 0)
+        self.assertLessEqual(row.db_ms, row.total_ms)
+
+    def test_other_requests_not_recorded(self):
+        """Test requests without a CallSid are not timed"""
+        self.client.post(reverse("answer_call"), {"From": "+17601231234"})
+
+        self.assertFalse(WebhookTiming.objects.exists())
+
+    @override_settings(WEBHOOK_TIMING_BATCH_SIZE=3, WEBHOOK_TIMING_FLUSH_SECONDS=60)
+    def test_rows_written_in_batches(self):
+        """Test hops are written together once a batch is full"""
+        for _ in range(2):
+            self.post()
+        self.assertFalse(WebhookTiming.objects.exists())
+
+        self.post()
+        self.assertEqual(WebhookTiming.objects.count(), 3)
+
+    @override_settings(WEBHOOK_TIMING_BATCH_SIZE=3, WEBHOOK_TIMING_FLUSH_SECONDS=0.5)
+    def test_partial_batch_written_on_timer(self):
+        """Test a batch that never fills up is written once its flush time has passed"""
+        self.post()
+        self.assertFalse(WebhookTiming.objects.exists())
+
+        time.sleep(1)
+        timing.wait_for_writes()
+
+        self.assertEqual(WebhookTiming.objects.count(), 1)
+
+    @override_settings(WEBHOOK_TIMING_RETENTION_DAYS=30)
+    def test_old_rows_dropped(self):
+        """Test writing a batch drops rows past retention"""
+        WebhookTiming.objects.create(view_name="answer_call", status_code=200, total_ms=10,
+                                     created=timezone.now() - timedelta(days=31))
+
+        self.post()
+
+        self.assertEqual(WebhookTiming.objects.count(), 1)
+
+    def test_failed_write_logged(self):
+        """Test a batch that can't be written is logged without failing the webhook"""
+        with patch.object(WebhookTiming.objects, "bulk_create", side_effect=DatabaseError("down")), \
+                self.assertLogs("admin_panel.timing", "ERROR"):
+            response = self.client.post(reverse("answer_call"), {"From": "+17601231234", "CallSid": "CA1"})
+            timing.wait_for_writes()
+
+        self.assertEqual(response.status_code, 200)
+
+
+class WebhookLatencyApiTests(TestCase):
+    def setUp(self):
+        timing.flush()
+        WebhookTiming.objects.all().delete()
+        for total in range(1, 101):
+            WebhookTiming.objects.create(view_name="answer_call", status_code=200,
+                                         total_ms=total, openai_ms=total / 2)
+        WebhookTiming.objects.create(view_name="confirm_question", status_code=200, total_ms=900)
+        WebhookTiming.objects.create(view_name="confirm_question", status_code=200, total_ms=5000,
+                                     created=timezone.now() - timedelta(days=2))
+
+    def test_percentiles_per_endpoint(self):
+        """Test the latency panel reports percentiles of recent hops, slowest first"""
+        response = self.client.get(reverse("get_webhook_latency"))
+        endpoints = response.json()["endpoints"]
+
+        self.assertEqual([endpoint["view"] for endpoint in endpoints], ["confirm_question", "answer_call"])
+        self.assertEqual(endpoints[0]["count"], 1)
+        answer = endpoints[1]
+        self.assertEqual(answer["count"], 100)
+        self.assertEqual((answer["p50"], answer["p95"], answer["p99"]), (50.5, round(95.05, 1), 99.0))
+        self.assertEqual(answer["openai"], 25.2)
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "percentile_cont is Postgres only")
+    def test_percentiles_computed_in_database(self):
+        """Test Postgres interpolates the percentiles and averages per endpoint in one query"""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("get_webhook_latency"))
+        answer = response.json()["endpoints"][1]
+
+        self.assertEqual((answer["count"], answer["p50"], answer["p95"], answer["p99"], answer["openai"]),
+                         (100, 50.5, round(95.05, 1), 99.0, 25.2))
+
+    def test_invalid_hours(self):
+        """Test a bad window is rejected"""
+        response = self.client.get(reverse("get_webhook_latency") + "?hours=soon")
+
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,99 @@
+from django.test import TestCase, Client
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from admin_panel.models import User, Log
+from admin_panel.transcript_buffer import buffer_transcripts
+from admin_panel.views.utilities import write_to_log
+
+
+class TranscriptBufferTests(TestCase):
+    def setUp(self):
+        """Set up a log for the call"""
+        self.log = Log.objects.create(phone_number="+1234567890")
+
+    def log_updates(self, queries):
+        return [query for query in queries
+                if query["sql"].startswith("UPDATE") and "admin_panel_log" in query["sql"]]
+
+    def test_unbuffered_write_is_immediate(self):
+        """Test messages are saved right away without an active buffer"""
+        write_to_log(self.log, "Bot", "Hello")
+
+        self.assertEqual(Log.objects.get().transcript, [{"speaker": "Bot", "message": "Hello"}])
+
+    def test_buffered_writes_saved_once(self):
+        """Test several messages in a buffer are written with one update"""
+        with CaptureQueriesContext(connection) as context:
+            with buffer_transcripts():
+                write_to_log(self.log, "Bot", "Hello")
+                write_to_log(self.log, "Caller", "Hi")
+                write_to_log(self.log, "Bot", "How can I help?")
+                self.assertEqual(Log.objects.get().transcript, [])
+
+        self.assertEqual(len(self.log_updates(context.captured_queries)), 1)
+        self.assertEqual([entry["message"] for entry in Log.objects.get().transcript],
+                         ["Hello", "Hi", "How can I help?"])
+
+    def test_full_save_clears_pending(self):
+        """Test a full save inside the buffer is not followed by a second write"""
+        with CaptureQueriesContext(connection) as context:
+            with buffer_transcripts():
+                write_to_log(self.log, "Bot", "Hello")
+                self.log.forwarded = True
+                self.log.save()
+
+        self.assertEqual(len(self.log_updates(context.captured_queries)), 1)
+        log = Log.objects.get()
+        self.assertTrue(log.forwarded)
+        self.assertEqual(len(log.transcript), 1)
+
+    def test_partial_save_keeps_pending(self):
+        """Test saving other fields does not drop buffered messages"""
+        with buffer_transcripts():
+            write_to_log(self.log, "Bot", "Hello")
+            self.log.add_strike()
+
+        log = Log.objects.get()
+        self.assertEqual(log.strikes, 1)
+        self.assertEqual(len(log.transcript), 1)
+
+    def test_flushed_when_block_raises(self):
+        """Test buffered messages are still written if the view fails"""
+        with self.assertRaises(ValueError):
+            with buffer_transcripts():
+                write_to_log(self.log, "Bot", "Hello")
+                raise ValueError
+
+        self.assertEqual(len(Log.objects.get().transcript), 1)
+
+
+class TranscriptBufferViewTests(TestCase):
+    def setUp(self):
+        """Set up a caller with a started call"""
+        cache.clear()
+        self.client = Client()
+        self.phone_number = "+1234567890"
+        self.payload = {"From": self.phone_number, "CallSid": "CA123"}
+        User.objects.create(first_name="Test", last_name="User",
+                            phone_number=self.phone_number, language="en")
+        self.client.post("/init_answer/", self.payload)
+
+    def test_one_log_write_per_webhook(self):
+        """Test a hop writing several messages updates the log once"""
+        with CaptureQueriesContext(connection) as context:
+            self.client.post("/answer/", self.payload)
+
+        updates = [query for query in context.captured_queries
+                   if query["sql"].startswith("UPDATE") and "admin_panel_log" in query["sql"]]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(len(Log.objects.get().transcript), 3)
+
+    def test_call_completion_keeps_transcript(self):
+        """Test completing the call keeps the transcript and sets the end time"""
+        self.client.post("/answer/", self.payload)
+        self.client.post("/call_status_update/", {**self.payload, "CallStatus": "completed"})
+
+        log = Log.objects.get()
+        self.assertEqual(len(log.transcript), 3)
+        self.assertIsNotNone(log.length_of_call)
@@ -0,0 +1,106 @@
+from django.test import TestCase
+from unittest.mock import patch
+from admin_panel.translation_cache import (TranslationCache, translation_cache,
+                                           protect_placeholders, restore_placeholders)
+from admin_panel.views.utilities import translate_to_language, translate_template
+
+
+class TranslationCacheTests(TestCase):
+    def test_hit_and_miss_counters(self):
+        """Test lookups are counted as hits or misses"""
+        cache = TranslationCache(maxsize=10, ttl=60)
+
+        self.assertIsNone(cache.get(("en", "es", "Hi")))
+        cache.set(("en", "es", "Hi"), "Hola")
+        self.assertEqual(cache.get(("en", "es", "Hi")), "Hola")
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["size"], 1)
+
+    def test_least_recently_used_evicted(self):
+        """Test the oldest unused entry is dropped when the cache is full"""
+        cache = TranslationCache(maxsize=2, ttl=60)
+        cache.set("a", "A")
+        cache.set("b", "B")
+        cache.get("a")
+        cache.set("c", "C")
+
+        self.assertEqual(cache.get("a"), "A")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "C")
+
+    @patch("admin_panel.translation_cache.time.monotonic")
+    def test_entries_expire(self, mock_monotonic):
+        """Test entries are not returned after their time to live"""
+        cache = TranslationCache(maxsize=2, ttl=60)
+        mock_monotonic.return_value = 100
+        cache.set("a", "A")
+
+        mock_monotonic.return_value = 159
+        self.assertEqual(cache.get("a"), "A")
+        mock_monotonic.return_value = 161
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_placeholders_round_trip(self):
+        """Test protected placeholders are restored after translation"""
+        protected = protect_placeholders("Your requested date was {date}.")
+
+        self.assertEqual(protected, 'Your requested date was <span translate="no">{date}</span>.')
+        self.assertEqual(restore_placeholders('La fecha fue <span translate="no"> {date} </span>.'),
+                         "La fecha fue {date}.")
+
+
+class TranslateWithCacheTests(TestCase):
+    def setUp(self):
+        """Start without cached live translations"""
+        translation_cache.clear()
+
+    @patch("admin_panel.views.utilities.get_translate_client")
+    def test_repeated_text_translated_once(self, mock_translate):
+        """Test the same dynamic text only reaches the translator once"""
+        mock_translate.return_value.translate.return_value = {"translatedText": "15 de mayo"}
+
+        first = translate_to_language("en", "es", "May 15")
+        second = translate_to_language("en", "es", "May 15")
+
+        self.assertEqual(first, second)
+        mock_translate.return_value.translate.assert_called_once()
+        self.assertEqual(translation_cache.stats()["hits"], 1)
+
+    @patch("admin_panel.views.utilities.get_translate_client")
+    def test_catalog_template_needs_no_translator(self, mock_translate):
+        """Test templates in the catalog are filled without a network call"""
+        response = translate_template("en", "es", "Your name is {name}. Is that correct?", name="Ana Lopez")
+
+        self.assertEqual(response, "Su nombre es Ana Lopez. ¿Es correcto?")
+        mock_translate.assert_not_called()
+
+    @patch("admin_panel.views.utilities.get_translate_client")
+    def test_template_translated_once_for_any_values(self, mock_translate):
+        """Test a live template is translated once and reused for new values"""
+        mock_translate.return_value.translate.return_value = {
+            "translatedText": 'Hola <span translate="no">{name}</span>, su cita es a las <span translate="no">{time}</span>.'}
+        template = "Hello {name}, your appointment is at {time}."
+
+        first = translate_template("en", "es", template, name="Ana", time="09:00 AM")
+        second = translate_template("en", "es", template, name="Luis", time="10:15 AM")
+
+        self.assertEqual(first, "Hola Ana, su cita es a las 09:00 AM.")
+        self.assertEqual(second, "Hola Luis, su cita es a las 10:15 AM.")
+        mock_translate.return_value.translate.assert_called_once()
+
+    @patch("admin_panel.views.utilities.get_translate_client")
+    def test_mangled_template_falls_back(self, mock_translate):
+        """Test the filled in text is translated if placeholders are lost"""
+        mock_translate.return_value.translate.side_effect = [
+            {"translatedText": "Hola."},
+            {"translatedText": "Hola Ana."},
+        ]
+
+        response = translate_template("en", "es", "Hello {name}.", name="Ana")
+
+        self.assertEqual(response, "Hola Ana.")
+        self.assertEqual(mock_translate.return_value.translate.call_count, 2)
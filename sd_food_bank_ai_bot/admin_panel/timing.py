@@ -0,0 +1,194 @@
+"""
+Response time of every Twilio webhook and where it went.
+
+Twilio gives up on a webhook that is slow to answer, so the wall time of each
+hop is recorded with the part of it spent in the database, OpenAI, Google
+Translate and Twilio's REST API, tagged by view, language and CallSid.
+WebhookTimingMiddleware starts a HopTiming for the request and the shared
+clients add to it through timed(). Database time comes from an execute
+wrapper installed on every connection. The HopTiming lives in a context
+variable, so it follows the request into sync_to_async threads and
+run_concurrently, where calls running side by side each add their own time.
+
+Rows are kept in memory and written to WebhookTiming with one bulk insert per
+WEBHOOK_TIMING_BATCH_SIZE hops, rather than one insert per hop. A timer
+started with each batch writes it WEBHOOK_TIMING_FLUSH_SECONDS later if it is
+not full by then, so quiet hours still show up on the dashboard. Batches are
+written by a background thread, off the webhook's response, and a failed
+write is logged rather than raised. Rows
+older than WEBHOOK_TIMING_RETENTION_DAYS are removed when a batch is written.
+"""
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from .models import WebhookTiming
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ("db", "openai", "translate", "twilio")
+
+_current = contextvars.ContextVar("hop_timing", default=None)
+_pending = []
+_flush_timer = None
+_lock = threading.Lock()
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="webhook-timing")
+_last_write = None
+
+
+class HopTiming:
+    """
+    Seconds spent by one webhook in total and in each category.
+    """
+
+    def __init__(self):
+        self.created = timezone.now()
+        self.started = time.perf_counter()
+        self.seconds = dict.fromkeys(CATEGORIES, 0.0)
+        self._lock = threading.Lock()
+
+    def add(self, category, seconds):
+        with self._lock:
+            self.seconds[category] += seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_hop():
+    return _current.get()
+
+
+@contextmanager
+def start_hop():
+    """
+    Time everything inside the block as one webhook hop.
+    """
+    hop = HopTiming()
+    token = _current.set(hop)
+    try:
+        yield hop
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(category):
+    """
+    Add the time spent inside the block to the current hop, if any.
+    """
+    hop = _current.get()
+    if hop is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        hop.add(category, time.perf_counter() - start)
+
+
+def time_query(execute, sql, params, many, context):
+    with timed("db"):
+        return execute(sql, params, many, context)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """
+    Time every query run on a new database connection.
+    """
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+connection_created.connect(install_query_timer)
+
+
+def timing_row(request, response, hop):
+    """
+    Unsaved WebhookTiming row for a finished hop.
+    """
+    match = request.resolver_match
+    session = getattr(request, "call_session", None)
+    ms = {category: round(seconds * 1000, 2) for category, seconds in hop.seconds.items()}
+    return WebhookTiming(
+        view_name=match.url_name if match and match.url_name else request.path,
+        language=(session.language if session else None) or "",
+        call_sid=request.POST.get("CallSid", ""),
+        created=hop.created,
+        status_code=response.status_code,
+        total_ms=round(hop.elapsed() * 1000, 2),
+        db_ms=ms["db"],
+        openai_ms=ms["openai"],
+        translate_ms=ms["translate"],
+        twilio_ms=ms["twilio"],
+    )
+
+
+def record(row):
+    """
+    Queue a timing row, returning True once the batch is full. The first row
+    of a batch starts the timer that writes it if it never fills up.
+    """
+    global _flush_timer
+    with _lock:
+        if not _pending:
+            _flush_timer = threading.Timer(settings.WEBHOOK_TIMING_FLUSH_SECONDS, flush_in_background)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+        _pending.append(row)
+        return len(_pending) >= settings.WEBHOOK_TIMING_BATCH_SIZE
+
+
+def flush():
+    """
+    Write every queued timing row and drop rows past retention.
+    """
+    global _flush_timer
+    with _lock:
+        rows = _pending[:]
+        _pending.clear()
+        if _flush_timer is not None:
+            # The batch is written now, a timer that already fired finds nothing
+            _flush_timer.cancel()
+            _flush_timer = None
+    if not rows:
+        return
+    WebhookTiming.objects.bulk_create(rows)
+    retention = timezone.now() - timedelta(days=settings.WEBHOOK_TIMING_RETENTION_DAYS)
+    WebhookTiming.objects.filter(created__lt=retention).delete()
+
+
+def write_batch():
+    try:
+        flush()
+    except Exception:
+        # Timings are best effort, the rows of this batch are dropped
+        logger.exception("Could not write webhook timings")
+    finally:
+        close_old_connections()
+
+
+def flush_in_background():
+    """
+    Write the queued rows from the writer thread.
+    """
+    global _last_write
+    _last_write = _writer.submit(write_batch)
+
+
+def wait_for_writes():
+    """
+    Block until the last batch handed to the writer thread is written.
+    """
+    if _last_write is not None:
+        _last_write.result()
@@ -0,0 +1,71 @@
+"""
+Buffer for call transcript lines written during a webhook.
+
+The bot writes several lines to the transcript on every hop of a call. While a
+buffer is active (TranscriptBufferMiddleware opens one for each request) those
+lines are only kept on the Log and every Log is written once when the buffer
+is flushed, instead of once per sentence.
+"""
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+
+# Logs with unsaved transcript lines, None while no buffer is active
+_pending_logs = ContextVar("pending_transcript_logs", default=None)
+
+
+def defer(log):
+    """
+    Register a log with unsaved transcript lines. Returns False when no buffer
+    is active and the caller should write the lines right away.
+    """
+    pending = _pending_logs.get()
+    if pending is None:
+        return False
+    pending[id(log)] = log
+    return True
+
+
+def flush():
+    """
+    Write the unsaved transcript lines of every log in the active buffer.
+    """
+    pending = _pending_logs.get()
+    if not pending:
+        return
+    logs = list(pending.values())
+    pending.clear()
+    for log in logs:
+        log.flush_transcript()
+
+
+@contextmanager
+def buffer_transcripts():
+    """
+    Collect transcript lines until the block exits, then write them.
+    """
+    token = _pending_logs.set({})
+    try:
+        yield
+    finally:
+        try:
+            flush()
+        finally:
+            _pending_logs.reset(token)
+
+
+@asynccontextmanager
+async def abuffer_transcripts():
+    """
+    Async version of buffer_transcripts, the logs are written off the event
+    loop.
+    """
+    token = _pending_logs.set({})
+    try:
+        yield
+    finally:
+        try:
+            await sync_to_async(flush)()
+        finally:
+            _pending_logs.reset(token)
@@ -0,0 +1,106 @@
+"""
+In-process cache for live Google Translate results.
+
+Translations are keyed on (source language, target language, text) and kept
+in a bounded least recently used map with a time to live, so the same date,
+time or prompt template is only sent to Google once per process however many
+calls repeat it.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+PLACEHOLDER_PATTERN = re.compile(r"\{(\w+)\}")
+PROTECTED_PATTERN = re.compile(r'<span translate="no">\s*(\{\w+\})\s*</span>')
+
+
+class TranslationCache:
+    """
+    Thread-safe LRU cache with a time to live and hit/miss counters.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """
+        Store value for key, evicting the least recently used entry when full.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Drop every entry and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Return the counters and current size of the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+def protect_placeholders(template):
+    """
+    Wrap each {placeholder} so Google Translate leaves it untouched when the
+    text is sent in html format.
+    """
+    return PLACEHOLDER_PATTERN.sub(r'<span translate="no">{\1}</span>', template)
+
+
+def restore_placeholders(translated):
+    """
+    Remove the wrapping added by protect_placeholders from a translation.
+    """
+    return PROTECTED_PATTERN.sub(r"\1", translated)
+
+
+def placeholders(template):
+    """
+    Return the set of placeholder names used in a template.
+    """
+    return set(PLACEHOLDER_PATTERN.findall(template))
+
+
+# Shared cache for the process
+translation_cache = TranslationCache(settings.TRANSLATION_CACHE_SIZE,
+                                     settings.TRANSLATION_CACHE_TTL)
@@ -3,6 +3,7 @@
 from django.urls import path
 from django.shortcuts import redirect
 from . import views
+from .views.phone_service_async import webhook
 
 
 urlpatterns = [
@@ -37,84 +38,84 @@ urlpatterns = [
 
      # Phone Service FAQ
     path("init_answer/",
-          views.init_answer,
+          webhook(views.init_answer),
           name="init_answer"),
     path("answer/",
-         views.phone_service_faq.answer_call,
+         webhook(views.phone_service_faq.answer_call),
          name="answer_call"),
     path("get_question_from_user/",
-         views.phone_service_faq.get_question_from_user,
+         webhook(views.phone_service_faq.get_question_from_user),
          name="get_question_from_user"),
     path("confirm_question/<str:question>/",
-         views.phone_service_faq.confirm_question,
+         webhook(views.phone_service_faq.confirm_question),
          name="confirm_question"),
     path("prompt_question/",
-         views.phone_service_faq.prompt_question,
+         webhook(views.phone_service_faq.prompt_question),
          name="prompt_question"),
     path("prompt_post_answer/",
-         views.prompt_post_answer,
+         webhook(views.prompt_post_answer),
          name="prompt_post_answer"),
     path("process_post_answer/",
-         views.process_post_answer,
+         webhook(views.process_post_answer),
          name="process_post_answer"),
     path("call_status_update/",
-         views.phone_service_faq.call_status_update,
+         webhook(views.phone_service_faq.call_status_update),
          name="call_status_update"),
 
     # Phone Service Schedule
     path("check_account/",
-         views.check_account,
+         webhook(views.check_account),
          name="check_account"),
     path("confirm_account/",
-         views.confirm_account,
+         webhook(views.confirm_account),
          name="confirm_account"),
     path("get_name/",
-         views.phone_service_schedule.get_name,
+         webhook(views.phone_service_schedule.get_name),
          name="get_name"),
     path("process_name_confirmation/<str:name_encoded>/",
-         views.phone_service_schedule.process_name_confirmation,
+         webhook(views.phone_service_schedule.process_name_confirmation),
          name="process_name_confirmation"),
     path("request_date_availability/",
-         views.request_date_availability,
+         webhook(views.request_date_availability),
          name="request_date_availability"),
      path("generate_requested_date/",
          views.generate_requested_date,
          name="request_date_availability"),
     path("confirm_request_date_availability/",
-         views.confirm_request_date_availability,
+         webhook(views.confirm_request_date_availability),
          name="confirm_request_date_availability"),
     path("confirm_available_date/",
-         views.confirm_available_date,
+         webhook(views.confirm_available_date),
          name="confirm_available_date"),
     path("check_for_appointment/<str:date_encoded>/",
-         views.check_for_appointment,
+         webhook(views.check_for_appointment),
          name="check_for_appointment"),
     path("request_preferred_time_under_four/",
-         views.request_preferred_time_under_four,
+         webhook(views.request_preferred_time_under_four),
          name="request_preferred_time_under_four"),
     path("request_preferred_time_over_three/",
-         views.request_preferred_time_over_three,
+         webhook(views.request_preferred_time_over_three),
          name="request_preferred_time_over_three"),
     path("generate_requested_time/",
-         views.generate_requested_time,
+         webhook(views.generate_requested_time),
          name="generate_requested_time"),
     path("find_requested_time/<str:time_encoded>/",
-         views.find_requested_time,
+         webhook(views.find_requested_time),
          name="find_requested_time"),
     path("suggested_time_response/<str:time_encoded>/<str:date>/",
-         views.suggested_time_response,
+         webhook(views.suggested_time_response),
          name="suggested_time_response"),
     path("get_time_response/",
-         views.get_time_response,
+         webhook(views.get_time_response),
          name="get_time_response"),
     path("given_time_response/<str:time_encoded>/<str:date>/",
-         views.given_time_response,
+         webhook(views.given_time_response),
          name="given_time_response"),
     path("confirm_time_selection/<str:time_encoded>/<str:date>/",
-         views.confirm_time_selection,
+         webhook(views.confirm_time_selection),
          name="confirm_time_selection"),
     path("final_confirmation/<str:time_encoded>/<str:date>/",
-         views.final_confirmation,
+         webhook(views.final_confirmation),
          name="final_confirmation"),
 
     # Phone service cancellation
@@ -122,20 +123,20 @@ urlpatterns = [
          views.reroute_no_appointment,
          name="reroute_no_appointment"),
     path("cancel_appointment/<int:appointment_id>/",
-         views.cancel_appointment,
+         webhook(views.cancel_appointment),
          name="cancel_appointment"),
     path("no_account_reroute/",
-         views.no_account_reroute,
+         webhook(views.no_account_reroute),
          name="no_account_reroute"),
     path("reroute_caller_with_no_account/",
-         views.reroute_caller_with_no_account,
+         webhook(views.reroute_caller_with_no_account),
          name="reroute_caller_with_no_account"),
     path("cancel_initial_routing/",
          views.cancel_initial_routing,
          name="cancel_initial_routing"),
     # Phone service rescheduling
     path("reschedule_appointment/<str:date_encoded>/",
-         views.reschedule_appointment,
+         webhook(views.reschedule_appointment),
          name="reschedule_appointment"),
     path("prompt_cancellation_confirmation/<int:appointment_id>/",
          views.prompt_cancellation_confirmation,
@@ -161,7 +162,7 @@ urlpatterns = [
          views.prompt_reschedule_appointment_over_one,
          name="prompt_reschedule_appointment_over_one"),
     path("generate_date/",
-         views.generate_date,
+         webhook(views.generate_date),
          name="generate_date"),
     path("confirm_requested_date/<str:date_encoded>/",
          views.confirm_requested_date,
@@ -174,6 +175,9 @@ urlpatterns = [
      path("single_log_view/<int:log_id>/",
           views.single_log_view,
           name="single_log_view"),
+     path("audit_logs/export/",
+          views.export_logs,
+          name="export_logs"),
 
      # Account Approval
      path("account_approval/",
@@ -197,6 +201,9 @@ urlpatterns = [
      path('monitoring/', 
           views.monitoring_dashboard, 
           name="monitoring_dashboard"),
+     path('api/dashboard/',
+          views.get_dashboard,
+          name='get_dashboard'),
      path('api/total-calls/', 
           views.get_total_calls, 
           name='get_total_calls'),
@@ -218,4 +225,7 @@ urlpatterns = [
     path('api/call-avg-length/', 
           views.get_avg_length, 
           name='get_avg_length'),
+    path('api/webhook-latency/',
+         views.get_webhook_latency,
+         name='get_webhook_latency'),
 ]
@@ -4,6 +4,7 @@ from .phone_service_faq import *
 from .phone_service_schedule import *
 from .phone_service_reschedule import *
 from .phone_service_cancel import *
+from .phone_service_async import *
 from .audit_logs import *
 from .account_approval import *
 from .monitoring_page import *
\ No newline at end of file
@@ -1,10 +1,12 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
+from .. import archive, log_export, log_search
 from ..models import Log
-from django.db.models import Q
-from django.http import HttpResponse
+from ..availability import day_range
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from datetime import datetime
+from urllib.parse import urlencode
 
 
 @login_required
@@ -14,26 +16,34 @@ def main_page_view(request):
     """
     query = request.GET.get('q')
     date_str = request.GET.get("date", "").strip() 
-    logs_qs = Log.objects.all().order_by("-time_started")
+    logs_qs = Log.objects.all()
 
     if date_str:
         try:
             target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-            logs_qs = logs_qs.filter(time_started__date=target_date)
+            logs_qs = logs_qs.filter(**day_range(target_date, field="time_started"))
         except ValueError:
             pass
 
     if query:
-        # Look in to changing this or adding filter, right now to properly search 
+        # Matches phone numbers and transcript messages, to properly search
         # using date would need to type 2025-04-20
-        logs_qs = logs_qs.filter(phone_number__icontains=query)
-    
-    paginator = Paginator(logs_qs, 10)
+        logs_qs = log_search.search(logs_qs, query)
 
-    pg_num = request.GET.get("page")
-    logs = paginator.get_page(pg_num)
+    logs = log_search.keyset_page(logs_qs, after=request.GET.get("after"),
+                                  before=request.GET.get("before"), last="last" in request.GET)
+    log_count, count_estimated = log_search.estimated_count(logs_qs)
 
-    return render(request, 'audit_logs.html', {"logs": logs, "query": query, "date_str": date_str,})
+    # Page links keep the search and date
+    filters = urlencode({key: value for key, value in (("q", query), ("date", date_str)) if value})
+    # Export links cover what is listed
+    export_filters = urlencode({key: value for key, value in
+                                (("q", query), ("start", date_str), ("end", date_str)) if value})
+
+    return render(request, 'audit_logs.html', {"logs": logs, "query": query, "date_str": date_str,
+                                               "filters": filters, "export_filters": export_filters,
+                                               "log_count": log_count,
+                                               "count_estimated": count_estimated})
 
 @login_required
 def single_log_view(request, log_id):
@@ -41,7 +51,7 @@ def single_log_view(request, log_id):
 
     # Remove weird large spacing caused by \n\r in the messages  for transcript
     cleaned_transcript = []
-    for entry in log.transcript:
+    for entry in archive.transcript(log):
         message = entry.get('message', '')
         cleaned_message = ' '.join(message.replace('\n', ' ').replace('\r', ' ').split())
         cleaned_transcript.append({
@@ -49,4 +59,39 @@ def single_log_view(request, log_id):
             'message': cleaned_message
         })
 
-    return render(request, 'single_audit_log.html', {"log": log, "cleaned_transcript": cleaned_transcript})
\ No newline at end of file
+    return render(request, 'single_audit_log.html', {"log": log, "cleaned_transcript": cleaned_transcript})
+
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+
+@login_required
+def export_logs(request):
+    """
+    Stream every log matching the filters as CSV or NDJSON, optionally with
+    transcripts and intents.
+    """
+    export_format = request.GET.get("format", "csv")
+    forwarded = {"": None, "true": True, "false": False}.get(request.GET.get("forwarded", ""), "")
+    try:
+        start, end = parse_date(request.GET.get("start")), parse_date(request.GET.get("end"))
+    except ValueError:
+        return JsonResponse({'error': 'Dates must be YYYY-MM-DD'}, status=400)
+    if export_format not in log_export.FORMATS or forwarded == "":
+        return JsonResponse({'error': 'Invalid format or forwarded filter'}, status=400)
+
+    logs = log_export.filter_logs(Log.objects.all(), start, end, request.GET.get("language"), forwarded)
+    if request.GET.get("q"):
+        logs = log_search.search(logs, request.GET["q"])
+    chunks = log_export.export_chunks(logs, export_format,
+                                      transcripts=request.GET.get("transcripts") == "1",
+                                      intents=request.GET.get("intents") == "1")
+    if isinstance(request, ASGIRequest):
+        chunks = log_export.aexport_chunks(chunks)
+
+    content_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="call_logs.{export_format}"'
+    return response
+
@@ -1,12 +1,19 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
 from django.http import JsonResponse
 from django.views import View
-from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.utils.timezone import now
-from django.db.models import Count, Avg
-from django.db.models.functions import TruncYear, TruncMonth, TruncDay
+from django.db import connection
+from django.db.models import Avg, Case, CharField, Count, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import ExtractDay, ExtractHour, ExtractMonth, ExtractYear
 from django.shortcuts import render
-from zoneinfo import ZoneInfo
-from ..models import Log
+from .. import rollups, timing
+from ..stats import percentile, PercentileCont
+from ..models import CallRollup, WebhookTiming
 from collections import defaultdict
 from datetime import timedelta
 
@@ -17,320 +24,273 @@ def monitoring_dashboard(request):
     """
     return render(request, "monitoring_page.html")
 
-def filter_by_topic_qs(qs, topic):
-    """Filters QuerySet by topic if possible (used before .values())."""
-    if topic == "All" or not topic:
-        return qs
-    return qs.filter(**{f"intents__has_key": topic})
 
-def filter_by_topic_list(qs, topic):
-    """Filters a list of logs (for manual iteration cases)."""
-    if topic == "All" or not topic:
-        return qs
+# Cached dashboard_metrics, by dashboard_digest
+DASHBOARD_KEY = "dashboard:{}"
+
+# Time of day chart buckets, (label, first hour, end hour) in the dashboard's time zone
+TIME_OF_DAY = [("8am-12pm", 8, 12), ("12pm-4pm", 12, 16), ("4pm-8pm", 16, 20)]
+NIGHT = "8pm-8am"
+
+
+def period_label(period, gran):
+    """Format a (year, month, day) period as a chart label for the granularity"""
+    year, month, day = period
+    if gran == 'year':
+        return year
+    if gran == 'month':
+        return f"{year}-{month:02d}"
+    return f"{year}-{month:02d}-{day:02d}"
+
+
+def dashboard_rows(gran, topic, start):
+    """
+    Every rollup the dashboard needs for a granularity and topic, in one
+    query. Calls per period cover all history, grouped by year, month or
+    day in SQL. The hourly calls and the language, forwarding and reason
+    counts cover the current period and are summed over it, hourly calls
+    into their time of day bucket.
+    """
+    calls_by_day = Q(grain=CallRollup.DAY, dimension=rollups.CALLS)
+    in_period = Q(period__gte=start)
+    breakdowns = Q(grain=CallRollup.DAY, dimension__in=[rollups.LANGUAGE, rollups.FORWARDED,
+                                                        rollups.INTENT, rollups.FAQ_QUESTION])
+    hourly_calls = Q(grain=CallRollup.HOUR, dimension=rollups.CALLS)
+
+    parts = {'year': ExtractYear, 'month': ExtractMonth, 'day': ExtractDay}
+    periods = {name: Case(When(calls_by_day, then=extract('period', tzinfo=rollups.DASHBOARD_TZ)),
+                          default=None, output_field=IntegerField())
+               for name, extract in list(parts.items())[:list(parts).index(gran) + 1]}
+    buckets = [When(hourly_calls & Q(local_hour__gte=first, local_hour__lt=end), then=Value(label))
+               for label, first, end in TIME_OF_DAY]
+    time_of_day = Case(*buckets, When(hourly_calls, then=Value(NIGHT)), default=None,
+                       output_field=CharField())
+
+    return CallRollup.objects \
+        .filter(calls_by_day | (breakdowns & in_period) | (hourly_calls & in_period),
+                topic=topic or rollups.ALL_TOPICS) \
+        .annotate(local_hour=ExtractHour('period', tzinfo=rollups.DASHBOARD_TZ)) \
+        .annotate(time_of_day=time_of_day, **periods) \
+        .values('grain', 'dimension', 'key', 'time_of_day', *periods) \
+        .annotate(count=Sum('count'), length_seconds=Sum('length_seconds'))
+
+
+def dashboard_metrics(gran, topic):
+    """
+    Every chart of the monitoring page for a granularity and topic, or None
+    for an unknown granularity.
+    """
+    start = rollups.period_start(gran)
+    if start is None:
+        return None
+
+    by_period = {}
+    languages = {'en': 0, 'es': 0}
+    forwarded = defaultdict(int)
+    hours = dict.fromkeys([label for label, _, _ in TIME_OF_DAY] + [NIGHT], 0)
+    reasons = {}
+    # The reasons chart shows FAQ questions for faq, otherwise intents
+    reason_dimension = rollups.FAQ_QUESTION if topic == "faq" else rollups.INTENT
+
+    for row in dashboard_rows(gran, topic, start):
+        dimension = row['dimension']
+        if row['grain'] == CallRollup.HOUR:
+            hours[row['time_of_day']] = row['count']
+        elif dimension == rollups.CALLS:
+            period = (row['year'], row.get('month'), row.get('day'))
+            by_period[period] = (row['count'], row['length_seconds'])
+        elif dimension == rollups.LANGUAGE:
+            languages[row['key']] = row['count']
+        elif dimension == rollups.FORWARDED:
+            forwarded["Caller Requested" if row['key'] == 'caller' else "Automatic"] += row['count']
+        elif dimension == reason_dimension and topic:
+            reasons[row['key']] = row['count']
+
+    periods = sorted(by_period)
+    labels = [period_label(period, gran) for period in periods]
+    counts = [by_period[period][0] for period in periods]
+    calls = sum(counts)
+    seconds = sum(by_period[period][1] for period in periods)
+    forwarded = dict(sorted(forwarded.items(), key=lambda item: item[1], reverse=True))
+    reasons = dict(sorted(reasons.items()))
+
+    return {
+        'total_calls': {
+            'total': calls,
+            'labels': labels,
+            'counts': counts,
+        },
+        'avg_length': {
+            'total_average_lengths': str(timedelta(seconds=int(seconds / calls))) if calls else "00:00:00",
+            'labels': labels,
+            'average_lengths': [length / count if count else 0 for count, length in
+                                (by_period[period] for period in periods)],
+        },
+        'language': {
+            'labels': ['English', 'Spanish'],
+            'counts': [languages['en'], languages['es']],
+        },
+        'time_of_day': {
+            'labels': list(hours.keys()),
+            'counts': list(hours.values()),
+        },
+        'forwarded': {
+            'total': sum(forwarded.values()),
+            'labels': list(forwarded.keys()),
+            'counts': list(forwarded.values()),
+        },
+        'reasons': {
+            'labels': list(reasons.keys()),
+            'counts': list(reasons.values()),
+            'total': sum(reasons.values()),
+            'type': topic,
+        },
+    }
+
+
+def dashboard_digest(gran, topic):
+    """
+    Identifies a dashboard response: the rollup version, the request and
+    the current period, so responses change at midnight too.
+    """
+    start = rollups.period_start(gran)
+    state = f"{rollups.version().isoformat()}|{gran}|{topic}|{start.date() if start else ''}"
+    return hashlib.md5(state.encode()).hexdigest()
+
+
+def cached_dashboard_metrics(gran, topic):
+    """
+    dashboard_metrics, computed once per rollup version.
+    """
+    key = DASHBOARD_KEY.format(dashboard_digest(gran, topic))
+    metrics = cache.get(key)
+    if metrics is None:
+        metrics = dashboard_metrics(gran, topic)
+        cache.set(key, metrics, timeout=settings.DASHBOARD_MAX_STALENESS)
+    return metrics
+
+
+def dashboard_etag(request, *args):
+    return dashboard_digest(request.GET.get('granularity', 'year'), request.GET.get('topic'))
+
+
+def dashboard_last_modified(request, *args):
+    return rollups.version()
+
+
+# Repeat polls get a 304 from the cached version without touching the database
+conditional_dashboard = condition(etag_func=dashboard_etag, last_modified_func=dashboard_last_modified)
+
+
+@cache_control(private=True, no_cache=True)
+@conditional_dashboard
+def get_dashboard(request):
+    """
+    Returns every chart of the monitoring page for the granularity and topic
+    from a single query, so the page loads with one request.
+    """
+    metrics = cached_dashboard_metrics(request.GET.get('granularity', 'year'), request.GET.get('topic'))
+    if metrics is None:
+        return JsonResponse({'error': 'Invalid granularity'}, status=400)
+    return JsonResponse(metrics)
 
-    def topic_filter(log):
-        if not log.intents:
-            return False
-        if topic == "faq":
-            return "faq" in log.intents and log.intents["faq"]
-        return topic in log.intents
 
-    return [log for log in qs if topic_filter(log)]
+@cache_control(private=True, no_cache=True)
+@conditional_dashboard
+def dashboard_chart(request, chart):
+    """
+    One chart of the dashboard, for the per chart API endpoints.
+    """
+    metrics = cached_dashboard_metrics(request.GET.get('granularity', 'year'), request.GET.get('topic'))
+    if metrics is None:
+        return JsonResponse({'error': 'Invalid granularity'}, status=400)
+    return JsonResponse(metrics[chart])
 
 
 def get_total_calls(request):
     """
     Returns total calls and a breakdown by the given granularity (time period).
     """
-    # Retrieve desired time period level from the request by user
-    gran = request.GET.get('granularity', 'year')
-    topic = request.GET.get('topic')
-    qs = Log.objects.all() # Might want to change this from all call logs to maybe past 12 months, etc.
-
-    if gran == 'year':
-        qs = qs.annotate(period=TruncYear('time_started'))
-    elif gran == 'month':
-        qs = qs.annotate(period=TruncMonth('time_started'))
-    elif gran == 'day':
-        qs = qs.annotate(period=TruncDay('time_started'))
-    else:
-        return JsonResponse({
-            'error': 'Invalid granularity'}, status=400)
-    
-    if topic and topic != "All":
-        qs = filter_by_topic_qs(qs, topic)
-
-    # Group by time period and count number of logs in each 
-    data = qs.values('period') \
-                .annotate(count=Count('id')) \
-                .order_by('period')
-
-    labels = []
-    counts = []
-    for entry in data:
-        dt = entry['period']
-        # Format the label based on time period 
-        if gran == 'year':
-            label = dt.year
-        elif gran == 'month':
-            label = dt.strftime('%Y-%m')
-        else:
-            label = dt.strftime('%Y-%m-%d')
-        labels.append(label)
-        counts.append(entry['count'])
-
-    total = sum(counts)
-    # Return the total metrics as JSON 
-    return JsonResponse({
-        'total': total,
-        'labels': labels,
-        'counts': counts,
-    })
+    return dashboard_chart(request, 'total_calls')
 
 def get_call_language(request):
     """
     Returns the count of calls grouped by language (english or spanish)
     """
-    gran = request.GET.get('granularity', 'year')
-    topic = request.GET.get('topic')
-    pst = ZoneInfo("America/Los_Angeles")
-    now = timezone.now().astimezone(pst)
-    qs = Log.objects.all()
-
-    if gran == 'year':
-        qs = qs.filter(time_started__year=now.year)
-    elif gran == 'month':
-        qs = qs.filter(time_started__year=now.year, time_started__month=now.month)
-    elif gran == 'day':
-        qs = qs.filter(time_started__date=now.date())
-    
-    else: 
-        return JsonResponse({"error": "Invalid"}, status=400)
-    
-    if topic and topic != "All":
-        qs = filter_by_topic_qs(qs, topic)
-
-    # count by language
-    data = qs.values('language').annotate(count=Count('id'))
-    
-    counts = {'en': 0, 'es': 0}
-    for row in data:
-        counts[row['language']] = row['count']
-
-    return JsonResponse({
-        'labels': ['English', 'Spanish'],
-        'counts': [counts['en'], counts['es']],
-    })
+    return dashboard_chart(request, 'language')
 
 def get_calls_forwarded(request):
     """
     Returns counts of forwarded calls split by caller's request vs. automatic (based on strikes).
     """
-    qs = Log.objects.filter(forwarded=True)
-    topic = request.GET.get('topic')
-    pst = ZoneInfo("America/Los_Angeles")
-    now = timezone.now().astimezone(pst)
-    gran = request.GET.get('granularity', 'year')
-
-    if gran == 'year':
-        qs = qs.filter(time_started__year=now.year)
-    elif gran == 'month':
-        qs = qs.filter(time_started__year=now.year, time_started__month=now.month)
-    elif gran == 'day':
-        qs = qs.filter(time_started__date=now.date())
-
-    if topic and topic != "All":
-        qs = filter_by_topic_qs(qs, topic)
-
-    data = (
-        qs.values('forwarded_reason')
-          .annotate(count=Count('id'))
-          .order_by('-count')
-    )
-
-    labels, counts = [], []
-    total = 0
-    for row in data:
-        labels.append(
-            "Caller Requested" if row['forwarded_reason']=='caller'
-            else "Automatic"
-        )
-        counts.append(row['count'])
-        total += row['count']
-
-    return JsonResponse({
-        'total': total,
-        'labels': labels,
-        'counts': counts,
-    })
+    return dashboard_chart(request, 'forwarded')
 
 def get_time_of_day(request):
     """
     Returns the count of calls grouped by time of day.
     """
-
-    gran = request.GET.get('granularity', 'year')
-    topic = request.GET.get('topic')
-    qs = Log.objects.all()
-    
-    pst = ZoneInfo("America/Los_Angeles")
-    now = timezone.now().astimezone(pst)
-
-    if gran == 'year':
-        qs = qs.filter(time_started__year=now.year)
-    elif gran == 'month':
-        qs = qs.filter(time_started__year=now.year, time_started__month=now.month)
-    elif gran == 'day':
-        qs = qs.filter(time_started__date=now.date())
-    else:
-        return JsonResponse({'error': 'Invalid granularity'}, status=400)
-    
-    if topic and topic != "All":
-        qs = filter_by_topic_list(qs, topic)
-
-    buckets = {
-        "8am-12pm": 0,
-        "12pm-4pm": 0,
-        "4pm-8pm": 0,
-        "8pm-8am": 0
-    }
-    
-    for entry in qs:
-        ts = entry.time_started
-        ts_pst = ts.astimezone(pst)
-        hour = ts_pst.hour
-
-        if 8 <= hour < 12:
-            bucket = "8am-12pm"
-        elif 12 <= hour < 16:
-            bucket = "12pm-4pm"
-        elif 16 <= hour < 20:
-            bucket = "4pm-8pm"
-        else:
-            bucket = "8pm-8am"
-
-        buckets[bucket] += 1
-    
-    labels = list(buckets.keys())
-    counts = list(buckets.values())
-
-    return JsonResponse({"labels": labels, "counts": counts})
+    return dashboard_chart(request, 'time_of_day')
 
 def get_reason_for_calling(request):
     """
     Returns the count of calls grouped by the users reason for calling.
     """
-
-    gran = request.GET.get('granularity', 'year')
-    topic = request.GET.get('topic')
-    qs = Log.objects.all()
-    
-    pst = ZoneInfo("America/Los_Angeles")
-    now = timezone.now().astimezone(pst)
-
-    if gran == 'year':
-        qs = qs.filter(time_started__year=now.year)
-    elif gran == 'month':
-        qs = qs.filter(time_started__year=now.year, time_started__month=now.month)
-    elif gran == 'day':
-        qs = qs.filter(time_started__date=now.date())
-    else:
-        return JsonResponse({'error': 'Invalid granularity'}, status=400)
-    
-
-    # Only filter topic AFTER time filtering
-    logs = list(qs)
-    if topic and topic != "All":
-        logs = filter_by_topic_list(logs, topic)
-
-    intent_counts = defaultdict(int)
-    total = 0
-
-    for log in logs:
-        intents = log.intents or {}
-
-        if topic == "faq":
-            faq_data = intents.get("faq", {})
-            if isinstance(faq_data, dict):
-                for question, count in faq_data.items():
-                    if isinstance(count, int):
-                        intent_counts[question] += count
-                        total += count
-        else:
-            if topic == "All":
-                for key, value in intents.items():
-                    if isinstance(value, dict):
-                        count = len(value)
-                    else:
-                        count = int(value)
-                    intent_counts[key] += count
-                    total += count
-            elif topic in intents:
-                value = intents[topic]
-                if isinstance(value, dict):
-                    count = len(value)
-                else:
-                    count = int(value)
-                intent_counts[topic] += count
-                total += count
-
-    return JsonResponse({
-        "labels": list(intent_counts.keys()),
-        "counts": list(intent_counts.values()),
-        "total": total,
-        "type": topic,
-    })
+    return dashboard_chart(request, 'reasons')
 
 def get_avg_length(request):
     """
     Returns average call length and a breakdown by the given granularity (time period).
     """
-    # Retrieve desired time period level from the request by user
-    gran = request.GET.get('granularity', 'year')
-    topic = request.GET.get('topic')
-    qs = Log.objects.all() # Might want to change this from all call logs to maybe past 12 months, etc.
+    return dashboard_chart(request, 'avg_length')
 
-    if gran == 'year':
-        qs = qs.annotate(period=TruncYear('time_started'))
-    elif gran == 'month':
-        qs = qs.annotate(period=TruncMonth('time_started'))
-    elif gran == 'day':
-        qs = qs.annotate(period=TruncDay('time_started'))
-    else:
-        return JsonResponse({
-            'error': 'Invalid granularity'}, status=400)
-    
-    if topic and topic != "All":
-        qs = filter_by_topic_qs(qs, topic)
-
-    # Group by time period and count number of logs in each 
-    data = qs.values('period') \
-                .annotate(avg_length=Avg('length_of_call')) \
-                .order_by('period')
-
-    labels = []
-    avg_lengths = []
-    for entry in data:
-        dt = entry['period']
-        # Format the label based on time period 
-        if gran == 'year':
-            label = dt.year
-        elif gran == 'month':
-            label = dt.strftime('%Y-%m')
-        else:
-            label = dt.strftime('%Y-%m-%d')
-        labels.append(label)
-        avg_lengths.append(entry['avg_length'].total_seconds())
-
-    total_avg_lengths = qs.aggregate(avg_length=Avg('length_of_call'))['avg_length']
-    if total_avg_lengths is not None:
-        total_avg_lengths = str(timedelta(seconds=int(total_avg_lengths.total_seconds())))
+
+def get_webhook_latency(request):
+    """
+    Returns p50/p95/p99 response times of every Twilio webhook over the last
+    hours (24 by default), with the average time spent in the database and
+    each outside API, slowest endpoint first.
+    """
+    try:
+        hours = min(max(int(request.GET.get('hours', 24)), 1), 24 * 30)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid hours'}, status=400)
+
+    # Include hops this process has not written yet
+    timing.flush()
+    hops = WebhookTiming.objects.filter(created__gte=now() - timedelta(hours=hours))
+
+    if connection.vendor == 'postgresql':
+        # Percentiles and averages per endpoint computed in the database
+        rows = hops.values('view_name').annotate(
+            count=Count('id'),
+            p50=PercentileCont('total_ms', 0.5),
+            p95=PercentileCont('total_ms', 0.95),
+            p99=PercentileCont('total_ms', 0.99),
+            **{category: Avg(f'{category}_ms') for category in timing.CATEGORIES},
+        )
+        endpoints = [{
+            'view': row['view_name'],
+            'count': row['count'],
+            **{key: round(row[key], 1) for key in ('p50', 'p95', 'p99', *timing.CATEGORIES)},
+        } for row in rows]
     else:
-        total_avg_lengths = "00:00:00"
-    
-    # Return the total metrics as JSON 
-    return JsonResponse({
-        'total_average_lengths': total_avg_lengths,
-        'labels': labels,
-        'average_lengths': avg_lengths,
-    })
\ No newline at end of file
+        by_view = defaultdict(list)
+        for view_name, *times in hops.values_list('view_name', 'total_ms', 'db_ms', 'openai_ms',
+                                                  'translate_ms', 'twilio_ms'):
+            by_view[view_name].append(times)
+
+        endpoints = []
+        for view_name, view_hops in by_view.items():
+            totals = [hop[0] for hop in view_hops]
+            averages = [round(sum(column) / len(view_hops), 1) for column in list(zip(*view_hops))[1:]]
+            endpoints.append({
+                'view': view_name,
+                'count': len(view_hops),
+                'p50': round(percentile(totals, 0.5), 1),
+                'p95': round(percentile(totals, 0.95), 1),
+                'p99': round(percentile(totals, 0.99), 1),
+                **dict(zip(timing.CATEGORIES, averages)),
+            })
+    endpoints.sort(key=lambda endpoint: endpoint['p95'], reverse=True)
+
+    return JsonResponse({'hours': hours, 'endpoints': endpoints})
@@ -0,0 +1,351 @@
+"""
+Async variants of the phone service webhooks, served when ASYNC_WEBHOOKS is on
+and the site runs under asgi.py.
+
+A sync webhook keeps a worker thread for as long as OpenAI and Google take to
+answer. The FAQ flow here awaits GPT through the async OpenAI client and uses
+the async ORM, so a waiting call only costs the event loop a coroutine. The
+TwiML each view answers with is built by the same helpers as the sync views
+in phone_service_faq. The
+scheduling flow runs its existing views in a pool of ASYNC_VIEW_THREADS
+threads instead of the single thread Django keeps for sync code under ASGI.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+import urllib.parse
+from zoneinfo import ZoneInfo
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from twilio.twiml.voice_response import VoiceResponse
+
+from sd_food_bank_ai_bot.settings import ASYNC_WEBHOOKS, ASYNC_VIEW_THREADS
+from ..models import Log, User
+from .. import prefetch
+from . import phone_service_faq, phone_service_schedule
+from .phone_service_faq import (close_call_log, twiml, say, greeting, menu, question_prompt,
+                                confirm_question_prompt, strike_response, answer_response,
+                                post_answer_prompt, post_answer_choice, MENU_ROUTES)
+from .phone_service_schedule import CALLER
+from .utilities import (astrike_system_handler, forward_operator, write_to_log,
+                        get_phone_number, get_call_session, aget_caller, aget_call_log,
+                        aget_response_sentiment, aget_matching_question,
+                        aget_corresponding_answer, aget_prompted_choice,
+                        atranslate_to_language)
+
+_view_executor = ThreadPoolExecutor(max_workers=ASYNC_VIEW_THREADS, thread_name_prefix="webhook")
+
+
+def run_in_thread_pool(view):
+    """
+    Async variant of a sync view that runs it in the webhook thread pool.
+    Each run gets its own database connection, closed like it would be at the
+    end of a sync request.
+    """
+    def run(request, *args, **kwargs):
+        close_old_connections()
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            close_old_connections()
+
+    run_async = sync_to_async(run, thread_sensitive=False, executor=_view_executor)
+
+    @csrf_exempt
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await run_async(request, *args, **kwargs)
+    return async_view
+
+
+@csrf_exempt
+async def init_answer_async(request):
+    """
+    Async version of init_answer
+    """
+    phone_number = get_phone_number(request)
+    caller_response = VoiceResponse()
+    pst = ZoneInfo("America/Los_Angeles")
+
+    user, created = await User.objects.aget_or_create(
+        phone_number=phone_number,
+        defaults={
+            "first_name": "NaN",
+            "last_name": "NaN",
+        }
+    )
+
+    if phone_number:
+        call_sid = request.POST.get("CallSid")
+        if call_sid:
+            # Twilio may retry the first webhook, keep a single log per call
+            log, _ = await Log.objects.aget_or_create(call_sid=call_sid, defaults={
+                "phone_number": phone_number, "language": user.language,
+                "time_started": timezone.now().astimezone(pst)})
+        else:
+            log = await Log.objects.acreate(phone_number=phone_number, language=user.language,
+                                            time_started=timezone.now().astimezone(pst))
+        # Remember the caller and the new log for the rest of the call
+        session = get_call_session(request, phone_number)
+        session.user = user
+        session.log = log
+        greeting(caller_response, user, log)
+    else:
+        caller_response.say("Sorry, we are unable to help you at this time.", voice="Polly.Joanna")
+        forward_operator(caller_response)
+
+    return twiml(caller_response)
+
+
+@csrf_exempt
+async def answer_call_async(request):
+    """
+    Async version of answer_call
+    """
+    caller_response = VoiceResponse()
+    phone_number = get_phone_number(request)
+
+    log = await aget_call_log(request, phone_number)
+
+    user = await aget_caller(request, phone_number)
+
+    digit_input = request.POST.get('Digits', '')
+    if digit_input:
+        if digit_input == "0":
+            if user.language == "en":
+                user.language = "es"
+            else:
+                user.language = "en"
+            await user.asave()
+            log.language = user.language
+            await log.asave()
+            caller_response.redirect("/answer/")
+        elif digit_input in MENU_ROUTES:
+            intent, route = MENU_ROUTES[digit_input]
+            await log.aadd_intent(intent)
+            caller_response.redirect(route)
+        elif digit_input == "5":
+            if log:
+                log.forwarded = True
+                log.forwarded_reason = 'caller'
+                await log.asave()
+            return forward_operator(caller_response, log)
+
+        else:
+            caller_response.say("Please choose a valid option.", voice="Polly.Joanna")
+
+    menu(caller_response, user, log, digit_input)
+
+    return twiml(caller_response)
+
+
+@csrf_exempt
+async def call_status_update_async(request):
+    """
+    Async version of call_status_update
+    """
+    if request.method == 'POST':
+        call_status = request.POST.get('CallStatus')
+        phone_number = request.POST.get('From')
+
+        if call_status == 'completed':
+            log = await aget_call_log(request, phone_number)
+            if log:
+                await sync_to_async(close_call_log)(log)
+
+            # The call is over, later webhooks must not reuse its session
+            await get_call_session(request, phone_number).ainvalidate()
+            await prefetch.acancel_call(request.POST.get("CallSid"))
+
+        return JsonResponse({"status": "success"})
+
+    else:
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+
+@csrf_exempt
+async def prompt_question_async(request):
+    """
+    Async version of prompt_question
+    """
+    phone_number = request.POST.get('From')
+    log = await aget_call_log(request, phone_number)
+    caller_response = VoiceResponse()
+
+    user = await aget_caller(request, phone_number)
+    question_prompt(caller_response, user, log)
+
+    return twiml(caller_response)
+
+
+@csrf_exempt
+async def get_question_from_user_async(request):
+    """
+    Async version of get_question_from_user
+    """
+    speech_result = request.POST.get('SpeechResult', '')
+    phone_number = request.POST.get('From')
+    log = await aget_call_log(request, phone_number)
+    write_to_log(log, CALLER, speech_result)
+    caller_response = VoiceResponse()
+
+    user = await aget_caller(request, phone_number)
+    if speech_result:
+        if user.language == "es":
+            speech_result = await atranslate_to_language(source_lang="es", target_lang="en", text=speech_result)
+        question = await aget_matching_question(speech_result)
+        if question:
+            spoken_question = question
+            if user.language != "en":
+                spoken_question = await atranslate_to_language(source_lang="en", target_lang="es", text=question)
+            confirm_question_prompt(caller_response, user, log, question, spoken_question)
+        else:  # No matching question found
+            # Add a strike
+            strike_response(caller_response, user, log, await astrike_system_handler(log),
+                            "Sorry, I don't have the answer to that at this time. Maybe try rephrasing your question.",
+                            "Lo siento, no tengo la respuesta en este momento. Quizás podrías intentar reformular tu pregunta.")
+    else:
+        say(caller_response, user, log, "Sorry, I couldn't understand that.", "Lo siento, no pude entender eso.")
+
+    return twiml(caller_response)
+
+
+@csrf_exempt
+async def confirm_question_async(request, question):
+    """
+    Async version of confirm_question
+    """
+    speech_result = request.POST.get('SpeechResult', '')
+    phone_number = request.POST.get('From')
+    log = await aget_call_log(request, phone_number)
+    caller_response = VoiceResponse()
+    write_to_log(log, CALLER, speech_result)
+
+    user = await aget_caller(request, phone_number)
+    if speech_result:
+        if user.language == "es":
+            speech_result = await atranslate_to_language("es", "en", speech_result)
+
+        sentiment = await aget_response_sentiment(speech_result)
+        if sentiment:
+            question = urllib.parse.unquote(question)
+
+            if "operator" in question:
+                if log:
+                    log.forwarded = True
+                    log.forwarded_reason = 'caller'
+                    await log.asave()
+                return forward_operator(caller_response, log)
+
+            answer = await aget_corresponding_answer(question)
+            await log.aadd_question(question)
+
+            if user.language != "en":
+                answer = await atranslate_to_language("en", "es", answer)
+            answer_response(caller_response, user, log, answer)
+        # If caller has indicated unsatisfactory response, add a string
+        # and retry
+        else:
+            # Add a strike
+            strike_response(caller_response, user, log, await astrike_system_handler(log),
+                            "Sorry about that. Please try asking again or rephrasing.",
+                            "Lo siento. Intenta preguntar de nuevo o reformula tu pregunta.")
+    else:
+        say(caller_response, user, log, "Sorry, I couldn't understand that. Please try again.",
+            "Lo siento, no pude entender eso. Por favor inténtalo de nuevo.")
+        caller_response.redirect("/prompt_question/")
+
+    return twiml(caller_response)
+
+
+@csrf_exempt
+async def prompt_post_answer_async(request):
+    """
+    Async version of prompt_post_answer
+    """
+    phone_number = request.POST.get('From')
+    log = await aget_call_log(request, phone_number)
+    user = await aget_caller(request, phone_number)
+    caller_response = VoiceResponse()
+
+    # reset strike system since we successfully handed the FAQ
+    await astrike_system_handler(log, reset=True)
+
+    post_answer_prompt(caller_response, user, log)
+
+    return twiml(caller_response)
+
+
+@csrf_exempt
+async def process_post_answer_async(request):
+    """
+    Async version of process_post_answer
+    """
+    phone_number = request.POST.get('From')
+    log = await aget_call_log(request, phone_number)
+    user = await aget_caller(request, phone_number)
+    caller_response = VoiceResponse()
+    speech_result = request.POST.get("SpeechResult", "").strip()
+
+    write_to_log(log, CALLER, speech_result)
+
+    if not speech_result:
+        caller_response.redirect('/prompt_post_answer/')
+        return twiml(caller_response)
+
+    if user.language == "es":
+        speech_result = await atranslate_to_language(source_lang="es", target_lang="en", text=speech_result)
+    post_answer_choice(caller_response, user, log, await aget_prompted_choice(speech_result))
+
+    return twiml(caller_response)
+
+
+# Async variant of every phone service webhook
+ASYNC_VARIANTS = {
+    phone_service_faq.init_answer: init_answer_async,
+    phone_service_faq.answer_call: answer_call_async,
+    phone_service_faq.call_status_update: call_status_update_async,
+    phone_service_faq.prompt_question: prompt_question_async,
+    phone_service_faq.get_question_from_user: get_question_from_user_async,
+    phone_service_faq.confirm_question: confirm_question_async,
+    phone_service_faq.prompt_post_answer: prompt_post_answer_async,
+    phone_service_faq.process_post_answer: process_post_answer_async,
+}
+for _view in (
+    phone_service_schedule.check_account,
+    phone_service_schedule.confirm_account,
+    phone_service_schedule.get_name,
+    phone_service_schedule.process_name_confirmation,
+    phone_service_schedule.request_date_availability,
+    phone_service_schedule.confirm_request_date_availability,
+    phone_service_schedule.confirm_available_date,
+    phone_service_schedule.confirm_time_selection,
+    phone_service_schedule.final_confirmation,
+    phone_service_schedule.get_time_response,
+    phone_service_schedule.given_time_response,
+    phone_service_schedule.suggested_time_response,
+    phone_service_schedule.generate_date,
+    phone_service_schedule.check_for_appointment,
+    phone_service_schedule.request_preferred_time_under_four,
+    phone_service_schedule.request_preferred_time_over_three,
+    phone_service_schedule.generate_requested_time,
+    phone_service_schedule.find_requested_time,
+    phone_service_schedule.cancel_appointment,
+    phone_service_schedule.reroute_caller_with_no_account,
+    phone_service_schedule.no_account_reroute,
+    phone_service_schedule.reschedule_appointment,
+):
+    ASYNC_VARIANTS[_view] = run_in_thread_pool(_view)
+
+
+def webhook(view, use_async=ASYNC_WEBHOOKS):
+    """
+    The view to route a phone service webhook to, its async variant when
+    ASYNC_WEBHOOKS is on.
+    """
+    if use_async:
+        return ASYNC_VARIANTS.get(view, view)
+    return view
@@ -3,10 +3,11 @@ from twilio.twiml.voice_response import VoiceResponse, Gather
 from .phone_service_faq import get_response_sentiment
 from .phone_service_schedule import get_phone_number
 from django.views.decorators.csrf import csrf_exempt
-from ..models import User, AppointmentTable, Log
+from ..models import AppointmentTable
 from django.http import HttpResponse
-from openai import OpenAI
-from .utilities import format_date_for_response, write_to_log
+from ..clients import get_openai_client
+from .utilities import (format_date_for_response, write_to_log, get_caller,
+                        get_call_log)
 from sd_food_bank_ai_bot.settings import TIMEOUT, SPEECHTIMEOUT
 
 
@@ -19,7 +20,7 @@ def cancel_initial_routing(request):
     caller_number = get_phone_number(request)
     response = VoiceResponse()
 
-    user = User.objects.get(phone_number=caller_number)
+    user = get_caller(request, caller_number)
     num_appointments = AppointmentTable.objects.filter(user=user).count()
 
     if num_appointments == 0:
@@ -42,9 +43,9 @@ def ask_appointment_to_cancel(request):
     are scheduled
     """
     caller_number = get_phone_number(request)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    log = get_call_log(request, caller_number)
     response = VoiceResponse()
-    user = User.objects.get(phone_number=caller_number)
+    user = get_caller(request, caller_number)
     appointments = AppointmentTable.objects.filter(user=user)
 
     gather = Gather(input="speech", speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT,
@@ -71,9 +72,9 @@ def process_appointment_selection(request):
     Process the user's response about which appointment to cancel
     """
     caller_number = get_phone_number(request)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    log = get_call_log(request, caller_number)
     response = VoiceResponse()
-    user = User.objects.get(phone_number=caller_number)
+    user = get_caller(request, caller_number)
     appointments = AppointmentTable.objects.filter(user=user)
 
     speech_result = request.POST.get('SpeechResult', '')
@@ -89,7 +90,7 @@ def process_appointment_selection(request):
 
     if speech_result:
         # Query GPT for which appointment best aligns with the user's choice
-        client = OpenAI()
+        client = get_openai_client()
         system_prompt = (f"The user said: '{speech_result}'.\n"
                          f"Here are the available appointments:\n{appointment_options}\n"
                          "Based on what the user said, which appointment do they want to cancel."
@@ -136,7 +137,7 @@ def prompt_cancellation_confirmation(request, appointment_id):
     Prompts the user to ensure they wish to cancel their appointment
     """
     caller_number = get_phone_number(request)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    log = get_call_log(request, caller_number)
     response = VoiceResponse()
     appointment = AppointmentTable.objects.get(pk=appointment_id)
 
@@ -162,7 +163,7 @@ def cancellation_confirmation(request, appointment_id):
     Get the users response and proceed with the cancellation accordingly
     """
     caller_number = get_phone_number(request)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    log = get_call_log(request, caller_number)
     response = VoiceResponse()
     speech_result = request.POST.get('SpeechResult', '')
     write_to_log(log, CALLER, speech_result)
@@ -191,7 +192,7 @@ def return_main_menu_response(request):
     their response.
     """
     caller_number = get_phone_number(request)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    log = get_call_log(request, caller_number)
     response = VoiceResponse()
     speech_result = request.POST.get('SpeechResult', '')
     write_to_log(log, CALLER, speech_result)
@@ -221,7 +222,7 @@ def reroute_no_appointment(request):
     when they do not have an appointment.
     """
     caller_number = get_phone_number(request)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    log = get_call_log(request, caller_number)
     response = VoiceResponse()
 
     response.say("We do not have an appointment registered with your number.", voice="Polly.Joanna")
@@ -1,6 +1,7 @@
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from ..models import Log
+from .. import prefetch, rollups
 from django.http import HttpResponse
 from twilio.twiml.voice_response import VoiceResponse, Gather
 import urllib.parse
@@ -10,13 +11,145 @@ from .utilities import (strike_system_handler, forward_operator, write_to_log,
                         get_response_sentiment,
                         get_matching_question, get_corresponding_answer, get_prompted_choice)
 from .phone_service_schedule import CALLER, BOT
-from .utilities import get_phone_number, translate_to_language
+from .utilities import (get_phone_number, translate_to_language, get_caller,
+                        get_call_log, get_call_session)
 from ..models import User
 from datetime import timedelta
 from sd_food_bank_ai_bot.settings import TIMEOUT, SPEECHTIMEOUT
 
 
 
+MENU_EN = "press 1 to schedule an appointment, press 2 to reschedule an appointment,\
+                        press 3 to cancel an appointment, press 4 to ask about specific inquiries,\
+                        or press 5 to be forwarded to an operator."
+MENU_ES = "presione 1 para programar una cita, presione 2 para reprogramar una cita, presione\
+                        3 para cancelar una cita, presione 4 para preguntar sobre consultas específicas\
+                        o presione 5 para ser remitido a un operador."
+# Menu digit -> (intent, where the caller goes)
+MENU_ROUTES = {
+    "1": ("schedule", "/check_account/?action=schedule"),
+    "2": ("reschedule", "/check_account/?action=reschedule"),
+    "3": ("cancel", "/check_account/?action=cancel"),
+    "4": ("faq", "/prompt_question/"),
+}
+STRUCK_OUT = "Sorry. I cannot process your request at this time."
+
+
+# TwiML shared by the sync views here and their async variants in
+# phone_service_async, which only differ in how they reach the database,
+# OpenAI and Google.
+
+def twiml(caller_response):
+    return HttpResponse(str(caller_response), content_type='text/xml')
+
+
+def say(target, user, log, english, spanish):
+    """
+    Say english or spanish, whichever the caller speaks, and log it.
+    """
+    if user.language == "en":
+        target.say(english, language="en", voice="Polly.Joanna")
+        write_to_log(log, BOT, english)
+    else:
+        target.say(spanish, language="es-MX", voice="Polly.Mia")
+        write_to_log(log, BOT, spanish)
+
+
+def speech_gather(user, action, **kwargs):
+    return Gather(input="speech", timeout=TIMEOUT, action=action,
+                  language="en" if user.language == "en" else "es-MX", **kwargs)
+
+
+def greeting(caller_response, user, log):
+    """
+    Thank the caller and go on to the menu.
+    """
+    say(caller_response, user, log, "Thank you for calling the San Diego Food Bank!",
+        "Gracias por llamar al banco de alimentos de San Diego!")
+    caller_response.redirect("/answer/")
+
+
+def menu(caller_response, user, log, digit_input):
+    """
+    Read the menu unless the caller already pressed a digit, and listen for
+    the next one.
+    """
+    gather = Gather(num_digits=1, speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT)
+    if digit_input == "":
+        if user.language == "en":
+            gather.say("Para español presione 0.", language="es-MX", voice="Polly.Mia")
+            write_to_log(log, BOT, "Para español presione 0.")
+        else:
+            gather.say("For english press 0.", language="en", voice="Polly.Joanna")
+            write_to_log(log, BOT, "For english press 0.")
+        say(gather, user, log, MENU_EN, MENU_ES)
+    caller_response.append(gather)
+    # If no input, repeat process
+    caller_response.redirect("/answer/")
+
+
+def question_prompt(caller_response, user, log):
+    gather = speech_gather(user, "/get_question_from_user/", speechTimeout=SPEECHTIMEOUT)
+    say(gather, user, log, "What can I help you with?", "¿En qué puedo ayudarte?")
+    caller_response.append(gather)
+    caller_response.redirect("/prompt_question/")
+
+
+def confirm_question_prompt(caller_response, user, log, question, spoken_question):
+    """
+    Ask the caller to confirm the matched question, spoken_question is the
+    question in the caller's language.
+    """
+    gather = speech_gather(user, f"/confirm_question/{urllib.parse.quote(question)}/",
+                           speechTimeout=SPEECHTIMEOUT)
+    say(gather, user, log, f"You asked: {spoken_question} Is this correct?",
+        f"Preguntaste: {spoken_question} ¿Es esto correcto?")
+    caller_response.append(gather)
+    caller_response.redirect("/prompt_question/")
+
+
+def strike_response(caller_response, user, log, struck_out, english, spanish):
+    """
+    Forward a caller who reached the strike limit, otherwise apologize and
+    ask again.
+    """
+    if struck_out:
+        caller_response.say(STRUCK_OUT, voice="Polly.Joanna")
+        write_to_log(log, BOT, STRUCK_OUT)
+        forward_operator(caller_response, log)
+    else:
+        say(caller_response, user, log, english, spanish)
+        caller_response.redirect("/prompt_question/")
+
+
+def answer_response(caller_response, user, log, answer):
+    """
+    Read the answer, already in the caller's language, and offer what's next.
+    """
+    say(caller_response, user, log, answer, answer)
+    caller_response.redirect("/prompt_post_answer/")
+
+
+def post_answer_prompt(caller_response, user, log):
+    gather = speech_gather(user, "/process_post_answer/")
+    say(gather, user, log, "Would you like to return to the main menu, ask another question, or end the call?",
+        "¿Desea regresar al menú principal, hacer otra pregunta o finalizar la llamada?")
+    caller_response.append(gather)
+
+
+def post_answer_choice(caller_response, user, log, choice):
+    """
+    Another question for True, hang up for False and the menu for None.
+    """
+    if choice == True:
+        caller_response.redirect("/prompt_question/")
+    elif choice == False:
+        say(caller_response, user, log, "Have a great day!", "¡Qué tengas un lindo día!")
+        caller_response.hangup()
+    else:
+        caller_response.redirect("/answer/")
+
+
 @csrf_exempt
 def init_answer(request):
     """
@@ -35,19 +168,24 @@ def init_answer(request):
     )
 
     if phone_number:
-        log = Log.objects.create(phone_number=phone_number, language=user.language, time_started=timezone.now().astimezone(pst))
-        if user.language == "en":
-            caller_response.say("Thank you for calling the San Diego Food Bank!", language="en", voice="Polly.Joanna")
-            write_to_log(log, BOT, "Thank you for calling the San Diego Food Bank!")
+        call_sid = request.POST.get("CallSid")
+        if call_sid:
+            # Twilio may retry the first webhook, keep a single log per call
+            log, _ = Log.objects.get_or_create(call_sid=call_sid, defaults={
+                "phone_number": phone_number, "language": user.language,
+                "time_started": timezone.now().astimezone(pst)})
         else:
-            caller_response.say("Gracias por llamar al banco de alimentos de San Diego!", language="es-MX",  voice="Polly.Mia")
-            write_to_log(log, BOT, "Gracias por llamar al banco de alimentos de San Diego!")
-        caller_response.redirect("/answer/")
+            log = Log.objects.create(phone_number=phone_number, language=user.language, time_started=timezone.now().astimezone(pst))
+        # Remember the caller and the new log for the rest of the call
+        session = get_call_session(request, phone_number)
+        session.user = user
+        session.log = log
+        greeting(caller_response, user, log)
     else:
         caller_response.say("Sorry, we are unable to help you at this time.", voice="Polly.Joanna")
-        forward_operator(caller_response, log)
-    
-    return HttpResponse(str(caller_response), content_type='text/xml')
+        forward_operator(caller_response)
+
+    return twiml(caller_response)
 
 
 @csrf_exempt
@@ -58,9 +196,9 @@ def answer_call(request):
     caller_response = VoiceResponse()
     phone_number = get_phone_number(request)
 
-    log = Log.objects.filter(phone_number=phone_number).last()
+    log = get_call_log(request, phone_number)
 
-    user = User.objects.get(phone_number=phone_number)
+    user = get_caller(request, phone_number)
 
     digit_input = request.POST.get('Digits', '')
     if digit_input:
@@ -73,18 +211,10 @@ def answer_call(request):
             log.language = user.language
             log.save()
             caller_response.redirect("/answer/")
-        elif digit_input == "1":
-            log.add_intent("schedule")
-            caller_response.redirect("/check_account/?action=schedule")
-        elif digit_input == "2":  # Reschedule
-            log.add_intent("reschedule")
-            caller_response.redirect("/check_account/?action=reschedule")
-        elif digit_input == "3":  # Cancel
-            log.add_intent("cancel")
-            caller_response.redirect("/check_account/?action=cancel")
-        elif digit_input == "4":  # FAQs
-            log.add_intent("faq")
-            caller_response.redirect("/prompt_question/")
+        elif digit_input in MENU_ROUTES:
+            intent, route = MENU_ROUTES[digit_input]
+            log.add_intent(intent)
+            caller_response.redirect(route)
         elif digit_input == "5":
             if log:
                 log.forwarded = True
@@ -95,35 +225,9 @@ def answer_call(request):
         else:
             caller_response.say("Please choose a valid option.", voice="Polly.Joanna")
 
-    gather = Gather(num_digits=1, speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT)
-
-    if digit_input == "":
-        if user.language == "en":
-            gather.say("Para español presione 0.", language="es-MX", voice="Polly.Mia")
-            write_to_log(log, BOT, "Para español presione 0.")
-            gather.say("press 1 to schedule an appointment, press 2 to reschedule an appointment,\
-                        press 3 to cancel an appointment, press 4 to ask about specific inquiries,\
-                        or press 5 to be forwarded to an operator.", language="en", voice="Polly.Joanna")
-            write_to_log(log, BOT, "press 1 to schedule an appointment, press 2 to reschedule an appointment,\
-                        press 3 to cancel an appointment, press 4 to ask about specific inquiries,\
-                        or press 5 to be forwarded to an operator.")
-        else:
-            gather.say("For english press 0.", language="en", voice="Polly.Joanna")
-            write_to_log(log, BOT, "For english press 0.")
-            gather.say("presione 1 para programar una cita, presione 2 para reprogramar una cita, presione\
-                        3 para cancelar una cita, presione 4 para preguntar sobre consultas específicas\
-                        o presione 5 para ser remitido a un operador.", language="es-MX", voice="Polly.Mia")
-            write_to_log(log, BOT, "presione 1 para programar una cita, presione 2 para reprogramar una cita, presione\
-                        3 para cancelar una cita, presione 4 para preguntar sobre consultas específicas\
-                        o presione 5 para ser remitido a un operador.")
-
-    caller_response.append(gather)
-    
-    # If no input, repeat process
-    caller_response.redirect("/answer/")
+    menu(caller_response, user, log, digit_input)
 
-
-    return HttpResponse(str(caller_response), content_type='text/xml')
+    return twiml(caller_response)
 
 
 @csrf_exempt
@@ -137,16 +241,13 @@ def call_status_update(request):
         phone_number = request.POST.get('From')
 
         if call_status == 'completed':
-            log = Log.objects.filter(phone_number=phone_number).last()
+            log = get_call_log(request, phone_number)
             if log:
-                pst = ZoneInfo("America/Los_Angeles")
-                log.time_ended = timezone.now().astimezone(pst)
+                close_call_log(log)
 
-                if log.time_started:
-                    call_duration = log.time_ended - log.time_started
-                    log.length_of_call = timedelta(seconds=round(call_duration.total_seconds()))
-
-                log.save()
+            # The call is over, later webhooks must not reuse its session
+            get_call_session(request, phone_number).invalidate()
+            prefetch.cancel_call(request.POST.get("CallSid"))
 
         return JsonResponse({"status": "success"})
 
@@ -154,6 +255,24 @@ def call_status_update(request):
         return JsonResponse({"error": "Method not allowed"}, status=405)
 
 
+def close_call_log(log):
+    """
+    Record when the call ended and how long it lasted, and count the call
+    in the dashboard rollups.
+    """
+    # Write anything still buffered before the call is closed
+    log.flush_transcript()
+    pst = ZoneInfo("America/Los_Angeles")
+    log.time_ended = timezone.now().astimezone(pst)
+
+    if log.time_started:
+        call_duration = log.time_ended - log.time_started
+        log.length_of_call = timedelta(seconds=round(call_duration.total_seconds()))
+
+    log.save(update_fields=["time_ended", "length_of_call"])
+    rollups.record_call(log.id)
+
+
 @csrf_exempt
 def prompt_question(request):
     """
@@ -161,25 +280,13 @@ def prompt_question(request):
     till end of call.
     """
     phone_number = request.POST.get('From')
-    log = Log.objects.filter(phone_number=phone_number).last()
+    log = get_call_log(request, phone_number)
     caller_response = VoiceResponse()
-    
-    user = User.objects.get(phone_number=phone_number)
-    gather = None
-    if user.language == "en":
-        gather = Gather(input="speech", speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT,
-                        action="/get_question_from_user/", language="en")
-        gather.say("What can I help you with?", language="en", voice="Polly.Joanna")
-        write_to_log(log, BOT, "What can I help you with?")
-    else:
-        gather = Gather(input="speech", speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT,
-                        action="/get_question_from_user/", language="es-MX")
-        gather.say("¿En qué puedo ayudarte?", language="es-MX", voice="Polly.Mia")
-        write_to_log(log, BOT, "¿En qué puedo ayudarte?")
-    caller_response.append(gather)
-    caller_response.redirect("/prompt_question/")
 
-    return HttpResponse(str(caller_response), content_type='text/xml')
+    user = get_caller(request, phone_number)
+    question_prompt(caller_response, user, log)
+
+    return twiml(caller_response)
 
 
 @csrf_exempt
@@ -189,60 +296,29 @@ def get_question_from_user(request):
     """
     speech_result = request.POST.get('SpeechResult', '')
     phone_number = request.POST.get('From')
-    log = Log.objects.filter(phone_number=phone_number).last()
+    log = get_call_log(request, phone_number)
     write_to_log(log, CALLER, speech_result)
     caller_response = VoiceResponse()
 
-    user = User.objects.get(phone_number=phone_number)
+    user = get_caller(request, phone_number)
     if speech_result:
         if user.language == "es":
             speech_result = translate_to_language(source_lang="es", target_lang="en", text=speech_result)
         question = get_matching_question(speech_result)
         if question:
-            question_encoded = urllib.parse.quote(question)
-            gather = None
-            
-            if user.language == "en":
-                gather = Gather(input="speech", speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT,
-                                action=f"/confirm_question/{question_encoded}/", language="en")
-                gather.say(f"You asked: {question} Is this correct?", voice="Polly.Joanna")
-                write_to_log(log, BOT, f"You asked: {question} Is this correct?")
-            else:
-                question = translate_to_language(source_lang="en", target_lang="es", text=question)
-                gather = Gather(input="speech", speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT,
-                                action=f"/confirm_question/{question_encoded}/", language="es-MX")
-                gather.say(f"Preguntaste: {question} ¿Es esto correcto?", language="es-MX", voice="Polly.Mia")
-                write_to_log(log, BOT, f"Preguntaste: {question} ¿Es esto correcto?")
-
-            caller_response.append(gather)
-            caller_response.redirect("/prompt_question/")
+            spoken_question = question
+            if user.language != "en":
+                spoken_question = translate_to_language(source_lang="en", target_lang="es", text=question)
+            confirm_question_prompt(caller_response, user, log, question, spoken_question)
         else:  # No matching question found
             # Add a strike
-            result = strike_system_handler(log)
-            # strike limit reached
-            if result:
-                caller_response.say("Sorry. I cannot process your request at this time.", voice="Polly.Joanna")
-                write_to_log(log, "bot",
-                    "Sorry. I cannot process your request at this time.")
-                forward_operator(caller_response, log)
-            else:
-                if user.language == "en":
-                    caller_response.say("Sorry, I don't have the answer to that at this time. Maybe try rephrasing your question.", voice="Polly.Joanna")
-                    write_to_log(log, BOT, "Sorry, I don't have the answer to that at this time. Maybe try rephrasing your question.")
-                else:
-                    caller_response.say("Lo siento, no tengo la respuesta en este momento. Quizás podrías intentar reformular tu pregunta.", language="es-MX", voice="Polly.Mia")
-                    write_to_log(log, BOT, "Lo siento, no tengo la respuesta en este momento. Quizás podrías intentar reformular tu pregunta.")
-
-                caller_response.redirect("/prompt_question/")
+            strike_response(caller_response, user, log, strike_system_handler(log),
+                            "Sorry, I don't have the answer to that at this time. Maybe try rephrasing your question.",
+                            "Lo siento, no tengo la respuesta en este momento. Quizás podrías intentar reformular tu pregunta.")
     else:
-        if user.language == "en":
-            caller_response.say("Sorry, I couldn't understand that.", voice="Polly.Joanna")
-            write_to_log(log, BOT, "Sorry, I couldn't understand that.")
-        else:
-            caller_response.say("Lo siento, no pude entender eso.", language="es-MX", voice="Polly.Mia")
-            write_to_log(log, BOT, "Lo siento, no pude entender eso.")
+        say(caller_response, user, log, "Sorry, I couldn't understand that.", "Lo siento, no pude entender eso.")
 
-    return HttpResponse(str(caller_response), content_type='text/xml')
+    return twiml(caller_response)
 
 
 @csrf_exempt
@@ -252,11 +328,11 @@ def confirm_question(request, question):
     """
     speech_result = request.POST.get('SpeechResult', '')
     phone_number = request.POST.get('From')
-    log = Log.objects.filter(phone_number=phone_number).last()
+    log = get_call_log(request, phone_number)
     caller_response = VoiceResponse()
     write_to_log(log, CALLER, speech_result)
-    
-    user = User.objects.get(phone_number=phone_number)
+
+    user = get_caller(request, phone_number)
     if speech_result:
         if user.language == "es":
             speech_result = translate_to_language("es", "en", speech_result)
@@ -275,43 +351,22 @@ def confirm_question(request, question):
             answer = get_corresponding_answer(question)
             log.add_question(question)
 
-            if user.language == "en":
-                caller_response.say(answer, voice="Polly.Joanna")
-            else:
+            if user.language != "en":
                 answer = translate_to_language("en", "es", answer)
-                caller_response.say(answer, language="es-MX", voice="Polly.Mia")
-            write_to_log(log, BOT, answer)
-
-            caller_response.redirect("/prompt_post_answer/")
+            answer_response(caller_response, user, log, answer)
         # If caller has indicated unsatisfactory response, add a string
         # and retry
         else:
             # Add a strike
-            result = strike_system_handler(log)
-            # strike limit reached
-            if result:
-                caller_response.say("Sorry. I cannot process your request at this time.", voice="Polly.Joanna")
-                write_to_log(log, "bot",
-                    "Sorry. I cannot process your request at this time.")
-                forward_operator(caller_response, log)
-            else:
-                if user.language == "en":
-                    caller_response.say("Sorry about that. Please try asking again or rephrasing.", voice="Polly.Joanna")
-                    write_to_log(log, BOT, "Sorry about that. Please try asking again or rephrasing.")
-                else:
-                    caller_response.say("Lo siento. Intenta preguntar de nuevo o reformula tu pregunta.", language="es-MX", voice="Polly.Mia")
-                    write_to_log(log, BOT, "Lo siento. Intenta preguntar de nuevo o reformula tu pregunta.")
-                caller_response.redirect("/prompt_question/")
+            strike_response(caller_response, user, log, strike_system_handler(log),
+                            "Sorry about that. Please try asking again or rephrasing.",
+                            "Lo siento. Intenta preguntar de nuevo o reformula tu pregunta.")
     else:
-        if user.language == "en":
-            caller_response.say("Sorry, I couldn't understand that. Please try again.",voice="Polly.Joanna")
-            write_to_log(log, BOT, "Sorry, I couldn't understand that. Please try again.")
-        else:
-            caller_response.say("Lo siento, no pude entender eso. Por favor inténtalo de nuevo.", voice="Polly.Mia")
-            write_to_log(log, BOT, "Lo siento, no pude entender eso. Por favor inténtalo de nuevo.")
+        say(caller_response, user, log, "Sorry, I couldn't understand that. Please try again.",
+            "Lo siento, no pude entender eso. Por favor inténtalo de nuevo.")
         caller_response.redirect("/prompt_question/")
 
-    return HttpResponse(str(caller_response), content_type='text/xml')
+    return twiml(caller_response)
 
 
 @csrf_exempt
@@ -321,31 +376,16 @@ def prompt_post_answer(request):
     ask another question, or end the call.
     """
     phone_number = request.POST.get('From')
-    log = Log.objects.filter(phone_number=phone_number).last()
-    user = User.objects.get(phone_number=phone_number)
+    log = get_call_log(request, phone_number)
+    user = get_caller(request, phone_number)
     caller_response = VoiceResponse()
 
-    gather = None
-    
     # reset strike system since we successfully handed the FAQ
     strike_system_handler(log, reset=True)
 
-    if user.language == "en":
-        gather = Gather(input="speech", timeout=TIMEOUT,
-                        action="/process_post_answer/", language="en")
-        options = "Would you like to return to the main menu, ask another question, or end the call?"
-        gather.say(options, voice="Polly.Joanna")
-        write_to_log(log, BOT, options)
-    else:
-        gather = Gather(input="speech", timeout=TIMEOUT,
-                        action="/process_post_answer/", language="es-MX")
-        options = "¿Desea regresar al menú principal, hacer otra pregunta o finalizar la llamada?"
-        gather.say(options, language="es-MX")
-        write_to_log(log, BOT, options)
-    
-    caller_response.append(gather)
+    post_answer_prompt(caller_response, user, log)
 
-    return HttpResponse(str(caller_response), content_type='text/xml')
+    return twiml(caller_response)
 
 
 @csrf_exempt
@@ -354,30 +394,19 @@ def process_post_answer(request):
     Processes the users response to the given options.
     """
     phone_number = request.POST.get('From')
-    log = Log.objects.filter(phone_number=phone_number).last()
-    user = User.objects.get(phone_number=phone_number)
+    log = get_call_log(request, phone_number)
+    user = get_caller(request, phone_number)
     caller_response = VoiceResponse()
     speech_result = request.POST.get("SpeechResult", "").strip()
 
     write_to_log(log, CALLER, speech_result)
-    
+
     if not speech_result:
         caller_response.redirect('/prompt_post_answer/')
-        return HttpResponse(str(caller_response), content_type='text/xml')
-    
+        return twiml(caller_response)
+
     if user.language == "es":
         speech_result = translate_to_language(source_lang="es", target_lang="en", text=speech_result)
-    choice = get_prompted_choice(speech_result)
+    post_answer_choice(caller_response, user, log, get_prompted_choice(speech_result))
 
-    if choice == True:
-        caller_response.redirect("/prompt_question/")
-    elif choice == False:
-        if user.language == "en":
-            caller_response.say("Have a great day!")
-        else:
-            caller_response.say("¡Qué tengas un lindo día!", language="es-MX", voice="Polly.Mia")
-        caller_response.hangup()
-    else:
-        caller_response.redirect("/answer/")
-    
-    return HttpResponse(str(caller_response), content_type='text/xml')
\ No newline at end of file
+    return twiml(caller_response)
@@ -1,10 +1,12 @@
-from ..models import User, AppointmentTable, Log
-from .utilities import write_to_log
+from ..models import AppointmentTable
+from .utilities import write_to_log, get_caller, get_call_log
 from django.views.decorators.csrf import csrf_exempt
-from .utilities import get_phone_number, get_response_sentiment, translate_to_language
+from .utilities import (get_phone_number, get_response_sentiment, translate_to_language,
+                        translate_template_with_values)
 from twilio.twiml.voice_response import VoiceResponse, Gather
 from django.http import HttpResponse
-from openai import OpenAI
+from ..clients import get_openai_client
+from ..datetime_parser import parse_date
 import urllib.parse
 from datetime import datetime
 from .phone_service_schedule import CALLER, BOT
@@ -18,8 +20,8 @@ def prompt_reschedule_appointment_over_one(request):
     have over one appointment
     """
     caller_number = get_phone_number(request)
-    log = Log.objects.filter(phone_number=caller_number).last()
-    user = User.objects.get(phone_number=caller_number)
+    log = get_call_log(request, caller_number)
+    user = get_caller(request, caller_number)
 
     response = VoiceResponse()
     
@@ -44,32 +46,37 @@ def prompt_reschedule_appointment_over_one(request):
 @csrf_exempt
 def generate_requested_date(request):
     """
-    Uses GPT to generate a most-likely date that the caller asked for.
+    Parses the date the caller asked for, falling back to GPT for a most-likely date.
     """
     caller_number = get_phone_number(request)
-    log = Log.objects.filter(phone_number=caller_number).last()
-    user = User.objects.get(phone_number=caller_number)
+    log = get_call_log(request, caller_number)
+    user = get_caller(request, caller_number)
     speech_result = request.POST.get('SpeechResult', '')
     write_to_log(log, CALLER, speech_result)
-    if user.language == "es":
-        speech_result = translate_to_language("es", "en", speech_result)
     response = VoiceResponse()
 
     if speech_result:
-        # Query GPT to extract the date
-        client = OpenAI()
-        system_prompt = (
-            "Please extract the most likely intended appointment date from this message."
-            "Respond with a date in the format YYYY-MM-DD. If no date is present, return NONE."
-        )
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": speech_result}
-            ]
-        )
-        response_pred = completion.choices[0].message.content.strip()
+        # The parser reads Spanish too, only translate for GPT
+        requested_date = parse_date(speech_result)
+        if requested_date:
+            response_pred = requested_date.strftime("%Y-%m-%d")
+        else:
+            if user.language == "es":
+                speech_result = translate_to_language("es", "en", speech_result)
+            # Query GPT to extract the date
+            client = get_openai_client()
+            system_prompt = (
+                "Please extract the most likely intended appointment date from this message."
+                "Respond with a date in the format YYYY-MM-DD. If no date is present, return NONE."
+            )
+            completion = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": speech_result}
+                ]
+            )
+            response_pred = completion.choices[0].message.content.strip()
         date_encoded = urllib.parse.quote(response_pred)
 
         if user.language == "en":
@@ -80,7 +87,8 @@ def generate_requested_date(request):
         else:
             gather = Gather(input="speech", speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT,
                         action=f"/confirm_requested_date/{date_encoded}/", language = 'es-MX')
-            out_speech_es = translate_to_language("en", "es", f"Your requested day was {response_pred}. Is that correct?")
+            out_speech_es = translate_template_with_values("en", "es", "Your requested day was {day}. Is that correct?",
+                                                           {"day": response_pred})
             gather.say(out_speech_es, language = 'es-MX', voice="Polly.Mia")
             write_to_log(log, BOT, out_speech_es)
         response.append(gather)
@@ -98,8 +106,8 @@ def confirm_requested_date(request, date_encoded):
     that the appointment is in their appointment list
     """
     caller_number = get_phone_number(request)
-    log = Log.objects.filter(phone_number=caller_number).last()
-    user = User.objects.get(phone_number=caller_number)
+    log = get_call_log(request, caller_number)
+    user = get_caller(request, caller_number)
     speech_result = request.POST.get('SpeechResult', '')
     write_to_log(log, CALLER, speech_result)
     if user.language == "es":
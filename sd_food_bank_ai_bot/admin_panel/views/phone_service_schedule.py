@@ -1,18 +1,24 @@
 from twilio.twiml.voice_response import VoiceResponse, Gather
 from .utilities import (appointment_count, get_response_sentiment,
-                        get_phone_number)
+                        get_phone_number, get_caller, get_call_log,
+                        get_call_session, get_slot_holder)
 from django.views.decorators.csrf import csrf_exempt
-from ..models import User, AppointmentTable, Log
+from ..models import User, AppointmentTable
 from django.http import HttpResponse
-from openai import OpenAI
+from ..clients import get_openai_client
+from ..datetime_parser import parse_date, parse_time, format_time
+from .. import availability, prefetch
+from ..booking import hold_slot, book_slot, release_holds, SlotUnavailable
 from datetime import datetime, timedelta
 import calendar
 from django.utils.timezone import now
 import urllib.parse
 from .utilities import (forward_operator, write_to_log, 
                         format_date_for_response, get_day, check_available_date,
-                        get_available_times_for_date, send_sms, translate_to_language)
-from sd_food_bank_ai_bot.settings import TIMEOUT, SPEECHTIMEOUT
+                        get_available_times_for_date, send_sms, translate_to_language,
+                        translate_template, translate_template_with_values)
+from ..fan_out import run_concurrently
+from sd_food_bank_ai_bot.settings import TIMEOUT, SPEECHTIMEOUT, OPEN_DAYS_OFFERED, OPEN_DAYS_HORIZON
 
 
 BOT = "bot"
@@ -31,8 +37,8 @@ def check_account(request):
     """
     # Have twilio send the caller's number using 'From'
     caller_number = get_phone_number(request)
-    user = User.objects.get(phone_number=caller_number)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    user = get_caller(request, caller_number)
+    log = get_call_log(request, caller_number)
     response = VoiceResponse()
 
     action = request.GET.get("action", "schedule").lower()
@@ -58,17 +64,19 @@ def check_account(request):
                     # Repeat the prompt if no input received
                     response.redirect(f"/check_account/?action={action}")
                 else:
-                    response.say(translate_to_language("en", "es", f"Hello, {user.first_name} {user.last_name}."), language='es-MX', voice="Polly.Mia")
-                    write_to_log(log, BOT,
-                                translate_to_language("en", "es", f"Hello, {user.first_name} {user.last_name}."))
+                    greeting, question = run_concurrently(
+                        lambda: translate_template("en", "es", "Hello, {first_name} {last_name}.",
+                                                   first_name=user.first_name, last_name=user.last_name),
+                        lambda: translate_to_language("en", "es", "Is this your account? Please say yes or no."))
+                    response.say(greeting, language='es-MX', voice="Polly.Mia")
+                    write_to_log(log, BOT, greeting)
 
                     # Confirm the account with the caller
                     gather = Gather(input="speech", speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT,
                                     action=f"/confirm_account/?action={action}")
 
-                    gather.say(translate_to_language("en", "es", "Is this your account? Please say yes or no."), language='es-MX', voice="Polly.Mia")
-                    write_to_log(log, BOT,
-                                translate_to_language("en", "es", "Is this your account? Please say yes or no."))
+                    gather.say(question, language='es-MX', voice="Polly.Mia")
+                    write_to_log(log, BOT, question)
                     response.append(gather)
 
                     # Repeat the prompt if no input received
@@ -125,8 +133,8 @@ def confirm_account(request):
     otherwise they will be prompted to try again.
     """
     caller_number = get_phone_number(request)
-    user = User.objects.get(phone_number=caller_number)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    user = get_caller(request, caller_number)
+    log = get_call_log(request, caller_number)
 
     speech_result = request.POST.get('SpeechResult', '').strip().lower()
     action = request.GET.get("action", "schedule").lower()
@@ -147,10 +155,11 @@ def confirm_account(request):
             response.redirect("/cancel_initial_routing/")
 
         if action == "reschedule":
-            if appointment_count(request) > 1:
+            num_appts = appointment_count(request)
+            if num_appts > 1:
                 # redirect to handle appt > 1 path
                 response.redirect("/prompt_reschedule_appointment_over_one/")
-            elif appointment_count(request) == 1:
+            elif num_appts == 1:
                 # redirect to handle appt == 1 path
                 date_encoded = None
                 response.redirect(f"/reschedule_appointment/{date_encoded}/")
@@ -188,8 +197,8 @@ def get_name(request):
     Processes the users response to extract their name
     """
     caller_number = get_phone_number(request)
-    user = User.objects.get(phone_number=caller_number)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    user = get_caller(request, caller_number)
+    log = get_call_log(request, caller_number)
 
     speech_result = request.POST.get('SpeechResult', '')
     response = VoiceResponse()
@@ -197,7 +206,7 @@ def get_name(request):
 
     if speech_result:
         # Query GPT for name (incase other words are said)
-        client = OpenAI()
+        client = get_openai_client()
         system_prompt = "Please extract someones first and last name from the following message. Only respond with the first and last name."
         completion = client.chat.completions.create(
             model="gpt-4o-mini",
@@ -220,9 +229,10 @@ def get_name(request):
         else:
             gather = Gather(input="speech", speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT,
                             action=f"/process_name_confirmation/{name_encoded}/")
-            gather.say(translate_to_language("en", "es", f"Your name is {response_pred}. Is that correct?"), language='es-MX', voice="Polly.Mia")
-            write_to_log(log, BOT,
-                        translate_to_language("en", "es", f"Your name is {response_pred}. Is that correct?"))
+            name_prompt = translate_template("en", "es", "Your name is {name}. Is that correct?",
+                                             name=response_pred)
+            gather.say(name_prompt, language='es-MX', voice="Polly.Mia")
+            write_to_log(log, BOT, name_prompt)
             response.append(gather)
             response.redirect("/check_account/")
     else:
@@ -237,8 +247,8 @@ def process_name_confirmation(request, name_encoded):
     Based on confirmation of name, routes the flow of the conversation.
     """
     caller_number = get_phone_number(request)
-    user = User.objects.get(phone_number=caller_number)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    user = get_caller(request, caller_number)
+    log = get_call_log(request, caller_number)
 
     speech_result = request.POST.get('SpeechResult', '')
     write_to_log(log, CALLER, speech_result)
@@ -272,6 +282,7 @@ def process_name_confirmation(request, name_encoded):
         user.email = None
 
         user.save()
+        get_call_session(request, caller_number).user = user
 
         # Send to get_date function
         response.redirect("/request_date_availability/")
@@ -295,8 +306,8 @@ def request_date_availability(request):
     Ask the caller what day they would like to schedule an appointment.
     """
     caller_number = get_phone_number(request)
-    user = User.objects.get(phone_number=caller_number)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    user = get_caller(request, caller_number)
+    log = get_call_log(request, caller_number)
     response = VoiceResponse()
 
     if user.language == "en":
@@ -324,7 +335,7 @@ def confirm_request_date_availability(request):
     date availability.
     """
     caller_number = get_phone_number(request)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    log = get_call_log(request, caller_number)
 
     speech_result = request.POST.get('SpeechResult', '').strip().lower()
     write_to_log(log, CALLER, speech_result)
@@ -348,7 +359,7 @@ def confirm_available_date(request):
     date availability.
     """
     caller_number = get_phone_number(request)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    log = get_call_log(request, caller_number)
     speech_result = request.POST.get('SpeechResult', '').strip().lower()
     write_to_log(log, CALLER, speech_result)
     declaration = get_response_sentiment(speech_result)
@@ -382,9 +393,8 @@ def confirm_time_selection(request, time_encoded, date):
     """
     response = VoiceResponse()
     phone_number = get_phone_number(request)
-    user = User.objects.get(phone_number=phone_number)
-    log = Log.objects.filter(phone_number=phone_number).last()
-    user = User.objects.get(phone_number=phone_number)
+    user = get_caller(request, phone_number)
+    log = get_call_log(request, phone_number)
     first_name = user.first_name
     last_name = user.last_name
     time = time_encoded
@@ -392,6 +402,16 @@ def confirm_time_selection(request, time_encoded, date):
     date_obj = datetime.strptime(date, "%Y-%m-%d")
     date_final = format_date_for_response(date_obj)
 
+    # Hold the slot while the caller confirms it, final_confirmation reports bad times
+    try:
+        start_time = datetime.strptime(time, '%I:%M %p').time()
+    except ValueError:
+        start_time = None
+    if start_time and not hold_slot(date_obj.date(), start_time,
+                                    (datetime.combine(date_obj, start_time) + FIXED_APPT_DURATION).time(),
+                                    get_slot_holder(request, phone_number)):
+        return slot_taken_response(response, user, log, date)
+
     if user.language == "en":
         gather = Gather(input="speech", speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT,
                         action=f"/final_confirmation/{time_encoded}/{date}/")
@@ -403,10 +423,11 @@ def confirm_time_selection(request, time_encoded, date):
     else:
         gather = Gather(input="speech", speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT,
                         action=f"/final_confirmation/{time_encoded}/{date}/")
-        gather.say(translate_to_language("en", "es",
-                f"Great! To confirm you are booked for {date_final} at {time} and your name is {first_name} {last_name}. Is that correct?"), language='es-MX', voice="Polly.Mia")
-        write_to_log(log, BOT, translate_to_language("en", "es",
-                f"Great! To confirm you are booked for {date_final} at {time} and your name is {first_name} {last_name}. Is that correct?"))
+        confirmation = translate_template_with_values("en", "es",
+                "Great! To confirm you are booked for {date} at {time} and your name is {first_name} {last_name}. Is that correct?",
+                {"date": date_final}, time=time, first_name=first_name, last_name=last_name)
+        gather.say(confirmation, language='es-MX', voice="Polly.Mia")
+        write_to_log(log, BOT, confirmation)
         response.append(gather)
         response.redirect(f"/confirm_time_selection/{time_encoded}/{date}/")
 
@@ -420,7 +441,7 @@ def final_confirmation(request, time_encoded, date):
     If yes, books appointment. If no sends back to main menu.
     """
     caller_number = get_phone_number(request)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    log = get_call_log(request, caller_number)
     response = VoiceResponse()
     speech_result = request.POST.get('SpeechResult', '')
     write_to_log(log, CALLER, speech_result)
@@ -430,7 +451,7 @@ def final_confirmation(request, time_encoded, date):
         # book appointment
         time_str = time_encoded
         phone_number = get_phone_number(request)
-        user = User.objects.get(phone_number=phone_number)
+        user = get_caller(request, phone_number)
 
         try:
             appointment_date = datetime.strptime(date, '%Y-%m-%d').date()
@@ -455,12 +476,10 @@ def final_confirmation(request, time_encoded, date):
                 forward_operator(response, log)
                 return HttpResponse(str(response), content_type="text/xml")                
 
-        AppointmentTable.objects.create(
-            user=user,
-            start_time=start_time,
-            end_time=end_time,
-            date=appointment_date
-        )
+        try:
+            book_slot(user, appointment_date, start_time, end_time, get_slot_holder(request, phone_number))
+        except SlotUnavailable:
+            return slot_taken_response(response, user, log, date)
 
         if user.language == "en":
             response.say("Perfect! Your appointment has been scheduled. You'll receive a confirmation SMS shortly. Have a great day!", voice="Polly.Joanna")
@@ -473,19 +492,35 @@ def final_confirmation(request, time_encoded, date):
                     "Perfect! Your appointment has been scheduled. You'll receive a confirmation SMS shortly. Have a great day!"))
             send_sms(phone_number,f"Your appointment at {start_datetime} has been scheduled. Thank you!")            
     else:
+        release_holds(get_slot_holder(request, caller_number))
         response.redirect("/answer/")
 
     return HttpResponse(str(response), content_type="text/xml")
 
 
+def slot_taken_response(response, user, log, date):
+    """
+    Tell the caller their time was taken by another caller and ask for another one.
+    """
+    if user.language == "en":
+        response.say("Sorry, that time was just taken. Let's choose another time.", voice="Polly.Joanna")
+        write_to_log(log, BOT, "Sorry, that time was just taken. Let's choose another time.")
+    else:
+        response.say(translate_to_language("en", "es", "Sorry, that time was just taken. Let's choose another time."),
+                     language='es-MX', voice="Polly.Mia")
+        write_to_log(log, BOT, translate_to_language("en", "es", "Sorry, that time was just taken. Let's choose another time."))
+    response.redirect(f"/request_preferred_time_over_three/?date={date}")
+    return HttpResponse(str(response), content_type="text/xml")
+
+
 @csrf_exempt
 def get_time_response(request):
     """
     Get's the users time response to the available times listed
     """
     caller_number = get_phone_number(request)
-    user = User.objects.get(phone_number=caller_number)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    user = get_caller(request, caller_number)
+    log = get_call_log(request, caller_number)
     appointment_date_str = request.GET.get('date', '')
     time_list_encoded = request.GET.get('time_list', '')
     time_list = urllib.parse.unquote(time_list_encoded)
@@ -495,17 +530,22 @@ def get_time_response(request):
     response = VoiceResponse()
 
     if speech_result:
-        # Query GPT for time to be able to cover statement variations
-        client = OpenAI()
-        system_prompt = f"Please give the most likely intended time from the following message. Consider the options given were {time_list}"
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": speech_result}
-            ]
-        )
-        response_pred = completion.choices[0].message.content
+        requested_time = parse_time(speech_result)
+        if requested_time and requested_time.strftime('%I:%M %p') in time_list:
+            # One of the listed times, no need to ask GPT
+            response_pred = requested_time.strftime('%I:%M %p')
+        else:
+            # Query GPT for time to be able to cover statement variations
+            client = get_openai_client()
+            system_prompt = f"Please give the most likely intended time from the following message. Consider the options given were {time_list}"
+            completion = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": speech_result}
+                ]
+            )
+            response_pred = completion.choices[0].message.content
         time_encoded = urllib.parse.quote(response_pred)
 
         if user.language == "en":
@@ -519,10 +559,10 @@ def get_time_response(request):
         else:
             gather = Gather(input="speech", speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT,
                             action=f"/given_time_response/{time_encoded}/{appointment_date_str}/")
-            gather.say(translate_to_language("en", "es", 
-                            f"Your requested time was {response_pred}. Is that correct?"), language='es-MX', voice="Polly.Mia")
-            write_to_log(log, BOT, translate_to_language("en", "es", 
-                            f"Your requested time was {response_pred}. Is that correct?"))
+            time_prompt = translate_template("en", "es", "Your requested time was {time}. Is that correct?",
+                                             time=response_pred)
+            gather.say(time_prompt, language='es-MX', voice="Polly.Mia")
+            write_to_log(log, BOT, time_prompt)
             response.append(gather)
             response.redirect(f"/request_preferred_time_under_four/?date={appointment_date_str}")
     else:
@@ -539,7 +579,7 @@ def given_time_response(request, time_encoded, date):
     conversation based on the users response.
     """
     caller_number = get_phone_number(request)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    log = get_call_log(request, caller_number)
     response = VoiceResponse()
     speech_result = request.POST.get('SpeechResult', '')
     write_to_log(log, CALLER, speech_result)
@@ -565,7 +605,7 @@ def suggested_time_response(request, time_encoded, date):
     conversation based on the users response.
     """
     caller_number = get_phone_number(request)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    log = get_call_log(request, caller_number)
     response = VoiceResponse()
 
     speech_result = request.POST.get('SpeechResult', '')
@@ -584,33 +624,37 @@ def suggested_time_response(request, time_encoded, date):
 @csrf_exempt
 def generate_date(request):
     """
-    Uses OpenAI to retrieve a date from user's response. Formats date into a displayable text response.
+    Parses a date from user's response, falling back to OpenAI. Formats date into a displayable text response.
     """
     caller_number = get_phone_number(request)
-    user = User.objects.get(phone_number=caller_number)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    user = get_caller(request, caller_number)
+    log = get_call_log(request, caller_number)
     speech_result = request.POST.get('SpeechResult', '')
     write_to_log(log, CALLER, speech_result)
     response = VoiceResponse()
 
     if speech_result:
-        # Query GPT for time to be able to cover statement variations
-        client = OpenAI()
-        today_str = datetime.now().strftime("%Y-%m-%d")
-        system_prompt = (
-            f"Today is {today_str}. Please extract the most likely intended appointment date from this message. "
-            "Choose the closest soonest date in the future relative to today. "
-            "Respond with a date in the format YYYY-MM-DD. If no date is present or it is in an undistinguishable format, return NONE. "
-            "Even if the user is vague or unclear, always make your best guess based on context."
-        )
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": speech_result}
-            ]
-        )
-        response_pred = completion.choices[0].message.content
+        requested_date = parse_date(speech_result)
+        if requested_date:
+            response_pred = requested_date.strftime("%Y-%m-%d")
+        else:
+            # Query GPT for time to be able to cover statement variations
+            client = get_openai_client()
+            today_str = datetime.now().strftime("%Y-%m-%d")
+            system_prompt = (
+                f"Today is {today_str}. Please extract the most likely intended appointment date from this message. "
+                "Choose the closest soonest date in the future relative to today. "
+                "Respond with a date in the format YYYY-MM-DD. If no date is present or it is in an undistinguishable format, return NONE. "
+                "Even if the user is vague or unclear, always make your best guess based on context."
+            )
+            completion = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": speech_result}
+                ]
+            )
+            response_pred = completion.choices[0].message.content
         if response_pred == "NONE":
             if user.language == "en":
                 response.say("Sorry, I didn't catch a valid date. Let's try again.", voice="Polly.Joanna")
@@ -620,7 +664,8 @@ def generate_date(request):
                 write_to_log(log, BOT, translate_to_language("en", "es", "Sorry, I didn't catch a valid date. Let's try again."))
 
             response.redirect("/request_date_availability/")
-        
+            return HttpResponse(str(response), content_type="text/xml")
+
         date_obj = datetime.strptime(response_pred, "%Y-%m-%d")
         formatted_date = date_obj.strftime("%B %d, %Y")
         date_encoded = urllib.parse.quote(date_obj.strftime("%Y-%m-%d"))
@@ -632,8 +677,10 @@ def generate_date(request):
             response.append(gather)
         else:
             gather = Gather(input="speech", timeout=TIMEOUT_LENGTH, action=f"/check_for_appointment/{date_encoded}/")
-            gather.say(translate_to_language("en", "es", f"Your requested date was {formatted_date}. Is that correct?"), language='es-MX')
-            write_to_log(log, BOT, translate_to_language("en", "es", f"Your requested date was {formatted_date}. Is that correct?"))
+            date_prompt = translate_template_with_values("en", "es", "Your requested date was {date}. Is that correct?",
+                                                         {"date": formatted_date})
+            gather.say(date_prompt, language='es-MX')
+            write_to_log(log, BOT, date_prompt)
             response.append(gather)
         response.redirect("/request_date_availability/")
     else:
@@ -648,16 +695,19 @@ def check_for_appointment(request, date_encoded):
     the caller requested.
     """
     caller_number = get_phone_number(request)
-    user = User.objects.get(phone_number=caller_number)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    user = get_caller(request, caller_number)
+    log = get_call_log(request, caller_number)
     response = VoiceResponse()
     speech_result = request.POST.get('SpeechResult', '')
-    declaration = get_response_sentiment(speech_result)
     date_unencoded = urllib.parse.unquote(date_encoded)
     date = datetime.strptime(date_unencoded, "%Y-%m-%d")
 
+    # Look the day up while the answer is classified, the lookup is cheap if unused
+    (is_available, appointment_date, number_available_appointments), declaration = run_concurrently(
+        lambda: check_available_date(date),
+        lambda: get_response_sentiment(speech_result))
+
     if declaration:
-        is_available, appointment_date, number_available_appointments = check_available_date(date)
         if is_available:
             appointment_date_encoded = urllib.parse.quote(str(appointment_date.date()))
             if user.language == "en":
@@ -669,24 +719,51 @@ def check_for_appointment(request, date_encoded):
             else:
                 action_url = f"/confirm_available_date/?date={appointment_date_encoded}&num={number_available_appointments}"
                 gather = Gather(input="speech", timeout=TIMEOUT_LENGTH, action=action_url, method="POST")
-                gather.say(translate_to_language("en", "es", 
-                        f"There is availability during {appointment_date.strftime('%B %d, %Y')}. Does that work for you?"), language='es-MX', voice="Polly.Mia")
-                write_to_log(log, BOT, 
-                        translate_to_language("en", "es", 
-                        f"There is availability during {appointment_date.strftime('%B %d, %Y')}. Does that work for you?"))
+                available = translate_template_with_values("en", "es",
+                        "There is availability during {date}. Does that work for you?",
+                        {"date": appointment_date.strftime('%B %d, %Y')})
+                gather.say(available, language='es-MX', voice="Polly.Mia")
+                write_to_log(log, BOT, available)
                 response.append(gather)
+            if user.language != "en" and number_available_appointments <= 3:
+                # Translate the times prompt while the caller answers, it is
+                # read two hops later by request_preferred_time_under_four.
+                # The English prompt only needs the day's cached bitmap.
+                day = appointment_date.date()
+                prefetch.speculate(request, times_prompt_name(user.language, day),
+                                   lambda: available_times_prompt(user.language, day), hops=2)
             response.redirect("/request_date_availability/")
         else:
-            if user.language == "en":
-                response.say(f"Sorry, no available days on {appointment_date.strftime('%B %d, %Y')}. Would you like to choose another date?", voice="Polly.Joanna")
-                write_to_log(log, BOT, f"Sorry, no available days on {appointment_date.strftime('%B %d, %Y')}. Would you like to choose another date?")
+            requested_date = date.strftime('%B %d, %Y')
+            # Offer the soonest open days in this hop instead of asking for a new date
+            open_days = availability.next_open_days(max(date.date() + timedelta(days=1), now().date()),
+                                                    OPEN_DAYS_OFFERED, OPEN_DAYS_HORIZON)
+            if open_days:
+                day_names = [day.strftime('%A, %B %d') for day, _ in open_days]
+                days_text = ', '.join(day_names[:-1]) + f", or {day_names[-1]}" if len(day_names) > 1 else day_names[0]
+                if user.language == "en":
+                    gather = Gather(input="speech", timeout=TIMEOUT_LENGTH, action="/generate_date/")
+                    gather.say(f"Sorry, no available days on {requested_date}. The next available days are {days_text}. Which day would you like?", voice="Polly.Joanna")
+                    write_to_log(log, BOT, f"Sorry, no available days on {requested_date}. The next available days are {days_text}. Which day would you like?")
+                else:
+                    gather = Gather(input="speech", timeout=TIMEOUT_LENGTH, action="/generate_date/", language='es-MX')
+                    unavailable = translate_template_with_values("en", "es",
+                                "Sorry, no available days on {date}. The next available days are {days}. Which day would you like?",
+                                {"date": requested_date, "days": days_text})
+                    gather.say(unavailable, language='es-MX', voice="Polly.Mia")
+                    write_to_log(log, BOT, unavailable)
+                response.append(gather)
+            elif user.language == "en":
+                response.say(f"Sorry, no available days on {requested_date}. Would you like to choose another date?", voice="Polly.Joanna")
+                write_to_log(log, BOT, f"Sorry, no available days on {requested_date}. Would you like to choose another date?")
                 gather = Gather(input="speech", timeout=TIMEOUT_LENGTH, action="/confirm_request_date_availability/")
                 response.append(gather)
             else:
-                response.say(translate_to_language("en", "es", 
-                            f"Sorry, no available days on {appointment_date.strftime('%B %d, %Y')}. Would you like to choose another date?"), language='es-MX', voice="Polly.Mia")
-                write_to_log(log, BOT, translate_to_language("en", "es", 
-                            f"Sorry, no available days on {appointment_date.strftime('%B %d, %Y')}. Would you like to choose another date?"))
+                unavailable = translate_template_with_values("en", "es",
+                            "Sorry, no available days on {date}. Would you like to choose another date?",
+                            {"date": requested_date})
+                response.say(unavailable, language='es-MX', voice="Polly.Mia")
+                write_to_log(log, BOT, unavailable)
                 gather = Gather(input="speech", timeout=TIMEOUT_LENGTH, action="/confirm_request_date_availability/")
                 response.append(gather)
             response.redirect("/request_date_availability/")
@@ -696,6 +773,33 @@ def check_for_appointment(request, date_encoded):
     return HttpResponse(str(response), content_type="text/xml")
 
 
+def times_prompt_name(language, appointment_date):
+    """
+    Prefetch name of the times prompt for a day, it changes with the day's
+    free slots so a prompt prepared before a booking is never used.
+    """
+    return f"times_prompt:{language}:{appointment_date.isoformat()}:{availability.get_bitmap(appointment_date)}"
+
+
+def available_times_prompt(language, appointment_date):
+    """
+    The free times of a day, the list read to the caller and the prompt
+    asking them to pick one.
+    """
+    available_times = get_available_times_for_date(appointment_date)
+    if not available_times:
+        return available_times, None, None
+    formatted_times = [t.strftime('%I:%M %p') for t in available_times]
+    time_list_text = ', '.join(formatted_times[:-1]) + f", and {formatted_times[-1]}" if len(formatted_times) > 1 else formatted_times[0]
+    if language == "en":
+        times_prompt = f"Here are the available times for {appointment_date.strftime('%B %d')}: {time_list_text}. Which time would you like?"
+    else:
+        times_prompt = translate_template_with_values("en", "es",
+                "Here are the available times for {date}: {times}. Which time would you like?",
+                {"date": appointment_date.strftime('%B %d'), "times": time_list_text})
+    return available_times, time_list_text, times_prompt
+
+
 @csrf_exempt
 def request_preferred_time_under_four(request):
     """
@@ -703,8 +807,8 @@ def request_preferred_time_under_four(request):
     <= 3 available times.
     """
     caller_number = get_phone_number(request)
-    user = User.objects.get(phone_number=caller_number)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    user = get_caller(request, caller_number)
+    log = get_call_log(request, caller_number)
     response = VoiceResponse()
 
     # Extract appointment_date from the request
@@ -724,25 +828,24 @@ def request_preferred_time_under_four(request):
             response.redirect("/request_date_availability/")
             return HttpResponse(str(response), content_type="text/xml")
 
-    available_times = get_available_times_for_date(appointment_date)
+    # Usually prepared while the caller confirmed the date
+    available_times, time_list_text, times_prompt = prefetch.claim(
+        request, times_prompt_name(user.language, appointment_date),
+        lambda: available_times_prompt(user.language, appointment_date))
 
     if available_times:
-        formatted_times = [t.strftime('%I:%M %p') for t in available_times]
-        time_list_text = ', '.join(formatted_times[:-1]) + f", and {formatted_times[-1]}" if len(formatted_times) > 1 else formatted_times[0]
         time_list_encoded = urllib.parse.quote(time_list_text)
 
         if user.language == "en":
             gather = Gather(input="speech", speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT, action=f"/get_time_response/?date={appointment_date_str}&time_list={time_list_encoded}", method="POST")
-            gather.say(f"Here are the available times for {appointment_date.strftime('%B %d')}: {time_list_text}. Which time would you like?", voice="Polly.Joanna")
-            write_to_log(log, BOT, f"Here are the available times for {appointment_date.strftime('%B %d')}: {time_list_text}. Which time would you like?")
+            gather.say(times_prompt, voice="Polly.Joanna")
+            write_to_log(log, BOT, times_prompt)
             response.append(gather)
             response.redirect(f"/request_preferred_time_under_four/?date={appointment_date_str}")
         else:
             gather = Gather(input="speech", speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT, action=f"/get_time_response/?date={appointment_date_str}&time_list={time_list_encoded}", method="POST")
-            gather.say(translate_to_language("en", "es", 
-                    f"Here are the available times for {appointment_date.strftime('%B %d')}: {time_list_text}. Which time would you like?"), language='es-MX', voice="Polly.Mia")
-            write_to_log(log, BOT, translate_to_language("en", "es", 
-                    f"Here are the available times for {appointment_date.strftime('%B %d')}: {time_list_text}. Which time would you like?"))
+            gather.say(times_prompt, language='es-MX', voice="Polly.Mia")
+            write_to_log(log, BOT, times_prompt)
             response.append(gather)
             response.redirect(f"/request_preferred_time_under_four/?date={appointment_date_str}")
     else:
@@ -766,8 +869,8 @@ def request_preferred_time_over_three(request):
     > 3 available times.
     """
     caller_number = get_phone_number(request)
-    user = User.objects.get(phone_number=caller_number)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    user = get_caller(request, caller_number)
+    log = get_call_log(request, caller_number)
     # Extract appointment_date from the request
     appointment_date_str = request.GET.get('date', '')
     response = VoiceResponse()
@@ -791,11 +894,11 @@ def request_preferred_time_over_three(request):
 @csrf_exempt
 def generate_requested_time(request):
     """
-    Uses GPT to generate a most-likely time that the caller asked for.
+    Parses the time the caller asked for, falling back to GPT for a most-likely time.
     """
     caller_number = get_phone_number(request)
-    user = User.objects.get(phone_number=caller_number)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    user = get_caller(request, caller_number)
+    log = get_call_log(request, caller_number)
     speech_result = request.POST.get('SpeechResult', '')
     write_to_log(log, CALLER, speech_result)
     response = VoiceResponse()
@@ -803,17 +906,21 @@ def generate_requested_time(request):
     appointment_date_str = request.GET.get('date', '')
 
     if speech_result:
-        # Query GPT for time to be able to cover statement variations
-        client = OpenAI()
-        system_prompt = "Please give the most likely intended time from the following message. Consider that business hours are during 9:00 AM and 5:00 PM. Make sure it is in a format like 4:59 PM."
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": speech_result}
-            ]
-        )
-        response_pred = completion.choices[0].message.content
+        requested_time = parse_time(speech_result)
+        if requested_time:
+            response_pred = format_time(requested_time)
+        else:
+            # Query GPT for time to be able to cover statement variations
+            client = get_openai_client()
+            system_prompt = "Please give the most likely intended time from the following message. Consider that business hours are during 9:00 AM and 5:00 PM. Make sure it is in a format like 4:59 PM."
+            completion = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": speech_result}
+                ]
+            )
+            response_pred = completion.choices[0].message.content
         time_encoded = urllib.parse.quote(response_pred)
 
         if user.language == "en":
@@ -824,8 +931,10 @@ def generate_requested_time(request):
             response.redirect(f"/request_preferred_time_over_three/?date={appointment_date_str}")
         else:
             gather = Gather(input="speech", speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT, action=f"/find_requested_time/{time_encoded}/?date={appointment_date_str}")
-            gather.say(translate_to_language("en", "es", f"Your requested time was {response_pred}. Is that correct?"), language='es-MX', voice="Polly.Mia")
-            write_to_log(log, BOT, translate_to_language("en", "es", f"Your requested time was {response_pred}. Is that correct?"))
+            time_prompt = translate_template("en", "es", "Your requested time was {time}. Is that correct?",
+                                             time=response_pred)
+            gather.say(time_prompt, language='es-MX', voice="Polly.Mia")
+            write_to_log(log, BOT, time_prompt)
             response.append(gather)
             response.redirect(f"/request_preferred_time_over_three/?date={appointment_date_str}")
     else:
@@ -841,8 +950,8 @@ def find_requested_time(request, time_encoded):
     or are closest to that time request.
     """
     caller_number = get_phone_number(request)
-    user = User.objects.get(phone_number=caller_number)
-    log = Log.objects.filter(phone_number=caller_number).last()
+    user = get_caller(request, caller_number)
+    log = get_call_log(request, caller_number)
     speech_result = request.POST.get('SpeechResult', '')
     write_to_log(log, CALLER, speech_result)
     confirmation = get_response_sentiment(speech_result)
@@ -892,10 +1001,11 @@ def find_requested_time(request, time_encoded):
                 response.redirect("/request_date_availability/")
                 return HttpResponse(str(response), content_type="text/xml")
             else:
-                response.say(translate_to_language("en", "es", 
-                        f"Sorry, there are no available appointments on {appointment_date.strftime('%B %d, %Y')}."), language='es-MX', voice="Polly.Mia")
-                write_to_log(log, BOT, translate_to_language("en", "es", 
-                        f"Sorry, there are no available appointments on {appointment_date.strftime('%B %d, %Y')}."))
+                no_appointments = translate_template_with_values("en", "es",
+                        "Sorry, there are no available appointments on {date}.",
+                        {"date": appointment_date.strftime('%B %d, %Y')})
+                response.say(no_appointments, language='es-MX', voice="Polly.Mia")
+                write_to_log(log, BOT, no_appointments)
                 response.redirect("/request_date_availability/")
                 return HttpResponse(str(response), content_type="text/xml")
 
@@ -903,7 +1013,7 @@ def find_requested_time(request, time_encoded):
             time_encoded_url = urllib.parse.quote(time_encoded)
             response.redirect(f"/confirm_time_selection/{time_encoded_url}/{appointment_date_str}/")
         else:
-            nearest_time = min(available_times, key=lambda t: abs(datetime.combine(appointment_date, t) - datetime.combine(appointment_date, requested_time)))
+            nearest_time = availability.nearest_slot(appointment_date, requested_time)
 
             if user.language == "en":
                 response.say(f"Our nearest appointment slot is {nearest_time.strftime('%I:%M %p')}. Does that work for you?", voice="Polly.Joanna")
@@ -913,10 +1023,11 @@ def find_requested_time(request, time_encoded):
                 write_to_log(log, BOT, "Please say yes to confirm or no to select another time.")
                 response.append(gather)
             else:
-                response.say(translate_to_language("en", "es", 
-                        f"Our nearest appointment slot is {nearest_time.strftime('%I:%M %p')}. Does that work for you?"), language='es-MX', voice="Polly.Mia")
-                write_to_log(log, BOT, translate_to_language("en", "es", 
-                        f"Our nearest appointment slot is {nearest_time.strftime('%I:%M %p')}. Does that work for you?"))
+                nearest_slot = translate_template("en", "es",
+                        "Our nearest appointment slot is {time}. Does that work for you?",
+                        time=nearest_time.strftime('%I:%M %p'))
+                response.say(nearest_slot, language='es-MX', voice="Polly.Mia")
+                write_to_log(log, BOT, nearest_slot)
                 
                 gather = Gather(input="speech", speechTimeout=SPEECHTIMEOUT, timeout=TIMEOUT, action=f"/suggested_time_response/{urllib.parse.quote(nearest_time.strftime('%I:%M %p'))}/{appointment_date_str}/", method="POST")
                 gather.say(translate_to_language("en", "es", "Please say yes to confirm or no to select another time."), language='es-MX', voice="Polly.Mia")
@@ -1027,7 +1138,7 @@ def reschedule_appointment(request, date_encoded):
         return HttpResponse(str(response), content_type="text/xml")
 
     try:
-        user = User.objects.get(phone_number=phone_number)
+        user = get_caller(request, phone_number)
     except User.DoesNotExist:
         response.redirect("/reroute_caller_with_no_account/")
         return HttpResponse(str(response), content_type="text/xml")
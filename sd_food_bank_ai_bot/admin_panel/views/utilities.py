@@ -1,20 +1,25 @@
 from twilio.twiml.voice_response import VoiceResponse, Dial
-from ..models import User, AppointmentTable, FAQ
+from ..models import AppointmentTable, FAQ
+from ..faq_index import faq_index
+from ..datetime_parser import parse_weekday
+from ..call_session import CallSession
+from .. import prompt_catalog, sentiment, availability
+from ..fan_out import run_concurrently
+from ..translation_cache import (translation_cache, protect_placeholders,
+                                 restore_placeholders, placeholders)
 from django.http import HttpResponse
-from twilio.rest import Client
 from django.conf import settings
-from openai import OpenAI
+from ..clients import (get_openai_client, get_async_openai_client, get_twilio_client,
+                       get_translate_client)
+from asgiref.sync import sync_to_async
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.timezone import now
-from datetime import time, datetime, timedelta
-from google.cloud import translate_v2 as translate
+from functools import partial
+import html
 import re
 
-# Earliest time to schedule an appointment, 9:00 AM
-EARLIEST_TIME = time(9, 0)
-LATEST_TIME = time(17, 0)    # Latest time appointments can end, 5:00 PM
-# TODO: Assuming each appointment is 15 minutes
-FIXED_APPT_DURATION = timedelta(minutes=15)
+SENTIMENT_PROMPT = "Based on the following message, respond if it is AFFIRMATIVE or NEGATIVE."
+CHOICE_PROMPT = "Based on the users response, say whether they are most likely asking for the main menu, to ask another question, or to end the call. Respond only with MENU, QUESTION, or END for the corresponding classification."
 
 
 def strike_system_handler(log, reset=False):
@@ -34,6 +39,22 @@ def strike_system_handler(log, reset=False):
     return False
 
 
+async def astrike_system_handler(log, reset=False):
+    """
+    Async version of strike_system_handler
+    """
+    if log:
+        if reset:
+            await log.areset_strikes()
+        else:
+            if await log.aadd_strike():
+                log.forwarded = True
+                log.forwarded_reason = 'auto'
+                await log.asave()
+                return True
+    return False
+
+
 def get_phone_number(request):
     """
     Gets the user phone number from the post header
@@ -49,17 +70,72 @@ def get_phone_number(request):
     return None
 
 
+def get_call_session(request, phone_number):
+    """
+    Returns the session for the call this webhook belongs to. Requests that
+    did not come through CallSessionMiddleware (no CallSid) get a session that
+    only lives for the request, so repeated lookups in a view are still shared.
+    """
+    session = getattr(request, "call_session", None)
+    if session is None:
+        session = CallSession(None, phone_number)
+        request.call_session = session
+    elif session.phone_number != phone_number:
+        return CallSession(None, phone_number)
+    return session
+
+
+def get_caller(request, phone_number):
+    """
+    Returns the User for the caller, cached for the rest of the call
+    """
+    return get_call_session(request, phone_number).get_user()
+
+
+def get_slot_holder(request, phone_number):
+    """
+    Returns who holds appointment slots for this call, the CallSid when
+    Twilio sent one and the phone number otherwise
+    """
+    return request.POST.get("CallSid") or phone_number
+
+
+def get_call_log(request, phone_number):
+    """
+    Returns the Log for the current call, cached for the rest of the call
+    """
+    return get_call_session(request, phone_number).get_log()
+
+
+async def aget_caller(request, phone_number):
+    """
+    Async version of get_caller
+    """
+    return await get_call_session(request, phone_number).aget_user()
+
+
+async def aget_call_log(request, phone_number):
+    """
+    Async version of get_call_log
+    """
+    return await get_call_session(request, phone_number).aget_log()
+
+
 def get_response_sentiment(sentence):
     """
     Returns True if the given sentence is affirmative
     """
+    # Plain yes/no answers are classified locally
+    is_affirmative, confidence = sentiment.classify(sentence)
+    if is_affirmative is not None and confidence >= settings.SENTIMENT_LOCAL_THRESHOLD:
+        return is_affirmative
+
     # Query GPT for intent
-    client = OpenAI()
-    system_prompt = "Based on the following message, respond if it is AFFIRMATIVE or NEGATIVE."
+    client = get_openai_client()
     completion = client.chat.completions.create(
         model="gpt-4o-mini",
         messages=[
-            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": SENTIMENT_PROMPT},
             {"role": "user", "content": sentence}
         ]
     )
@@ -70,6 +146,25 @@ def get_response_sentiment(sentence):
     return False
 
 
+async def aget_response_sentiment(sentence):
+    """
+    Async version of get_response_sentiment
+    """
+    is_affirmative, confidence = sentiment.classify(sentence)
+    if is_affirmative is not None and confidence >= settings.SENTIMENT_LOCAL_THRESHOLD:
+        return is_affirmative
+
+    client = get_async_openai_client()
+    completion = await client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": SENTIMENT_PROMPT},
+            {"role": "user", "content": sentence}
+        ]
+    )
+    return completion.choices[0].message.content.upper() == "AFFIRMATIVE"
+
+
 @csrf_exempt
 def return_main_menu(request):
     """
@@ -92,7 +187,7 @@ def appointment_count(request):
     Returns the appointment count of user
     """
     caller_number = get_phone_number(request)
-    user = User.objects.get(phone_number=caller_number)
+    user = get_caller(request, caller_number)
     appointment_count = AppointmentTable.objects.filter(user=user).count()
 
     return appointment_count
@@ -117,7 +212,8 @@ def forward_operator(caller_response, log=None):
 def write_to_log(log, speaker, message):
     """
     Log conversation as conversation progresses attributing each dialogue
-    to a specific party
+    to a specific party. During a webhook the messages are buffered and
+    written once when the response is sent.
     """
     if log:
         log.add_transcript(speaker=speaker, message=message)
@@ -127,7 +223,7 @@ def send_sms(phone_number_to, message_to_send):
     """
     Send confirmation details via sms to caller
     """
-    client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    client = get_twilio_client()
     try:
         message = client.messages.create(
             body=message_to_send,
@@ -162,21 +258,30 @@ def format_date_for_response(date_obj):
     return date_final
 
 
+def faq_match_prompt(questions):
+    """
+    System prompt asking GPT to pick the FAQ question closest to the caller's.
+    """
+    questions = [*questions, "Can I speak to an operator?"]
+    return f"You are a food pantry assistant with one job. When a user sends you a question, you find the closest match from questions you have memorized and respond with that question. If the question the user asks does not match any of your stored questions, respond with NONE. Only respond with the matching question or NONE.\nYour memorized questions are:{questions}"
+
+
 def get_matching_question(question):
     """
     Takes in a users question and finds the most closely related question,
     returning that question.
     If there are no related questions, none is returned.
+    The local FAQ index is tried first and GPT is only asked when the index
+    is not confident in its match.
     """
-    client = OpenAI()
+    match, confidence = faq_index.best_match(question)
+    if match and confidence >= settings.FAQ_MATCH_THRESHOLD:
+        return match
 
-    # Gather all questions to be used in prompt
-    questions = FAQ.objects.values_list('question', flat=True)
-    questions = [question for question in questions]
-    questions.append("Can I speak to an operator?")
+    client = get_openai_client()
 
     # Set the system prompt to provide instructions on what to do
-    system_prompt = f"You are a food pantry assistant with one job. When a user sends you a question, you find the closest match from questions you have memorized and respond with that question. If the question the user asks does not match any of your stored questions, respond with NONE. Only respond with the matching question or NONE.\nYour memorized questions are:{questions}"
+    system_prompt = faq_match_prompt(FAQ.objects.values_list('question', flat=True))
 
     # Make an API call to find the question
     completion = client.chat.completions.create(
@@ -195,6 +300,31 @@ def get_matching_question(question):
     return question_pred
 
 
+async def aget_matching_question(question):
+    """
+    Async version of get_matching_question
+    """
+    await faq_index.aensure_current()
+    # Scoring is in memory and well under a millisecond
+    match, confidence = faq_index.best_match(question, check=False)
+    if match and confidence >= settings.FAQ_MATCH_THRESHOLD:
+        return match
+
+    questions = [question async for question in FAQ.objects.values_list('question', flat=True)]
+    client = get_async_openai_client()
+    completion = await client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": faq_match_prompt(questions)},
+            {"role": "user", "content": question}
+        ]
+    )
+    question_pred = completion.choices[0].message.content
+    if question_pred == "NONE":
+        return None
+    return question_pred
+
+
 def get_corresponding_answer(question):
     """
     Takes in a predefined question and returns the matching answer.
@@ -204,31 +334,58 @@ def get_corresponding_answer(question):
     return answer
 
 
+async def aget_corresponding_answer(question):
+    """
+    Async version of get_corresponding_answer
+    """
+    faq = await FAQ.objects.filter(question__iexact=question).afirst()
+    return faq.answer
+
+
+def choice_from_prediction(pred):
+    """
+    Map GPT's MENU, QUESTION or END answer to True, False or None.
+    """
+    if pred.upper() == "QUESTION":
+        return True
+    elif pred.upper() == "END":
+        return False
+    else:
+        return None
+
+
 def get_prompted_choice(sentence):
     """
     Takes in a users input and returns the corresponding request.
     Resturns True for ask another question, False for hang up, and None for main menu.
     """
-    client = OpenAI()
-    # Set the system prompt to provide instructions on what to do
-    system_prompt = "Based on the users response, say whether they are most likely asking for the main menu, to ask another question, or to end the call. Respond only with MENU, QUESTION, or END for the corresponding classification."
+    client = get_openai_client()
 
     # Make an API call to find the question
     completion = client.chat.completions.create(
         model="gpt-4o-mini",
         messages=[
-            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": CHOICE_PROMPT},
             {"role": "user", "content": sentence}
         ]
     )
 
-    pred = completion.choices[0].message.content
-    if pred.upper() == "QUESTION":
-        return True
-    elif pred.upper() == "END":
-        return False
-    else:
-        return None
+    return choice_from_prediction(completion.choices[0].message.content)
+
+
+async def aget_prompted_choice(sentence):
+    """
+    Async version of get_prompted_choice
+    """
+    client = get_async_openai_client()
+    completion = await client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": CHOICE_PROMPT},
+            {"role": "user", "content": sentence}
+        ]
+    )
+    return choice_from_prediction(completion.choices[0].message.content)
 
 
 def get_day(speech_result):
@@ -236,7 +393,11 @@ def get_day(speech_result):
     Extracts the day of the week from a given message.
     Only returns the day or NONE.
     """
-    client = OpenAI()
+    day = parse_weekday(speech_result)
+    if day:
+        return day
+
+    client = get_openai_client()
     system_prompt = "Please extract the day of the week from the following message. Only respond with the day of the week or NONE if one is not said."
     completion = client.chat.completions.create(
         model="gpt-4o-mini",
@@ -254,36 +415,7 @@ def check_available_date(date):
     """
     Return if the given date has available timeslots or not.
     """
-    number_available_appointments = 0
-
-    # Retrieve existing appointments for this date
-    existing_appointments = AppointmentTable.objects.filter(
-        date__date=date).order_by('start_time')
-
-    # For no appointments that day yet
-    if not existing_appointments:
-        # TODO: mod by n = fixed appt. length
-        number_available_appointments = 4
-        return True, date, number_available_appointments
-
-    current_time = EARLIEST_TIME
-
-    # Check for time slots before appointments until the latest appointment
-    for appointment in existing_appointments:
-        while current_time < appointment.start_time:
-            number_available_appointments += 1
-            # Increment by fixed appt time
-            current_time = (datetime.combine(datetime.today(),
-                                                current_time) +
-                            FIXED_APPT_DURATION).time()
-        current_time = appointment.end_time
-
-    # Checks for time slots after last appointment
-    # is iterated in the for loop above
-    while current_time < LATEST_TIME:
-        number_available_appointments += 1
-        current_time = (datetime.combine(datetime.today(), current_time) +
-                        FIXED_APPT_DURATION).time()
+    number_available_appointments = availability.count_available(date)
 
     # If there are available timeslots return True and additional var.
     if number_available_appointments > 0:
@@ -297,35 +429,89 @@ def get_available_times_for_date(appointment_date):
     """
     Retrieve available appointment times for a given date.
     """
-    existing_appointments = AppointmentTable.objects.filter(
-        date__date=appointment_date).order_by('start_time')
-    available_times = []
+    return availability.available_times(appointment_date)
+
+
+def translate_to_language(source_lang, target_lang, text):
+    """
+    Translate the given text from the given language to the other given language.
+    Fixed prompts are served from the prompt catalog without a network call and
+    live translations are cached.
+    """
+    translation = prompt_catalog.lookup(source_lang, target_lang, text)
+    if translation is not None:
+        return translation
+
+    key = (source_lang, target_lang, text)
+    translation = translation_cache.get(key)
+    if translation is not None:
+        return translation
 
-    current_time = EARLIEST_TIME
+    translate_client = get_translate_client()
 
-    # Adds timeslots between appointments
-    for appointment in existing_appointments:
-        if current_time < appointment.start_time:
-            available_times.append(current_time)
-            # Increment by fixed appt time
-            current_time = (datetime.combine(datetime.today(), current_time) +
-                            FIXED_APPT_DURATION).time()
-        current_time = appointment.end_time
+    result = translate_client.translate(text, target_language=target_lang, source_language=source_lang)
+    translation_cache.set(key, result["translatedText"])
+    return result["translatedText"]
 
-    # Adds timeslots after the latest iterated appointment
-    while current_time < LATEST_TIME:
-        available_times.append(current_time)
-        current_time = (datetime.combine(datetime.today(), current_time) +
-                        FIXED_APPT_DURATION).time()
 
-    return available_times
+def translate_template_text(source_lang, target_lang, template):
+    """
+    Translate a template containing {placeholders} and return it unfilled,
+    or None if the translator mangled the placeholders.
+    """
+    translation = prompt_catalog.lookup(source_lang, target_lang, template)
+    if translation is None:
+        key = (source_lang, target_lang, "template", template)
+        translation = translation_cache.get(key)
+        if translation is None:
+            translate_client = get_translate_client()
+            result = translate_client.translate(protect_placeholders(template), target_language=target_lang,
+                                                source_language=source_lang, format_="html")
+            translation = html.unescape(restore_placeholders(result["translatedText"]))
+            if placeholders(translation) != placeholders(template):
+                return None
+            translation_cache.set(key, translation)
+    return translation
 
 
-def translate_to_language(source_lang, target_lang, text):
+def translate_template(source_lang, target_lang, template, **values):
     """
-    Translate the given text from the given language to the other given language.
+    Translate a template containing {placeholders} once and fill in the values
+    afterwards, so the translation is reused whatever the values are.
+    Values are inserted as given, translate them first if they need it.
     """
-    translate_client = translate.Client()
+    translation = translate_template_text(source_lang, target_lang, template)
+    if translation is None:
+        # Placeholders were mangled, translate the filled in text instead
+        return translate_to_language(source_lang, target_lang, template.format(**values))
+    return translation.format(**values)
 
-    result = translate_client.translate(text, target_language=target_lang, source_language=source_lang)
-    return result["translatedText"]
\ No newline at end of file
+
+def translate_template_with_values(source_lang, target_lang, template, translated_values, **values):
+    """
+    Like translate_template, but the values in translated_values are
+    translated as well. The template and those values are translated at the
+    same time.
+    """
+    names = list(translated_values)
+    translation, *translations = run_concurrently(
+        lambda: translate_template_text(source_lang, target_lang, template),
+        *(partial(translate_to_language, source_lang, target_lang, translated_values[name])
+          for name in names))
+    if translation is None:
+        return translate_to_language(source_lang, target_lang,
+                                     template.format(**translated_values, **values))
+    return translation.format(**dict(zip(names, translations)), **values)
+
+
+async def atranslate_to_language(source_lang, target_lang, text):
+    """
+    Async version of translate_to_language. Catalog and cache hits return
+    right away, only a live Google request is run in a worker thread.
+    """
+    translation = prompt_catalog.lookup(source_lang, target_lang, text)
+    if translation is None:
+        translation = translation_cache.get((source_lang, target_lang, text))
+    if translation is not None:
+        return translation
+    return await sync_to_async(translate_to_language, thread_sensitive=False)(source_lang, target_lang, text)
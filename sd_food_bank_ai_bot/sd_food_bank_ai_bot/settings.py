@@ -43,6 +43,91 @@ ALLOWED_HOSTS = []
 SPEECHTIMEOUT=0.5
 TIMEOUT="auto"
 
+# Minimum cosine similarity for the local FAQ index to answer a caller's question
+# without falling back to GPT
+FAQ_MATCH_THRESHOLD = 0.5
+# Seconds between checks of the FAQ table for changes made by other processes,
+# changes made through this process update its index right away
+FAQ_INDEX_CHECK_SECONDS = 5
+
+# Minimum confidence for the local yes/no classifier to answer a confirmation
+# without falling back to GPT
+SENTIMENT_LOCAL_THRESHOLD = 0.9
+
+# Seconds a call's cached user and log are kept after its last webhook
+CALL_SESSION_TTL = 60 * 60
+
+# Cache shared by every worker process, e.g. CACHE_URL=redis://localhost:6379/0.
+# The default is a separate in-memory cache in each process.
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+SHARED_CACHE = not CACHES["default"]["BACKEND"].endswith("LocMemCache")
+
+# Seconds a day's appointment slot availability stays cached. Appointment
+# changes drop it right away, but only from this process's cache when the cache
+# is not shared, so other workers only keep it a few seconds.
+AVAILABILITY_CACHE_TTL = 60 * 60 if SHARED_CACHE else 5
+
+# Seconds a slot stays reserved for a caller while they confirm it
+SLOT_HOLD_SECONDS = 120
+
+# When a requested day is full, how many other open days are offered and how
+# many days ahead they are searched for
+OPEN_DAYS_OFFERED = 3
+OPEN_DAYS_HORIZON = 14
+
+# Live translations kept in memory per process, and for how many seconds
+TRANSLATION_CACHE_SIZE = 2048
+TRANSLATION_CACHE_TTL = 24 * 60 * 60
+
+# Shared API clients, seconds before a request is abandoned and how many times a
+# failed request is retried. Twilio waits 15 seconds for a webhook response.
+OPENAI_TIMEOUT = 8
+OPENAI_MAX_RETRIES = 1
+TWILIO_TIMEOUT = 10
+TWILIO_MAX_RETRIES = 2
+TRANSLATE_TIMEOUT = 5
+TRANSLATE_MAX_RETRIES = 2
+# Connections kept open per API host in each worker process
+API_POOL_SIZE = 10
+# Connections kept open to OpenAI by each event loop of an ASGI process
+ASYNC_API_POOL_SIZE = 200
+
+# Route the phone service webhooks to their async views, for ASGI servers
+ASYNC_WEBHOOKS = env.bool("ASYNC_WEBHOOKS", default=False)
+# Threads an ASGI process runs the blocking scheduling views in. Each thread
+# holds its own database connection while a view runs, so this times the
+# number of ASGI processes must stay below the database's connection limit,
+# 100 by default on PostgreSQL.
+ASYNC_VIEW_THREADS = env.int("ASYNC_VIEW_THREADS", default=16)
+# Threads shared by every hop for the remote calls it makes at the same time
+FAN_OUT_THREADS = 16
+
+# Work for the next hop of a call started while the caller is speaking: the
+# threads running it, seconds a result is kept and seconds a hop waits for
+# work that is still running before doing it itself
+PREFETCH_ENABLED = True
+PREFETCH_THREADS = 8
+PREFETCH_TTL = 120
+PREFETCH_WAIT = 2
+
+# Webhook response times are written in batches of this many hops, or this
+# many seconds after the first hop of a batch, and kept this many days
+WEBHOOK_TIMING_BATCH_SIZE = 50
+WEBHOOK_TIMING_FLUSH_SECONDS = 30
+WEBHOOK_TIMING_RETENTION_DAYS = 30
+
+# Most seconds a cached monitoring dashboard response is served, completed
+# calls replace it sooner
+DASHBOARD_MAX_STALENESS = 5 * 60
+
+# Audit log searches expected to match more logs than this show PostgreSQL's
+# row estimate rather than counting every one
+AUDIT_LOG_EXACT_COUNT_LIMIT = 10000
+
+# Transcripts of calls older than this many days are moved out of the Log
+# table into compressed files under MEDIA_ROOT by archive_call_logs
+CALL_ARCHIVE_AFTER_DAYS = 365
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -63,6 +148,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'admin_panel.middleware.WebhookTimingMiddleware',
+    'admin_panel.middleware.CallSessionMiddleware',
+    'admin_panel.middleware.TranscriptBufferMiddleware',
 ]
 
 ROOT_URLCONF = 'sd_food_bank_ai_bot.urls'